@@ -222,16 +222,16 @@ def get_spots():
         SELECT 
             s.id, s.timestamp, s.dx_call, s.frequency, s.spotter_call, 
             s.comment, s.mode, s.signal_report, s.grid_square, s.band,
+            maidenhead_to_lat(s.grid_square) as grid_lat,
+            maidenhead_to_lon(s.grid_square) as grid_lon,
             COALESCE(sgs.source_grid, '') as spotter_grid,
             COALESCE(sgs.dest_grid, '') as dx_grid,
-            COALESCE(sg.lat, NULL) as spotter_lat,
-            COALESCE(sg.lon, NULL) as spotter_lon,
-            COALESCE(dg.lat, NULL) as dx_lat,
-            COALESCE(dg.lon, NULL) as dx_lon
+            maidenhead_to_lat(sgs.source_grid) as spotter_lat,
+            maidenhead_to_lon(sgs.source_grid) as spotter_lon,
+            maidenhead_to_lat(sgs.dest_grid) as dx_lat,
+            maidenhead_to_lon(sgs.dest_grid) as dx_lon
         FROM dx_spots s
         LEFT JOIN spot_grid_squares sgs ON s.id = sgs.dx_spot_id
-        LEFT JOIN grid_squares sg ON sgs.source_grid = sg.grid
-        LEFT JOIN grid_squares dg ON sgs.dest_grid = dg.grid
         {where_clause}
         ORDER BY {order_by}
         LIMIT %s OFFSET %s
@@ -296,16 +296,16 @@ def get_recent_spots():
             SELECT 
                 s.id, s.timestamp, s.dx_call, s.frequency, s.spotter_call, 
                 s.comment, s.mode, s.signal_report, s.grid_square, s.band,
+                maidenhead_to_lat(s.grid_square) as grid_lat,
+                maidenhead_to_lon(s.grid_square) as grid_lon,
                 COALESCE(sgs.source_grid, '') as spotter_grid,
                 COALESCE(sgs.dest_grid, '') as dx_grid,
-                COALESCE(sg.lat, NULL) as spotter_lat,
-                COALESCE(sg.lon, NULL) as spotter_lon,
-                COALESCE(dg.lat, NULL) as dx_lat,
-                COALESCE(dg.lon, NULL) as dx_lon
+                maidenhead_to_lat(sgs.source_grid) as spotter_lat,
+                maidenhead_to_lon(sgs.source_grid) as spotter_lon,
+                maidenhead_to_lat(sgs.dest_grid) as dx_lat,
+                maidenhead_to_lon(sgs.dest_grid) as dx_lon
             FROM dx_spots s
             LEFT JOIN spot_grid_squares sgs ON s.id = sgs.dx_spot_id
-            LEFT JOIN grid_squares sg ON sgs.source_grid = sg.grid
-            LEFT JOIN grid_squares dg ON sgs.dest_grid = dg.grid
             WHERE s.timestamp >= NOW() - INTERVAL '%s hours'
             ORDER BY s.timestamp DESC
             LIMIT %s
@@ -486,15 +486,13 @@ def get_grid_distance():
         
         cur.execute("""
             SELECT 
-                g1.grid as grid1, g1.lat as lat1, g1.lon as lon1,
-                g2.grid as grid2, g2.lat as lat2, g2.lon as lon2
-            FROM grid_squares g1, grid_squares g2
-            WHERE g1.grid = %s AND g2.grid = %s
-        """, (grid1, grid2))
+                %(grid1)s as grid1, maidenhead_to_lat(%(grid1)s) as lat1, maidenhead_to_lon(%(grid1)s) as lon1,
+                %(grid2)s as grid2, maidenhead_to_lat(%(grid2)s) as lat2, maidenhead_to_lon(%(grid2)s) as lon2
+        """, {'grid1': grid1, 'grid2': grid2})
         
         result = cur.fetchone()
-        if not result:
-            abort(404, description=f"One or both grid squares not found: {grid1}, {grid2}")
+        if result['lat1'] is None or result['lat2'] is None:
+            abort(404, description=f"One or both grid squares not valid: {grid1}, {grid2}")
         
         # Calculate distance using haversine formula
         lat1, lon1 = float(result['lat1']), float(result['lon1'])
@@ -1,47 +1,58 @@
 """
 Fetch daily DX spot data from the DX Cluster API and aggregate into daily summaries for ML modeling.
 """
+import json
 import requests
 import pandas as pd
+from collections import Counter
 from datetime import datetime, timedelta
 
-API_BASE = "http://dx.jxqz.org:8080/api/spots"
+EXPORT_URL = "http://dx.jxqz.org:8080/api/spots/export"
 
 # Set your date range here
 START_DATE = "2025-09-01"  # YYYY-MM-DD
 END_DATE = "2025-10-30"    # YYYY-MM-DD
 
 
-def fetch_spots_for_day(date_str):
+def stream_spots_for_day(date_str):
+    """Yield one day's spots from the NDJSON export as they arrive"""
     since = f"{date_str}T00:00:00Z"
     until = f"{date_str}T23:59:59Z"
     params = {
         "since": since,
         "until": until,
-        "limit": 500  # max per request
+        "format": "ndjson"
     }
-    spots = []
-    offset = 0
-    while True:
-        params["offset"] = offset
-        resp = requests.get(API_BASE, params=params)
+    with requests.get(EXPORT_URL, params=params, stream=True) as resp:
         resp.raise_for_status()
-        data = resp.json()
-        spots.extend(data.get("spots", []))
-        if len(data.get("spots", [])) < params["limit"]:
-            break
-        offset += params["limit"]
-    return spots
+        for line in resp.iter_lines():
+            if line:
+                yield json.loads(line)
 
 
 def aggregate_daily(spots):
-    df = pd.DataFrame(spots)
+    """Summarize a stream of spots without keeping the spots themselves"""
+    total_spots = 0
+    dx_stations = set()
+    spotters = set()
+    bands = Counter()
+    modes = Counter()
+    for spot in spots:
+        total_spots += 1
+        if spot.get("dx_call") is not None:
+            dx_stations.add(spot["dx_call"])
+        if spot.get("spotter_call") is not None:
+            spotters.add(spot["spotter_call"])
+        if spot.get("band") is not None:
+            bands[spot["band"]] += 1
+        if spot.get("mode") is not None:
+            modes[spot["mode"]] += 1
     summary = {
-        "total_spots": len(df),
-        "unique_dx_stations": df["dx_call"].nunique() if "dx_call" in df else 0,
-        "unique_spotters": df["spotter_call"].nunique() if "spotter_call" in df else 0,
-        "bands": df["band"].value_counts().to_dict() if "band" in df else {},
-        "modes": df["mode"].value_counts().to_dict() if "mode" in df else {},
+        "total_spots": total_spots,
+        "unique_dx_stations": len(dx_stations),
+        "unique_spotters": len(spotters),
+        "bands": dict(bands.most_common()),
+        "modes": dict(modes.most_common()),
     }
     return summary
 
@@ -54,8 +65,7 @@ def main():
         day = start + timedelta(days=n)
         date_str = day.strftime("%Y-%m-%d")
         print(f"Fetching spots for {date_str}...")
-        spots = fetch_spots_for_day(date_str)
-        summary = aggregate_daily(spots)
+        summary = aggregate_daily(stream_spots_for_day(date_str))
         summary["date"] = date_str
         all_summaries.append(summary)
     df_summary = pd.DataFrame(all_summaries)
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 """
-Test script to verify grid_squares table population
+Test script to verify the Maidenhead grid square SQL functions
 """
 
 import os
@@ -14,8 +14,8 @@ load_dotenv()
 DB_NAME = os.getenv('DB_NAME', 'dx_analysis')
 DB_USER = os.getenv('DB_USER', 'steve')
 
-def test_grid_squares_table():
-    """Test that the grid_squares table has been populated correctly"""
+def test_grid_square_functions():
+    """Test that maidenhead_to_lat/lon and latlon_to_maidenhead return correct values"""
 
     conn_string = f"dbname={DB_NAME} user={DB_USER}"
 
@@ -23,67 +23,54 @@ def test_grid_squares_table():
         conn = psycopg2.connect(conn_string)
         cursor = conn.cursor()
 
-        # Test 1: Check table exists and has data
-        cursor.execute("SELECT COUNT(*) FROM grid_squares")
-        count = cursor.fetchone()[0]
-        print(f"✓ Grid squares table contains {count} records")
-
-        if count == 0:
-            print("✗ No data found in grid_squares table")
-            return False
-
-        # Test 2: Check some known grid squares
+        # Test 1: Check some known grid squares
         test_grids = [
             ('FN42', 42.5, -71.0),    # Boston area
             ('EM12', 32.5, -97.0),    # Dallas area
             ('CN87', 47.5, -123.0),   # Seattle area
             ('AA00', -89.5, -179.0),  # South pole area
             ('RR99', 89.5, 179.0),    # North pole area
+            ('fn42aa', 42.0208, -71.9583),  # Subsquare, lower case
+            ('JO62qm55', 52.5229, 13.3792),  # Extended square
         ]
 
-        print("\nTesting coordinate accuracy:")
+        print("Testing coordinate accuracy:")
         all_correct = True
 
         for grid, expected_lat, expected_lon in test_grids:
-            cursor.execute("SELECT lat, lon FROM grid_squares WHERE grid = %s", (grid,))
-            result = cursor.fetchone()
-
-            if result:
-                actual_lat, actual_lon = result
-                lat_diff = abs(actual_lat - expected_lat)
-                lon_diff = abs(actual_lon - expected_lon)
-
-                if lat_diff < 0.01 and lon_diff < 0.01:  # Within 0.01 degrees
-                    print(f"✓ {grid}: {actual_lat:.1f}, {actual_lon:.1f} ✓")
-                else:
-                    print(f"✗ {grid}: Expected ({expected_lat:.1f}, {expected_lon:.1f}), Got ({actual_lat:.1f}, {actual_lon:.1f})")
-                    all_correct = False
+            cursor.execute("SELECT maidenhead_to_lat(%s), maidenhead_to_lon(%s)", (grid, grid))
+            actual_lat, actual_lon = cursor.fetchone()
+
+            if actual_lat is None:
+                print(f"✗ {grid}: Not recognized as a grid square")
+                all_correct = False
+            elif abs(actual_lat - expected_lat) < 0.001 and abs(actual_lon - expected_lon) < 0.001:
+                print(f"✓ {grid}: {actual_lat:.4f}, {actual_lon:.4f} ✓")
+            else:
+                print(f"✗ {grid}: Expected ({expected_lat:.4f}, {expected_lon:.4f}), Got ({actual_lat:.4f}, {actual_lon:.4f})")
+                all_correct = False
+
+        # Test 2: Invalid locators return NULL
+        print("\nTesting invalid grid squares:")
+        for grid in ['ZZ99', 'FN4', 'FN42ZZ', '']:
+            cursor.execute("SELECT maidenhead_to_lat(%s)", (grid,))
+            if cursor.fetchone()[0] is None:
+                print(f"✓ {grid!r}: NULL")
             else:
-                print(f"✗ {grid}: Not found in database")
+                print(f"✗ {grid!r}: Expected NULL")
                 all_correct = False
 
-        # Test 3: Check spatial query
-        cursor.execute("""
-            SELECT COUNT(*) FROM grid_squares
-            WHERE lat BETWEEN 40 AND 50 AND lon BETWEEN -80 AND -60
-        """)
-        northeast_count = cursor.fetchone()[0]
-        print(f"\n✓ Found {northeast_count} grid squares in Northeast US region")
-
-        # Test 4: Check indices
-        cursor.execute("""
-            SELECT indexname FROM pg_indexes
-            WHERE tablename = 'grid_squares'
-        """)
-        indices = [row[0] for row in cursor.fetchall()]
-        expected_indices = ['grid_squares_pkey', 'idx_grid_squares_lat', 'idx_grid_squares_lon']
-
-        print(f"\n✓ Indices found: {', '.join(indices)}")
-        for expected in expected_indices:
-            if expected in indices:
-                print(f"✓ Index {expected} exists")
+        # Test 3: Round trip from coordinates back to the grid square
+        print("\nTesting round trip:")
+        for grid in ['FN42', 'FN42aa', 'JO62qm55']:
+            cursor.execute("""
+                SELECT latlon_to_maidenhead(maidenhead_to_lat(%s), maidenhead_to_lon(%s), %s)
+            """, (grid, grid, len(grid)))
+            result = cursor.fetchone()[0]
+            if result == grid:
+                print(f"✓ {grid} -> {result}")
             else:
-                print(f"✗ Index {expected} missing")
+                print(f"✗ {grid} -> {result}")
                 all_correct = False
 
         cursor.close()
@@ -96,11 +83,11 @@ def test_grid_squares_table():
         return False
 
 if __name__ == '__main__':
-    print("Testing grid_squares table population...")
+    print("Testing Maidenhead grid square functions...")
     print(f"Database: {DB_NAME}")
     print("-" * 50)
 
-    if test_grid_squares_table():
-        print("\n🎉 All tests passed! Grid squares table is properly populated.")
+    if test_grid_square_functions():
+        print("\n🎉 All tests passed! Grid square functions are working.")
     else:
-        print("\n❌ Some tests failed. Check the population script output.")
\ No newline at end of file
+        print("\n❌ Some tests failed. Check that migration 004 has been applied.")
\ No newline at end of file
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark computed Maidenhead conversion against the old lookup approaches
+
+Python: the vectorized grid_utils codec versus a per-grid conversion loop.
+Database (optional): maidenhead_to_lat()/maidenhead_to_lon() versus joining a
+grid_squares lookup table. The table is rebuilt as a temporary table holding
+every 4-character square plus the 6-character squares used by the test data,
+which is far smaller (and so faster to join) than the full 18.6M-row table.
+
+Usage:
+    python benchmark_grid_lookup.py [--spots N] [--skip-db]
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+
+from grid_utils import grids_to_latlon, latlon_to_grids
+
+# Load environment variables
+load_dotenv()
+
+# Database configuration
+DB_NAME = os.getenv('DB_NAME', 'dx_analysis')
+DB_USER = os.getenv('DB_USER', 'steve')
+
+
+def loop_grid_to_latlon(grid):
+    """Per-grid conversion as previously implemented (4 or 6 characters)"""
+    grid = grid.upper()
+    lon = (ord(grid[0]) - ord('A')) * 20 - 180 + int(grid[2]) * 2
+    lat = (ord(grid[1]) - ord('A')) * 10 - 90 + int(grid[3])
+    if len(grid) == 4:
+        return (lat + 0.5, lon + 1)
+    lon += (ord(grid[4]) - ord('A')) * (2 / 24) + (1 / 24)
+    lat += (ord(grid[5]) - ord('A')) * (1 / 24) + (0.5 / 24)
+    return (lat, lon)
+
+
+def timed(func, repeat=3):
+    """Best wall-clock time of several runs, in milliseconds"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def random_grids(count, seed=330):
+    """Random mix of 4- and 6-character grids"""
+    rng = np.random.default_rng(seed)
+    lats = rng.uniform(-90, 90, count)
+    lons = rng.uniform(-180, 180, count)
+    grids = latlon_to_grids(lats, lons, 6)
+    short = rng.random(count) < 0.5
+    grids[short] = np.char.ljust(grids[short], 4).astype('U4')
+    return grids
+
+
+def benchmark_python(grids):
+    """Compare the NumPy codec with a Python loop"""
+    print(f"Python conversion of {len(grids):,} grids:")
+    grid_list = grids.tolist()
+    loop_ms = timed(lambda: [loop_grid_to_latlon(g) for g in grid_list])
+    numpy_ms = timed(lambda: grids_to_latlon(grids))
+    print(f"  Per-grid loop:     {loop_ms:8.1f} ms")
+    print(f"  NumPy codec:       {numpy_ms:8.1f} ms  ({loop_ms / numpy_ms:.1f}x faster)")
+
+
+def benchmark_database(grids):
+    """Compare the SQL functions with a join against a lookup table"""
+    import psycopg2
+    from psycopg2.extras import execute_values
+
+    conn = psycopg2.connect(f"dbname={DB_NAME} user={DB_USER}")
+    cursor = conn.cursor()
+
+    # Every 4-character square plus the 6-character squares in the test data
+    fields = [chr(ord('A') + i) for i in range(18)]
+    squares = [f"{a}{b}{c}{d}" for a in fields for b in fields
+               for c in '0123456789' for d in '0123456789']
+    lookup = np.unique(np.concatenate([np.array(squares), np.char.upper(grids)]))
+    lats, lons = grids_to_latlon(lookup)
+
+    cursor.execute("""
+        CREATE TEMP TABLE bench_grid_squares (
+            grid VARCHAR(6) PRIMARY KEY, lat NUMERIC(8,4) NOT NULL, lon NUMERIC(9,4) NOT NULL
+        )
+    """)
+    execute_values(cursor, "INSERT INTO bench_grid_squares VALUES %s",
+                   list(zip(lookup.tolist(), lats.round(4).tolist(), lons.round(4).tolist())),
+                   page_size=5000)
+    cursor.execute("CREATE TEMP TABLE bench_spots AS SELECT unnest(%s::text[]) AS grid_square",
+                   (grids.tolist(),))
+    cursor.execute("ANALYZE bench_grid_squares")
+    cursor.execute("ANALYZE bench_spots")
+
+    join_ms = timed(lambda: cursor.execute("""
+        SELECT SUM(g.lat), SUM(g.lon)
+        FROM bench_spots s
+        LEFT JOIN bench_grid_squares g ON UPPER(s.grid_square) = g.grid
+    """))
+    function_ms = timed(lambda: cursor.execute("""
+        SELECT SUM(maidenhead_to_lat(grid_square)), SUM(maidenhead_to_lon(grid_square))
+        FROM bench_spots
+    """))
+
+    print(f"\nDatabase lookup of {len(grids):,} spot grids "
+          f"(lookup table: {len(lookup):,} rows):")
+    print(f"  Table join:        {join_ms:8.1f} ms")
+    print(f"  SQL functions:     {function_ms:8.1f} ms  ({function_ms / join_ms:.1f}x the join time)")
+
+    conn.rollback()
+    cursor.close()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Maidenhead grid conversion')
+    parser.add_argument('--spots', type=int, default=200000,
+                        help='Number of grids to convert (default: 200000)')
+    parser.add_argument('--skip-db', action='store_true',
+                        help='Only run the Python benchmark')
+    args = parser.parse_args()
+
+    grids = random_grids(args.spots)
+    benchmark_python(grids)
+
+    if not args.skip_db:
+        benchmark_database(grids)
+
+
+if __name__ == '__main__':
+    main()
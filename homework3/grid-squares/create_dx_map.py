@@ -3,11 +3,12 @@
 Create an interactive map showing DX propagation paths using grid squares
 """
 
-import json
 import folium
 from folium import plugins
 import sys
 
+from grid_utils import lookup_grids
+
 def create_dx_map(grid_pairs, output_file='dx_propagation_map.html'):
     """
     Create an interactive map showing DX propagation paths
@@ -16,13 +17,8 @@ def create_dx_map(grid_pairs, output_file='dx_propagation_map.html'):
         grid_pairs: List of (source_grid, dest_grid) tuples
         output_file: Output HTML filename
     """
-    # Load grid square data
-    try:
-        with open('grid_squares.json', 'r') as f:
-            grid_data = json.load(f)
-    except FileNotFoundError:
-        print("Error: grid_squares.json not found. Run grid_utils.py first.")
-        return
+    # Compute coordinates for the grid squares in the paths
+    grid_data = lookup_grids(grid for pair in grid_pairs for grid in pair)
 
     # Create base map centered on North America
     m = folium.Map(location=[40, -95], zoom_start=4,
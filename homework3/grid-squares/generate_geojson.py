@@ -7,6 +7,8 @@ Can be imported into mapping libraries like Leaflet, Mapbox, or GIS software
 import json
 import math
 
+from grid_utils import lookup_grids
+
 def calculate_distance(lat1, lon1, lat2, lon2):
     """Calculate distance between two points using Haversine formula (km)"""
     lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
@@ -126,13 +128,8 @@ def generate_propagation_geojson(grid_pairs, output_file='dx_propagation_paths.g
         grid_pairs: List of (source_grid, dest_grid) tuples
         output_file: Output filename
     """
-    # Load grid square data
-    try:
-        with open('grid_squares.json', 'r') as f:
-            grid_data = json.load(f)
-    except FileNotFoundError:
-        print("Error: grid_squares.json not found. Run grid_utils.py first.")
-        return
+    # Compute coordinates for the grid squares in the paths
+    grid_data = lookup_grids(grid for pair in grid_pairs for grid in pair)
 
     print(f"Generating GeoJSON for {len(grid_pairs)} propagation paths...")
 
@@ -1,30 +1,15 @@
 #!/usr/bin/env python3
 """
-Example: Load grid square data and demonstrate usage for mapping
+Example: Convert grid squares to coordinates and demonstrate usage for mapping
 """
 
-import json
-import sys
-import os
+import math
 
-def load_grid_data(filename='grid_squares.json'):
-    """Load grid square coordinate data from JSON file"""
-    try:
-        with open(filename, 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        print(f"Error: {filename} not found. Run grid_utils.py first to generate it.")
-        return None
+from grid_utils import grid_to_latlon
 
-def get_grid_coords(grid_square, grid_data=None):
+def get_grid_coords(grid_square):
     """Get latitude/longitude for a grid square"""
-    if grid_data is None:
-        grid_data = load_grid_data()
-        if grid_data is None:
-            return None
-
-    grid_square = grid_square.upper()
-    return grid_data.get(grid_square)
+    return grid_to_latlon(grid_square)
 
 def calculate_distance(lat1, lon1, lat2, lon2):
     """Calculate approximate distance between two points using Haversine formula"""
@@ -61,11 +46,6 @@ def demo_grid_mapping():
     print("Grid Square Mapping Demo")
     print("=" * 40)
 
-    # Load grid data
-    grid_data = load_grid_data()
-    if not grid_data:
-        return
-
     # Example grid squares
     examples = [
         ('FN42', 'Boston, MA area'),
@@ -76,7 +56,7 @@ def demo_grid_mapping():
 
     print("Grid Square Coordinates:")
     for grid, location in examples:
-        coords = get_grid_coords(grid, grid_data)
+        coords = get_grid_coords(grid)
         if coords:
             print(f"{grid} ({location}): {coords[0]:.1f}°N, {coords[1]:.1f}°E" if coords[1] >= 0 else f"{grid} ({location}): {coords[0]:.1f}°N, {coords[1]:.1f}°W")
         else:
@@ -85,8 +65,8 @@ def demo_grid_mapping():
     print("\nDistance and Bearing Examples:")
     # Calculate distance between two grids
     grid1, grid2 = 'FN42', 'EM12'
-    coords1 = get_grid_coords(grid1, grid_data)
-    coords2 = get_grid_coords(grid2, grid_data)
+    coords1 = get_grid_coords(grid1)
+    coords2 = get_grid_coords(grid2)
 
     if coords1 and coords2:
         distance = calculate_distance(coords1[0], coords1[1], coords2[0], coords2[1])
@@ -94,10 +74,9 @@ def demo_grid_mapping():
         print(f"Distance from {grid1} to {grid2}: {distance:.0f} km")
         print(f"Bearing from {grid1} to {grid2}: {bearing:.0f}°")
 
-    print("\nJSON Structure for Mapping:")
-    print("Each grid square maps to [latitude, longitude] coordinates")
+    print("\nCoordinates for Mapping:")
+    print("Each grid square maps to the (latitude, longitude) of its center")
     print("Perfect for plotting on maps like Folium, Plotly, or Matplotlib")
 
 if __name__ == '__main__':
-    import math  # Import here to avoid circular import issues
     demo_grid_mapping()
\ No newline at end of file
@@ -1,135 +1,161 @@
 #!/usr/bin/env python3
 """
 Maidenhead Grid Square Utilities
-Convert Maidenhead locator codes to latitude/longitude coordinates
+Convert between Maidenhead locator codes and latitude/longitude coordinates
+
+The conversion is pure arithmetic, so there is no lookup table: the NumPy
+functions convert whole arrays of locators (or coordinates) at once and the
+scalar helpers wrap them for single values. Locators of any precision are
+supported (2, 4, 6, 8 or 10 characters).
 """
 
-import json
-import math
+import numpy as np
 
-def grid_to_latlon(grid_square):
+# Size of each character pair in degrees: field, square, subsquare,
+# extended square, extended subsquare
+LON_STEPS = np.array([20.0, 2.0, 2.0 / 24, 2.0 / 240, 2.0 / 5760])
+LAT_STEPS = LON_STEPS / 2
+# Number of symbols in each pair and the first symbol of each pair
+PAIR_BASES = np.array([18, 10, 24, 10, 24])
+PAIR_FIRST = [ord('A'), ord('0'), ord('A'), ord('0'), ord('A')]
+
+MAX_PRECISION = 2 * len(LON_STEPS)
+
+
+def grids_to_latlon(grids):
     """
-    Convert a Maidenhead grid square to center latitude and longitude
+    Convert an array of Maidenhead locators to the coordinates of their centers
 
     Args:
-        grid_square (str): Maidenhead locator (4 or 6 characters)
+        grids: sequence or array of locator strings (case-insensitive)
 
     Returns:
-        tuple: (latitude, longitude) in decimal degrees, or None if invalid
+        tuple: (latitudes, longitudes) as float arrays, NaN where a locator is invalid
     """
-    if not grid_square or len(grid_square) not in [4, 6]:
-        return None
-
-    grid_square = grid_square.upper()
-
-    try:
-        # Field (2 letters): 20° x 10°
-        field_lon = ord(grid_square[0]) - ord('A')
-        field_lat = ord(grid_square[1]) - ord('A')
-
-        if not (0 <= field_lon <= 17 and 0 <= field_lat <= 17):
-            return None
-
-        # Square (2 digits): 1° x 1°
-        square_lon = int(grid_square[2])
-        square_lat = int(grid_square[3])
+    grids = np.asarray(grids, dtype=f'U{MAX_PRECISION}')
+    lengths = np.char.str_len(grids)
+    # One code point per character, zero-padded to MAX_PRECISION
+    codes = grids.view(np.uint32).reshape(len(grids), MAX_PRECISION).astype(np.int64)
+    # Upper-case a-z in place; cheaper than np.char.upper on the strings
+    codes -= ((codes >= ord('a')) & (codes <= ord('z'))) * 32
+
+    valid = (lengths >= 2) & (lengths % 2 == 0)
+    lat = np.full(len(grids), -90.0)
+    lon = np.full(len(grids), -180.0)
+
+    for pair in range(len(LON_STEPS)):
+        in_use = lengths > 2 * pair
+        lon_index = codes[:, 2 * pair] - PAIR_FIRST[pair]
+        lat_index = codes[:, 2 * pair + 1] - PAIR_FIRST[pair]
+        pair_ok = ((lon_index >= 0) & (lon_index < PAIR_BASES[pair]) &
+                   (lat_index >= 0) & (lat_index < PAIR_BASES[pair]))
+        valid &= ~in_use | pair_ok
+        lon += np.where(in_use, lon_index * LON_STEPS[pair], 0.0)
+        lat += np.where(in_use, lat_index * LAT_STEPS[pair], 0.0)
+
+    # Move from the south-west corner to the center of the smallest square
+    last_pair = np.clip(lengths // 2 - 1, 0, len(LON_STEPS) - 1)
+    lon += LON_STEPS[last_pair] / 2
+    lat += LAT_STEPS[last_pair] / 2
+
+    lat[~valid] = np.nan
+    lon[~valid] = np.nan
+    return lat, lon
+
+
+def latlon_to_grids(lats, lons, precision=6):
+    """
+    Convert arrays of coordinates to Maidenhead locators
 
-        if not (0 <= square_lon <= 9 and 0 <= square_lat <= 9):
-            return None
+    Args:
+        lats, lons: sequences or arrays of decimal degrees
+        precision (int): locator length (2, 4, 6, 8 or 10)
 
-        # Calculate base coordinates
-        lon = field_lon * 20 - 180
-        lat = field_lat * 10 - 90
+    Returns:
+        numpy array of locator strings (subsquare letters in lower case)
+    """
+    if precision not in range(2, MAX_PRECISION + 1, 2):
+        raise ValueError(f"precision must be an even number between 2 and {MAX_PRECISION}")
 
-        lon += square_lon * 2
-        lat += square_lat * 1
+    # Shift to positive offsets and keep the north pole / antimeridian inside the last square
+    lon_rem = np.clip(np.asarray(lons, dtype=float) + 180.0, 0.0, np.nextafter(360.0, 0))
+    lat_rem = np.clip(np.asarray(lats, dtype=float) + 90.0, 0.0, np.nextafter(180.0, 0))
 
-        # Subsquare (2 letters, optional): 2.5' x 2.5' (0.04167° x 0.04167°)
-        if len(grid_square) == 6:
-            subsquare_lon = ord(grid_square[4].lower()) - ord('a')
-            subsquare_lat = ord(grid_square[5].lower()) - ord('a')
+    codes = np.zeros((lon_rem.size, precision), dtype=np.uint32)
+    for pair in range(precision // 2):
+        lon_index = np.minimum(np.floor(lon_rem / LON_STEPS[pair]), PAIR_BASES[pair] - 1)
+        lat_index = np.minimum(np.floor(lat_rem / LAT_STEPS[pair]), PAIR_BASES[pair] - 1)
+        lon_rem = lon_rem - lon_index * LON_STEPS[pair]
+        lat_rem = lat_rem - lat_index * LAT_STEPS[pair]
+        # Subsquares are conventionally written in lower case
+        first = ord('a') if pair in (2, 4) else PAIR_FIRST[pair]
+        codes[:, 2 * pair] = lon_index.astype(np.uint32) + first
+        codes[:, 2 * pair + 1] = lat_index.astype(np.uint32) + first
 
-            if not (0 <= subsquare_lon <= 23 and 0 <= subsquare_lat <= 23):
-                return None
+    return codes.view(f'U{precision}').reshape(lon_rem.size)
 
-            lon += subsquare_lon * (2 / 24)  # 2° / 24 = 0.08333°
-            lat += subsquare_lat * (1 / 24)  # 1° / 24 = 0.04167°
 
-        # Add 0.5 to get center of the grid square
-        lon += 1 if len(grid_square) == 4 else (2 / 24) / 2
-        lat += 0.5 if len(grid_square) == 4 else (1 / 24) / 2
+def grid_to_latlon(grid_square):
+    """
+    Convert a Maidenhead grid square to center latitude and longitude
 
-        return (lat, lon)
+    Args:
+        grid_square (str): Maidenhead locator (2 to 10 characters)
 
-    except (ValueError, IndexError):
+    Returns:
+        tuple: (latitude, longitude) in decimal degrees, or None if invalid
+    """
+    if not grid_square or len(grid_square) > MAX_PRECISION:
+        return None
+    lat, lon = grids_to_latlon([grid_square])
+    if np.isnan(lat[0]):
         return None
+    return (float(lat[0]), float(lon[0]))
 
-def generate_grid_data(max_precision=4):
+
+def latlon_to_grid(lat, lon, precision=6):
     """
-    Generate a dictionary of all valid grid squares with their coordinates
+    Convert latitude and longitude to a Maidenhead locator
 
     Args:
-        max_precision (int): Maximum grid precision (4 or 6)
+        lat, lon (float): decimal degrees
+        precision (int): locator length (2, 4, 6, 8 or 10)
 
     Returns:
-        dict: Grid square -> (lat, lon) mapping
+        str: Maidenhead locator
     """
-    grid_data = {}
-
-    if max_precision >= 4:
-        # Generate 4-character grids
-        for field1 in range(18):  # A-R
-            for field2 in range(18):  # A-R
-                for square1 in range(10):  # 0-9
-                    for square2 in range(10):  # 0-9
-                        grid = f"{chr(ord('A')+field1)}{chr(ord('A')+field2)}{square1}{square2}"
-                        coords = grid_to_latlon(grid)
-                        if coords:
-                            grid_data[grid] = coords
-
-    if max_precision >= 6:
-        # Generate 6-character grids (warning: 32,400 * 24 * 24 = ~18.8 million entries!)
-        for field1 in range(18):
-            for field2 in range(18):
-                for square1 in range(10):
-                    for square2 in range(10):
-                        for sub1 in range(24):  # a-x
-                            for sub2 in range(24):  # a-x
-                                grid = f"{chr(ord('A')+field1)}{chr(ord('A')+field2)}{square1}{square2}{chr(ord('a')+sub1)}{chr(ord('b')+sub2)}"
-                                coords = grid_to_latlon(grid)
-                                if coords:
-                                    grid_data[grid] = coords
-
-    return grid_data
-
-def save_grid_data(filename, max_precision=4):
+    return str(latlon_to_grids([lat], [lon], precision)[0])
+
+
+def lookup_grids(grid_squares):
     """
-    Generate and save grid square data to a JSON file
+    Convert a collection of locators into a grid -> (lat, lon) dictionary
+
+    Replaces loading the old grid_squares.json table: only the locators that
+    are actually needed are computed.
 
     Args:
-        filename (str): Output filename
-        max_precision (int): Maximum grid precision (4 or 6)
-    """
-    print(f"Generating grid square data (precision: {max_precision})...")
-    grid_data = generate_grid_data(max_precision)
+        grid_squares: iterable of locator strings
 
-    print(f"Saving {len(grid_data)} grid squares to {filename}...")
-    with open(filename, 'w') as f:
-        json.dump(grid_data, f, indent=2)
+    Returns:
+        dict: upper-cased grid square -> (lat, lon); invalid locators are omitted
+    """
+    grids = sorted({g.upper() for g in grid_squares if g and len(g) <= MAX_PRECISION})
+    if not grids:
+        return {}
+    lats, lons = grids_to_latlon(grids)
+    return {grid: (float(lat), float(lon))
+            for grid, lat, lon in zip(grids, lats, lons) if not np.isnan(lat)}
 
-    print("Done!")
 
 if __name__ == '__main__':
     # Example usage
-    test_grids = ['FN42', 'EM12', 'AA00', 'RR99', 'FN42aa', 'FN42xx']
+    test_grids = ['FN42', 'EM12', 'AA00', 'RR99', 'FN42aa', 'FN42xx', 'JO62qm55', 'ZZ99']
 
     print("Testing grid square conversions:")
     for grid in test_grids:
         coords = grid_to_latlon(grid)
         if coords:
-            print(f"{grid}: {coords[0]:.4f}, {coords[1]:.4f}")
+            print(f"{grid}: {coords[0]:.4f}, {coords[1]:.4f} -> {latlon_to_grid(*coords, precision=len(grid))}")
         else:
             print(f"{grid}: Invalid")
-
-    # Generate data file
-    save_grid_data('grid_squares.json', max_precision=4)
\ No newline at end of file
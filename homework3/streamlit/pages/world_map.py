@@ -20,27 +20,13 @@ def fetch_spots():
         st.error(f"Error fetching data: {e}")
         return []
 
-# Function to convert Maidenhead grid to lat/lon
-def maidenhead_to_latlon(grid):
-    if not grid or len(grid) != 6:
-        return None, None
-    try:
-        lon = (ord(grid[0].upper()) - ord('A')) * 20 - 180
-        lat = (ord(grid[1].upper()) - ord('A')) * 10 - 90
-        lon += int(grid[2]) * 2
-        lat += int(grid[3])
-        lon += (ord(grid[4].lower()) - ord('a')) * (2 / 24)
-        lat += (ord(grid[5].lower()) - ord('a')) * (1 / 24)
-        return lat, lon
-    except:
-        return None, None
-
 spots = fetch_spots()
 
 if spots:
     df = pd.DataFrame(spots)
-    # Convert grid to lat/lon
-    df[['lat', 'lon']] = df['grid_square'].apply(lambda x: pd.Series(maidenhead_to_latlon(x)))
+    # Grid square coordinates are computed by the API
+    df['lat'] = pd.to_numeric(df.get('grid_lat'), errors='coerce')
+    df['lon'] = pd.to_numeric(df.get('grid_lon'), errors='coerce')
     df = df.dropna(subset=['lat', 'lon'])
     
     if not df.empty:
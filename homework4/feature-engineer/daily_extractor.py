@@ -10,7 +10,7 @@ import urllib.error
 import urllib.parse
 import sys
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Tuple
+from typing import List, Dict, Iterator, Tuple
 from collections import defaultdict
 
 
@@ -18,6 +18,15 @@ class DailyFeatureExtractor:
     """Extract daily aggregated features from radio spotting data."""
     
     API_URL = "http://api.jxqz.org:8080/api/spots"
+    EXPORT_URL = "http://api.jxqz.org:8080/api/spots/export"
+    SUMMARY_URL = "http://api.jxqz.org:8080/api/propagation/daily"
+
+    # Summary table columns, in get_feature_names() order (after the date)
+    SUMMARY_COLUMNS = [
+        "avg_frequency", "num_bands_active", "total_spots", "avg_signal_quality",
+        "signal_quality_std", "cw_percentage", "ssb_percentage", "activity_hours",
+        "peak_hour", "band_40m_percentage"
+    ]
     
     BANDS_LIST = ["6m", "10m", "12m", "15m", "17m", "20m", "40m"]  # Excluding 80m and 160m
     
@@ -32,7 +41,7 @@ class DailyFeatureExtractor:
         Fetch data from API.
         
         Args:
-            limit: Maximum number of spots to fetch per page (None for all pages)
+            limit: Maximum number of (most recent) spots to fetch (None for all)
             exclude_today: If True, exclude today's data (keep only historical data for training)
             days_back: If set, only include data from N days ago or earlier (relative to today)
         
@@ -58,43 +67,48 @@ class DailyFeatureExtractor:
                 base_params['since'] = since_dt.isoformat().replace('+00:00', 'Z')
             
             page_size = 500  # Use max limit per API spec
-            offset = 0
+            cursor = None
             all_spots = []
             
-            while True:
-                # Build query string with pagination
-                params = base_params.copy()
-                params['limit'] = page_size
-                params['offset'] = offset
+            if limit is None:
+                # Everything in the range: stream it instead of paging
+                all_spots = list(self.stream_spots(base_params.get('since'), base_params.get('until')))
+            else:
+                while True:
+                    # Build query string with cursor pagination (no total count needed)
+                    params = base_params.copy()
+                    params['limit'] = page_size
+                    if cursor:
+                        params['cursor'] = cursor
+                    else:
+                        params['count'] = 'none'
                 
-                query_string = "&".join(f"{k}={urllib.parse.quote(str(v))}" for k, v in params.items())
-                full_url = f"{url}?{query_string}" if query_string else url
+                    query_string = "&".join(f"{k}={urllib.parse.quote(str(v))}" for k, v in params.items())
+                    full_url = f"{url}?{query_string}" if query_string else url
                 
-                with urllib.request.urlopen(full_url, timeout=10) as response:
-                    data = json.loads(response.read().decode('utf-8'))
-                    spots = data.get("spots", [])
-                    pagination = data.get("pagination", {})
+                    with urllib.request.urlopen(full_url, timeout=10) as response:
+                        data = json.loads(response.read().decode('utf-8'))
+                        spots = data.get("spots", [])
+                        pagination = data.get("pagination", {})
                     
-                    if not spots:
-                        # No more spots to fetch
-                        break
+                        if not spots:
+                            # No more spots to fetch
+                            break
                     
-                    # Check if we've fetched enough (if limit was specified)
-                    if limit and len(all_spots) + len(spots) > limit:
-                        spots = spots[:limit - len(all_spots)]
+                        # Check if we've fetched enough (if limit was specified)
+                        if limit and len(all_spots) + len(spots) > limit:
+                            spots = spots[:limit - len(all_spots)]
                     
-                    all_spots.extend(spots)
+                        all_spots.extend(spots)
                     
-                    # If limit is specified and we've reached it, stop
-                    if limit and len(all_spots) >= limit:
-                        break
+                        # If limit is specified and we've reached it, stop
+                        if limit and len(all_spots) >= limit:
+                            break
                     
-                    # Check if there are more pages
-                    has_more = pagination.get("has_more", False)
-                    if not has_more:
-                        break
-                    
-                    offset += len(spots)
+                        # Follow the cursor to the next page, if there is one
+                        cursor = pagination.get("next_cursor")
+                        if not cursor:
+                            break
             
             filtered_spots = []
             
@@ -119,6 +133,74 @@ class DailyFeatureExtractor:
             print(f"✗ Error fetching API data: {e}")
             return []
     
+    def stream_spots(self, since: str = None, until: str = None) -> Iterator[Dict]:
+        """
+        Stream spots from the API's NDJSON export, oldest first.
+        
+        Spots are yielded as they arrive, so a long range is never held in
+        memory as a whole.
+        
+        Args:
+            since: ISO datetime of the earliest spot (None for no lower bound)
+            until: ISO datetime of the latest spot (None for no upper bound)
+            
+        Yields:
+            Spot dictionaries in the same format as /api/spots
+        """
+        params = {k: v for k, v in (('since', since), ('until', until)) if v}
+        query_string = "&".join(f"{k}={urllib.parse.quote(str(v))}" for k, v in params.items())
+        full_url = f"{self.EXPORT_URL}?{query_string}" if query_string else self.EXPORT_URL
+        
+        with urllib.request.urlopen(full_url, timeout=30) as response:
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)
+    
+    def fetch_daily_features(self, days_back: int = None, since: str = None, until: str = None) -> List[List[float]]:
+        """
+        Fetch precomputed daily features from the API's daily summary.
+
+        The server summarizes each completed UTC day once (the same features as
+        extract_daily_features()), so this is a single small request instead of
+        downloading every spot. Today is never included.
+
+        Args:
+            days_back: If set, only include the last N days
+            since: First date to include (YYYY-MM-DD), overrides days_back
+            until: Last date to include (YYYY-MM-DD)
+
+        Returns:
+            List of daily feature vectors: [date, feature1, feature2, ...]
+        """
+        params = {}
+        if since:
+            params['since'] = since
+        elif days_back is not None:
+            params['since'] = (datetime.now(timezone.utc).date() - timedelta(days=days_back)).isoformat()
+        if until:
+            params['until'] = until
+
+        url = self.SUMMARY_URL
+        if params:
+            url = f"{url}?{urllib.parse.urlencode(params)}"
+
+        try:
+            with urllib.request.urlopen(url, timeout=10) as response:
+                data = json.loads(response.read().decode('utf-8'))
+        except Exception as e:
+            print(f"✗ Error fetching daily summary: {e}")
+            return []
+
+        # Missing values (e.g. no signal reports that day) are 0, as in extract_daily_features()
+        daily_features = [
+            [day["day"]] + [float(day.get(column) or 0) for column in self.SUMMARY_COLUMNS]
+            for day in data.get("days", [])
+        ]
+
+        self.daily_features = daily_features
+        print(f"✓ Fetched daily features for {len(daily_features)} days from API summary")
+        return daily_features
+
     def group_by_date(self, spots: List[Dict]) -> Dict[str, List[Dict]]:
         """Group spots by date (YYYY-MM-DD)."""
         grouped = defaultdict(list)
@@ -391,21 +473,28 @@ def main():
     
     extractor = DailyFeatureExtractor()
     
-    # Fetch data
-    print(f"\n[1] Fetching data from API (last {days_back} days)...")
-    spots = extractor.fetch_data(limit=None, days_back=days_back)  # Fetch all spots without limit
-    
-    if not spots:
-        print("✗ Failed to fetch data")
-        return
-    
-    # Group by date
-    print("\n[2] Grouping spots by date...")
-    daily_data = extractor.group_by_date(spots)
-    
-    # Extract daily features
-    print("\n[3] Extracting daily features...")
-    daily_features = extractor.extract_daily_features()
+    # Fetch precomputed daily features
+    print(f"\n[1] Fetching daily features from API summary (last {days_back} days)...")
+    daily_features = extractor.fetch_daily_features(days_back=days_back)
+
+    if daily_features:
+        print("\n[2-3] Features computed by the server, skipping spot download")
+    else:
+        # Fall back to computing the features from raw spots
+        print(f"\n[1] Fetching spots from API (last {days_back} days)...")
+        spots = extractor.fetch_data(limit=None, days_back=days_back)  # Fetch all spots without limit
+
+        if not spots:
+            print("✗ Failed to fetch data")
+            return
+
+        # Group by date
+        print("\n[2] Grouping spots by date...")
+        daily_data = extractor.group_by_date(spots)
+
+        # Extract daily features
+        print("\n[3] Extracting daily features...")
+        daily_features = extractor.extract_daily_features()
     
     # Normalize
     print("\n[4] Normalizing features...")
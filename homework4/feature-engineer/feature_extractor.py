@@ -8,8 +8,9 @@ import numpy as np
 import urllib.request
 import urllib.parse
 import json
+from collections import deque
 from datetime import datetime, timedelta, timezone
-from typing import List, Dict, Tuple
+from typing import List, Dict, Iterator, Tuple
 from sklearn.preprocessing import MinMaxScaler
 import pandas as pd
 import sys
@@ -19,6 +20,7 @@ class RadioSpottingFeatureExtractor:
     """Extract and normalize features from radio spotting API."""
     
     API_URL = "http://api.jxqz.org:8080/api/spots"
+    EXPORT_URL = "http://api.jxqz.org:8080/api/spots/export"
     
     # Define band frequency ranges (in MHz)
     BAND_FREQUENCIES = {
@@ -63,40 +65,8 @@ class RadioSpottingFeatureExtractor:
             since_param = start_dt.isoformat().replace('+00:00', 'Z')
             until_param = end_dt.isoformat().replace('+00:00', 'Z')
             
-            url = self.API_URL
-            page_size = 500
-            offset = 0
-            all_spots = []
-            
-            while True:
-                params = {
-                    'since': since_param,
-                    'until': until_param,
-                    'limit': page_size,
-                    'offset': offset
-                }
-                
-                query_string = "&".join(f"{k}={urllib.parse.quote(str(v))}" for k, v in params.items())
-                full_url = f"{url}?{query_string}"
-                
-                with urllib.request.urlopen(full_url, timeout=10) as response:
-                    data = json.loads(response.read().decode('utf-8'))
-                    spots = data.get("spots", [])
-                    pagination = data.get("pagination", {})
-                    
-                    if not spots:
-                        break
-                    
-                    all_spots.extend(spots)
-                    
-                    has_more = pagination.get("has_more", False)
-                    if not has_more:
-                        break
-                    
-                    offset += len(spots)
-            
-            if limit:
-                all_spots = all_spots[:limit]
+            # Stream the whole day; with a limit only the newest spots are kept
+            all_spots = list(deque(self.stream_spots(since_param, until_param), maxlen=limit or None))
             
             print(f"✓ Fetched {len(all_spots)} spots from API for {target_date}")
             return all_spots
@@ -111,6 +81,29 @@ class RadioSpottingFeatureExtractor:
             print(f"✗ Error fetching API data: {e}")
             return []
     
+    def stream_spots(self, since: str = None, until: str = None) -> Iterator[Dict]:
+        """
+        Stream spots from the API's NDJSON export, oldest first.
+        
+        Spots are yielded as they arrive, so a long range is never held in
+        memory as a whole.
+        
+        Args:
+            since: ISO datetime of the earliest spot (None for no lower bound)
+            until: ISO datetime of the latest spot (None for no upper bound)
+            
+        Yields:
+            Spot dictionaries in the same format as /api/spots
+        """
+        params = {k: v for k, v in (('since', since), ('until', until)) if v}
+        query_string = "&".join(f"{k}={urllib.parse.quote(str(v))}" for k, v in params.items())
+        full_url = f"{self.EXPORT_URL}?{query_string}" if query_string else self.EXPORT_URL
+        
+        with urllib.request.urlopen(full_url, timeout=30) as response:
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)
+    
     def extract_features(self, spots: List[Dict]) -> np.ndarray:
         """
         Extract numeric features from raw spot data.
@@ -37,12 +37,18 @@ def fetch_spots_for_day(base_url: str, day: date, limit: int = DEFAULT_LIMIT) ->
     until = iso_utc(until_dt)
 
     collected: List[Dict[str, Any]] = []
-    offset = 0
+    cursor = None
 
     session = requests.Session()
 
+    # Follow next_cursor (keyset pagination): each page costs the same however
+    # far into the day it is, and no total count is computed
     while True:
-        params = {"since": since, "until": until, "limit": limit, "offset": offset}
+        params = {"since": since, "until": until, "limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        else:
+            params["count"] = "none"
         url = base_url.rstrip("/") + "/spots"
         resp = session.get(url, params=params, timeout=30)
         try:
@@ -58,18 +64,10 @@ def fetch_spots_for_day(base_url: str, day: date, limit: int = DEFAULT_LIMIT) ->
 
         collected.extend(page_spots)
 
-        # Determine termination
-        total_available = data.get("total_available")
-        if total_available is not None:
-            if len(collected) >= int(total_available):
-                break
-        # If API doesn't return total_available, stop when we get fewer than requested
-        if len(page_spots) < limit:
+        cursor = (data.get("pagination") or {}).get("next_cursor")
+        if not cursor:
             break
 
-        # advance offset
-        offset += len(page_spots)
-
     return collected
 
 
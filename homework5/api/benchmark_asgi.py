@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark concurrent throughput of the threaded (gunicorn) and ASGI (uvicorn) servers
+
+Slow clients keep requesting analytical endpoints that scan the whole spots
+table, with parameters varied on every request so the response cache never
+answers them. Meanwhile cheap clients request /api/spots/recent and
+/api/health. The interesting number is the cheap requests' latency: under the
+threaded server they wait for a free thread behind the slow queries.
+
+Start the servers first, e.g.:
+    gunicorn --workers 2 --threads 8 --bind 127.0.0.1:8080 api.dx_api:app
+    uvicorn api.dx_api_asgi:app --workers 2 --host 127.0.0.1 --port 8081
+
+Usage:
+    python benchmark_asgi.py threaded=http://127.0.0.1:8080 asgi=http://127.0.0.1:8081
+        [--duration 20] [--slow-clients 24] [--cheap-clients 4]
+"""
+
+import argparse
+import random
+import statistics
+import threading
+import time
+
+import requests
+
+
+def slow_url():
+    """An uncached full-table analytical request"""
+    return random.choice([
+        f'/api/frequency/histogram?bins={random.randint(20, 200)}',
+        f'/api/callsigns/top?limit={random.randint(1, 100)}',
+        f'/api/callsigns/top?category=spotted&limit={random.randint(1, 100)}',
+    ])
+
+
+def cheap_url():
+    return random.choice(['/api/spots/recent?hours=1&limit=20', '/api/health'])
+
+
+def client(base_url, next_url, deadline, results):
+    """Issue requests back to back until the deadline, recording (latency, ok)"""
+    session = requests.Session()
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            ok = session.get(base_url + next_url(), timeout=60).status_code == 200
+        except requests.RequestException:
+            ok = False
+        results.append((time.perf_counter() - start, ok))
+
+
+def percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def run(base_url, duration, slow_clients, cheap_clients):
+    """Run the slow and cheap clients together; return their results"""
+    slow, cheap = [], []
+    deadline = time.monotonic() + duration
+    threads = ([threading.Thread(target=client, args=(base_url, slow_url, deadline, slow))
+                for _ in range(slow_clients)] +
+               [threading.Thread(target=client, args=(base_url, cheap_url, deadline, cheap))
+                for _ in range(cheap_clients)])
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return slow, cheap
+
+
+def report(name, results, duration):
+    latencies = sorted(latency * 1000 for latency, _ in results)
+    errors = sum(1 for _, ok in results if not ok)
+    if not latencies:
+        print(f"  {name:<6} no requests completed")
+        return
+    print(f"  {name:<6} {len(results) / duration:8.1f} req/s  "
+          f"p50 {statistics.median(latencies):8.1f} ms  p95 {percentile(latencies, 0.95):8.1f} ms  "
+          f"p99 {percentile(latencies, 0.99):8.1f} ms  errors {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark threaded vs ASGI API servers')
+    parser.add_argument('servers', nargs='+', metavar='NAME=URL', help='servers to benchmark')
+    parser.add_argument('--duration', type=float, default=20, help='seconds per server')
+    parser.add_argument('--slow-clients', type=int, default=24, help='concurrent analytical clients')
+    parser.add_argument('--cheap-clients', type=int, default=4, help='concurrent cheap clients')
+    args = parser.parse_args()
+
+    print(f"{args.slow_clients} slow + {args.cheap_clients} cheap clients, {args.duration:.0f}s per server")
+    for server in args.servers:
+        name, base_url = server.split('=', 1)
+        # Warm up connections and pools before measuring
+        run(base_url.rstrip('/'), 2, args.slow_clients, args.cheap_clients)
+        slow, cheap = run(base_url.rstrip('/'), args.duration, args.slow_clients, args.cheap_clients)
+        print(f"\n{name} ({base_url})")
+        report('cheap', cheap, args.duration)
+        report('slow', slow, args.duration)
+
+
+if __name__ == '__main__':
+    main()
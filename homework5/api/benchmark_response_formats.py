@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark response size and latency of the spot list formats
+
+Compares the default row objects with ?shape=columns, each sent plain, gzip-
+and brotli-compressed, for a page of /api/spots and a day of
+/api/spots/export (NDJSON). Requests run in-process against the Flask app,
+so the times are server time (query, serialization and compression) without
+the network; the client time is decompressing and parsing the body.
+
+Usage:
+    python benchmark_response_formats.py [--since 2025-10-01] [--repeat 10]
+"""
+
+import argparse
+import gzip
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import brotli
+from psycopg2.extras import RealDictCursor
+
+import dx_api
+
+ENCODINGS = ['identity', 'gzip', 'br']
+
+
+def decode(body, encoding):
+    """Decompress a response body as a client would"""
+    if encoding == 'gzip':
+        return gzip.decompress(body)
+    if encoding == 'br':
+        return brotli.decompress(body)
+    return body
+
+
+def parse(text, ndjson):
+    if ndjson:
+        return [json.loads(line) for line in text.splitlines()]
+    return json.loads(text)
+
+
+def measure(client, url, encoding, repeat, ndjson=False):
+    """Median server and client milliseconds, and the response size in bytes"""
+    server_times, client_times = [], []
+    for _ in range(repeat):
+        dx_api.response_cache.clear()
+        start = time.perf_counter()
+        response = client.get(url, headers={'Accept-Encoding': encoding})
+        body = response.get_data()
+        # Returns the connection of a streamed export
+        response.close()
+        server_times.append((time.perf_counter() - start) * 1000)
+        start = time.perf_counter()
+        parse(decode(body, response.headers.get('Content-Encoding')), ndjson)
+        client_times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(server_times), statistics.median(client_times), len(body)
+
+
+def serialization_times(repeat):
+    """Median milliseconds to encode 1000 spots as rows and as columns"""
+    conn = dx_api.get_db_connection()
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(dx_api.RECENT_SPOTS_QUERY, (24 * 365, 1000))
+            rows = [dict(row) for row in cur.fetchall()]
+    finally:
+        dx_api.release_db_connection(conn)
+    results = {}
+    for shape in ('rows', 'columns'):
+        times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            dx_api.app.json.dumps(dx_api.spot_list(rows, shape))
+            times.append((time.perf_counter() - start) * 1000)
+        results[shape] = statistics.median(times)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark spot list response formats')
+    parser.add_argument('--since', default='2025-10-01', help='start of the spot page (YYYY-MM-DD)')
+    parser.add_argument('--repeat', type=int, default=10, help='requests per measurement')
+    args = parser.parse_args()
+
+    client = dx_api.app.test_client()
+    page = f'/api/spots?limit=1000&since={args.since}&order_by=timestamp&count=none'
+    until = (datetime.fromisoformat(args.since) + timedelta(days=1)).date().isoformat()
+    cases = [
+        ('1000 spots, rows', page, False),
+        ('1000 spots, columns', page + '&shape=columns', False),
+        ('1 day export, NDJSON', f'/api/spots/export?format=ndjson&since={args.since}&until={until}', True),
+    ]
+
+    print(f"{'Response':<24} {'Encoding':<9} {'Bytes':>10} {'Server ms':>10} {'Client ms':>10}")
+    for name, url, ndjson in cases:
+        for encoding in ENCODINGS:
+            server_ms, client_ms, size = measure(client, url, encoding, args.repeat, ndjson)
+            print(f"{name:<24} {encoding:<9} {size:>10,} {server_ms:>10.1f} {client_ms:>10.1f}")
+
+    times = serialization_times(args.repeat)
+    print(f"\nJSON encoding of 1000 spots: rows {times['rows']:.1f} ms, columns {times['columns']:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -36,6 +36,31 @@ def api_request(endpoint, params=None):
         print(f"API request error for {endpoint}: {e}")
         return None
 
+def api_batch(queries):
+    """
+    Fetch several endpoints in one request to /api/batch
+
+    Args:
+        queries: name -> (endpoint, params)
+
+    Returns:
+        name -> JSON response, or None for a query that failed
+    """
+    body = {'queries': [{'id': name, 'path': f"/api/{endpoint}", 'params': params or {}}
+                        for name, (endpoint, params) in queries.items()]}
+    try:
+        response = requests.post(f"{API_BASE_URL}/batch", json=body, timeout=10)
+        response.raise_for_status()
+        results = response.json()['results']
+    except requests.exceptions.RequestException as e:
+        print(f"API batch request error: {e}")
+        return {name: None for name in queries}
+    
+    for result in results:
+        if result['status'] != 200:
+            print(f"API request error for {result['path']}: {result['status']}")
+    return {result['id']: result['body'] if result['status'] == 200 else None for result in results}
+
 # Layout components
 header = dbc.Navbar(
     dbc.Container([
@@ -137,8 +162,18 @@ app.layout = html.Div([
 )
 def update_dashboard(n):
     try:
+        # Fetch every panel's data in one request; distinct station counts
+        # are approximate (HyperLogLog), which is much cheaper over all spots
+        data = api_batch({
+            'stats': ('stats', {'counts': 'approximate'}),
+            'activity': ('activity/hourly', {'hours': 24, 'counts': 'approximate'}),
+            'recent': ('spots/recent', {'hours': 1, 'limit': 10}),
+            'bands': ('bands', {'counts': 'approximate'}),
+            'frequency': ('frequency/histogram', {'bins': 20, 'edges': 'band', 'hours': 24})
+        })
+        
         # Get basic statistics
-        stats_data = api_request('stats')
+        stats_data = data['stats']
         if not stats_data:
             return generate_error_outputs("Failed to load statistics")
         
@@ -148,19 +183,19 @@ def update_dashboard(n):
         spots_today = stats_data['today']['spots_today']
         
         # Get hourly activity
-        activity_data = api_request('activity/hourly', {'hours': 24})
+        activity_data = data['activity']
         hourly_figure = create_hourly_activity_chart(activity_data)
         
         # Get recent spots
-        recent_data = api_request('spots/recent', {'hours': 1, 'limit': 10})
+        recent_data = data['recent']
         recent_table = create_recent_spots_table(recent_data)
         
         # Get band activity
-        bands_data = api_request('bands')
+        bands_data = data['bands']
         band_figure = create_band_activity_chart(bands_data)
         
         # Get frequency histogram
-        freq_data = api_request('frequency/histogram', {'bins': 30})
+        freq_data = data['frequency']
         freq_figure = create_frequency_histogram(freq_data)
         
         return (
@@ -371,9 +406,7 @@ def create_frequency_histogram(freq_data):
     spot_counts = []
     
     for bin_data in histogram:
-        bin_min = float(bin_data['bin_min_freq'])
-        bin_max = float(bin_data['bin_max_freq'])
-        bin_center = (bin_min + bin_max) / 2
+        bin_center = (bin_data['bin_start'] + bin_data['bin_end']) / 2
         bin_centers.append(bin_center)
         spot_counts.append(bin_data['spot_count'])
     
@@ -385,7 +418,7 @@ def create_frequency_histogram(freq_data):
             'marker': {'color': '#ff7f0e'}
         }],
         'layout': {
-            'title': 'Frequency Distribution',
+            'title': 'Frequency Distribution (last 24 hours)',
             'xaxis': {'title': 'Frequency (kHz)'},
             'yaxis': {'title': 'Number of Spots'},
             'template': 'plotly_dark',
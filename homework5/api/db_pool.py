@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+PostgreSQL connection pool for the DX Cluster API.
+
+Connections are opened on demand, kept open between requests and reused, so
+a request pays for the TCP and authentication handshake only when the pool
+has no idle connection. Callers that find every connection checked out wait
+up to a timeout for one to be returned (psycopg2.pool raises immediately and
+closes connections above minconn, which defeats reuse under load).
+
+Every checkout sets a transaction-local statement_timeout; connections are
+rolled back when they are returned, which also resets it.
+"""
+
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+from prometheus_client import Counter, Gauge, Histogram
+
+pool_wait_seconds = Histogram('dx_api_db_pool_wait_seconds', 'Time spent waiting for a pooled database connection',
+                              ['pool'], buckets=[0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0])
+pool_in_use = Gauge('dx_api_db_pool_in_use', 'Pooled database connections checked out', ['pool'])
+pool_open = Gauge('dx_api_db_pool_open', 'Open pooled database connections (idle and in use)', ['pool'])
+pool_size = Gauge('dx_api_db_pool_size', 'Maximum pooled database connections', ['pool'])
+pool_waiting = Gauge('dx_api_db_pool_waiting', 'Requests waiting for a pooled database connection', ['pool'])
+pool_timeouts = Counter('dx_api_db_pool_timeouts_total',
+                        'Requests that gave up waiting for a pooled database connection', ['pool'])
+
+
+class PoolTimeout(psycopg2.pool.PoolError):
+    """No connection became free within the pool timeout"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of up to `size` connections to one database"""
+
+    def __init__(self, name, size, timeout, *connect_args, **connect_kwargs):
+        self.name = name
+        self.size = size
+        self.timeout = timeout
+        self.last_error = None
+        self._connect_args = connect_args
+        self._connect_kwargs = connect_kwargs
+        self._idle = []  # LIFO: the most recently used connection is reused first
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(size)
+        self._in_use = 0
+        self._open = 0
+        pool_size.labels(name).set(size)
+        pool_waiting.labels(name).set(0)
+        pool_timeouts.labels(name)
+
+    def getconn(self, statement_timeout=None):
+        """
+        Check out a connection, waiting up to the pool timeout for a free one.
+
+        Args:
+            statement_timeout: statement_timeout in milliseconds for this checkout
+
+        Raises:
+            PoolTimeout: every connection stayed busy for the whole timeout
+            psycopg2.Error: a new connection could not be opened
+        """
+        start = time.perf_counter()
+        if not self._slots.acquire(blocking=False):
+            pool_waiting.labels(self.name).inc()
+            try:
+                acquired = self._slots.acquire(timeout=self.timeout)
+            finally:
+                pool_waiting.labels(self.name).dec()
+            if not acquired:
+                pool_timeouts.labels(self.name).inc()
+                raise PoolTimeout(f"No free connection in the {self.name} pool after {self.timeout}s")
+        pool_wait_seconds.labels(self.name).observe(time.perf_counter() - start)
+        return self._checkout(statement_timeout)
+
+    def putconn(self, conn):
+        """Return a connection, rolling back its transaction (or closing it if broken)"""
+        try:
+            status = conn.info.transaction_status if not conn.closed else None
+            if status == psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                self._return_idle(conn)
+            elif status in (psycopg2.extensions.TRANSACTION_STATUS_INTRANS,
+                            psycopg2.extensions.TRANSACTION_STATUS_INERROR):
+                conn.rollback()
+                self._return_idle(conn)
+            else:
+                self._discard(conn)
+        except psycopg2.Error:
+            self._discard(conn)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+                self._update_gauges()
+            self._slots.release()
+
+    def ping(self, query='SELECT 1', statement_timeout=5000):
+        """
+        Run a query for a health check without waiting for or adding a connection.
+
+        Uses an idle connection (or opens the first one if the pool is empty).
+        If every open connection is checked out, nothing is run: the database
+        is evidently in use.
+
+        Returns:
+            first column of the result, or None when every connection is busy
+
+        Raises:
+            psycopg2.Error: the database could not be reached
+        """
+        if not self._slots.acquire(blocking=False):
+            return None
+        with self._lock:
+            busy = not self._idle and self._open > 0
+        if busy:
+            self._slots.release()
+            return None
+        conn = self._checkout(statement_timeout)
+        try:
+            with conn.cursor() as cur:
+                cur.execute(query)
+                value = cur.fetchone()[0]
+        finally:
+            self.putconn(conn)
+        return value
+
+    def stats(self):
+        """Pool occupancy for the health endpoint"""
+        with self._lock:
+            return {'size': self.size, 'open': self._open, 'in_use': self._in_use,
+                    'idle': len(self._idle)}
+
+    def closeall(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._update_gauges()
+        for conn in idle:
+            conn.close()
+
+    def _checkout(self, statement_timeout):
+        """Take an idle (or new) connection for a slot already acquired"""
+        try:
+            while True:
+                with self._lock:
+                    conn = self._idle.pop() if self._idle else None
+                fresh = conn is None
+                if fresh:
+                    conn = self._connect()
+                try:
+                    with conn.cursor() as cur:
+                        cur.execute("SET LOCAL statement_timeout = %s", (int(statement_timeout or 0),))
+                    break
+                except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                    # Dropped while idle (e.g. server restart); try the next one
+                    self._discard(conn)
+                    if fresh:
+                        self.last_error = str(e)
+                        raise
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self._in_use += 1
+            self._update_gauges()
+        return conn
+
+    def _connect(self):
+        try:
+            conn = psycopg2.connect(*self._connect_args, **self._connect_kwargs)
+        except psycopg2.Error as e:
+            self.last_error = str(e)
+            raise
+        self.last_error = None
+        with self._lock:
+            self._open += 1
+        return conn
+
+    def _return_idle(self, conn):
+        with self._lock:
+            self._idle.append(conn)
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        with self._lock:
+            self._open -= 1
+            self._update_gauges()
+
+    def _update_gauges(self):
+        pool_in_use.labels(self.name).set(self._in_use)
+        pool_open.labels(self.name).set(self._open)
@@ -6,18 +6,52 @@ A REST API for querying DX cluster spot data from PostgreSQL database.
 Provides endpoints for statistics, spot data, and filtering capabilities.
 """
 
+import base64
+import csv
+import functools
+import io
+import itertools
+import math
 import os
 import sys
-from datetime import datetime, timedelta
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 import json
-from flask import Flask, jsonify, request, abort, send_from_directory
+import numpy as np
+from flask import (Flask, Response, jsonify, request, abort, send_from_directory, g, has_app_context,
+                   has_request_context, make_response, stream_with_context)
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import psycopg2
+from psycopg2.errors import QueryCanceled
+import pyarrow as pa
+from werkzeug.datastructures import MultiDict
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
 from psycopg2.extras import RealDictCursor
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from dotenv import load_dotenv
 import logging
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import columnar
+import compression
+import geo
+import guardrails
+import heavy_hitters
+import hyperloglog
+import mof
+import recent_spots
+import request_metrics
+import spot_archive
+from db_pool import ConnectionPool, PoolTimeout
+from response_cache import ResponseCache, cache_requests
+from spot_feed import SpotFeed
+
 # Load environment variables
 load_dotenv()
 
@@ -29,6 +63,18 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all domains
 
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider that adds its encoding time to the request's serialization metric"""
+    def dumps(self, obj, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            request_metrics.record('serialize', time.perf_counter() - start)
+
+app.json = TimedJSONProvider(app)
+
 # Database configuration
 DB_CONFIG = {
     'host': os.getenv('PGHOST', 'localhost'),
@@ -38,6 +84,216 @@ DB_CONFIG = {
     'port': os.getenv('PGPORT', '5432')
 }
 
+# Optional read-only replica for analytical queries, as a libpq connection
+# string (e.g. "host=replica.example.org dbname=dx_analysis user=dx_reader")
+REPLICA_DSN = os.getenv('PGREPLICA_DSN')
+# The replica is skipped while it is more than this many seconds behind
+REPLICA_MAX_LAG = float(os.getenv('PGREPLICA_MAX_LAG', '30'))
+# After a failed replica connection, use the primary for this many seconds
+REPLICA_RETRY_SECONDS = 30
+
+# Query classes: live queries always run on the primary so recent data is never
+# stale; analytical queries run on the replica when it is configured and current
+LIVE = 'live'
+ANALYTICS = 'analytics'
+
+# Connections per pool in each worker process, and how long (seconds) a
+# request waits for a free one before failing
+POOL_SIZE = int(os.getenv('PGPOOL_SIZE', '10'))
+POOL_TIMEOUT = float(os.getenv('PGPOOL_TIMEOUT', '10'))
+# statement_timeout (milliseconds) set on every checkout, by query class
+STATEMENT_TIMEOUTS = {
+    LIVE: int(os.getenv('PG_STATEMENT_TIMEOUT', '10000')),
+    ANALYTICS: int(os.getenv('PG_ANALYTICS_STATEMENT_TIMEOUT', '60000'))
+}
+# Endpoints with a statement_timeout of their own, replacing their query
+# class's; PG_ENDPOINT_STATEMENT_TIMEOUTS ("route=ms,route=ms") adds or overrides
+ENDPOINT_STATEMENT_TIMEOUTS = {
+    '/api/spots': 5000,
+    '/api/spots/recent': 5000,
+    '/api/spots/near': 5000,
+    '/api/spots/bbox': 5000,
+    '/api/frequency/histogram': 30000,
+    '/api/callsigns/top': 30000,
+    **{route: int(timeout) for route, timeout
+       in guardrails.parse_limits(os.getenv('PG_ENDPOINT_STATEMENT_TIMEOUTS')).items()}
+}
+STATEMENT_TIMEOUT_MESSAGE = "Query exceeded this endpoint's time limit; narrow the time range or filters"
+
+# Highest planner cost estimate of a /api/spots page: pricier pages are refused
+# (413) before they run, and pricier exact counts are replaced by estimates.
+# With 1M spots, indexed pages cost under 250 (a few ms); a rare
+# comment_contains pattern costs about 26000 (a one second scan)
+QUERY_COST_BUDGET = float(os.getenv('API_QUERY_COST_BUDGET', '10000'))
+
+# Requests per second, and burst size, allowed per client (X-API-Key header,
+# or IP address) in each worker; 0 disables rate limiting
+RATE_LIMIT = float(os.getenv('API_RATE_LIMIT', '10'))
+RATE_BURST = int(os.getenv('API_RATE_BURST', '40'))
+# Monitoring endpoints are never rate limited
+RATE_LIMIT_EXEMPT = {'/api/health', '/metrics'}
+
+# Aggregate responses are cached per worker until the ingest watermark moves,
+# for at most API_CACHE_TTL seconds (some aggregates are relative to NOW())
+CACHE_SIZE = int(os.getenv('API_CACHE_SIZE', '256'))
+CACHE_TTL = float(os.getenv('API_CACHE_TTL', '60'))
+# max-age sent to clients; with 0 they revalidate (If-None-Match) on every request
+CACHE_MAX_AGE = int(os.getenv('API_CACHE_MAX_AGE', '0'))
+# Seconds one watermark reading is shared by concurrent requests
+WATERMARK_INTERVAL = 1.0
+
+# Seconds of replay lag on a standby (0 when fully replayed or not a standby)
+REPLICA_LAG_QUERY = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())::float8,
+                      'Infinity'::float8)
+    END
+"""
+
+# Lowest and highest spot id, both read from the primary key index
+INGEST_WATERMARK_QUERY = "SELECT MIN(id), MAX(id) FROM dx_spots"
+
+_replica_retry_at = 0.0
+
+# Pools open connections on first use, so importing the app never connects.
+# Their cursors report query time and rows to the request metrics.
+primary_pool = ConnectionPool('primary', POOL_SIZE, POOL_TIMEOUT,
+                              connection_factory=request_metrics.TimedConnection, **DB_CONFIG)
+replica_pool = (ConnectionPool('replica', POOL_SIZE, POOL_TIMEOUT, REPLICA_DSN, connect_timeout=3,
+                               connection_factory=request_metrics.TimedConnection)
+                if REPLICA_DSN else None)
+
+# Pool of every checked-out connection, by id()
+_connection_pools = {}
+
+response_cache = ResponseCache(CACHE_SIZE, CACHE_TTL)
+rate_limiter = guardrails.RateLimiter(RATE_LIMIT, RATE_BURST) if RATE_LIMIT > 0 else None
+# Last ingest watermark and when it was read (time.monotonic())
+_watermark = (None, 0.0)
+
+# Columns returned for every spot row
+SPOT_COLUMNS = """
+    id, timestamp, dx_call, frequency, spotter_call,
+    comment, mode, signal_report, grid_square, band,
+    dx_country, dx_lat, dx_lon, spotter_country, spotter_lat, spotter_lon,
+    maidenhead_to_lat(grid_square) AS grid_lat, maidenhead_to_lon(grid_square) AS grid_lon
+"""
+
+# Output names of SPOT_COLUMNS (the alias of computed columns), used to read the archive
+SPOT_FIELDS = [column.split()[-1] for column in SPOT_COLUMNS.split(',')]
+
+# SELECT expression of each spot field
+SPOT_EXPRESSIONS = {column.split()[-1]: column.strip() for column in SPOT_COLUMNS.split(',')}
+
+# Spot fields sent as indexes into a list of their distinct values by ?shape=columns
+DICTIONARY_FIELDS = ('band', 'mode')
+
+# Types of the spot fields in Arrow and Parquet responses
+SPOT_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('timestamp', pa.timestamp('us', tz='UTC')),
+    ('dx_call', pa.string()),
+    ('frequency', pa.float64()),
+    ('spotter_call', pa.string()),
+    ('comment', pa.string()),
+    ('mode', columnar.CATEGORY_TYPE),
+    ('signal_report', pa.string()),
+    ('grid_square', pa.string()),
+    ('band', columnar.CATEGORY_TYPE),
+    ('dx_country', pa.string()),
+    ('dx_lat', pa.float64()),
+    ('dx_lon', pa.float64()),
+    ('spotter_country', pa.string()),
+    ('spotter_lat', pa.float64()),
+    ('spotter_lon', pa.float64()),
+    ('grid_lat', pa.float64()),
+    ('grid_lon', pa.float64())
+])
+
+# Frequency histogram: most bins, bin edges, and bins per band of
+# hourly_frequency_bins (must match migration 014)
+HISTOGRAM_MAX_BINS = 200
+HISTOGRAM_EDGES = ('uniform', 'band')
+FREQUENCY_FINE_BINS = 100
+
+# Types of the frequency histogram bins in Arrow and Parquet responses
+HISTOGRAM_SCHEMA = pa.schema([
+    ('bin_number', pa.int32()),
+    ('band', columnar.CATEGORY_TYPE),
+    ('bin_start', pa.float64()),
+    ('bin_end', pa.float64()),
+    ('spot_count', pa.int64())
+])
+
+# Bulk export formats and their content types
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    **columnar.COLUMNAR_FORMATS
+}
+# Rows fetched from the server-side cursor, and written per chunk, when exporting
+EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '2000'))
+
+# Longest window (hours) and most rows of the /api/stats/* endpoints
+STATS_MAX_HOURS = 168
+STATS_MAX_LIMIT = 500
+
+# /api/activity/cube: default and longest date range (days), groupings,
+# array encodings and metrics
+CUBE_DEFAULT_DAYS = 7
+CUBE_MAX_DAYS = 366
+CUBE_GROUPINGS = ('band', 'band_mode')
+CUBE_ENCODINGS = ('list', 'base64')
+CUBE_METRICS = ('spot_count', 'unique_dx', 'unique_spotters')
+
+# Map queries: stored coordinates searched by location=dx|spotter, and the
+# largest radius (km) of /api/spots/near
+SPOT_LOCATIONS = {'dx': ('dx_lat', 'dx_lon'), 'spotter': ('spotter_lat', 'spotter_lon')}
+NEAR_DEFAULT_RADIUS_KM = 500
+NEAR_MAX_RADIUS_KM = 5000
+
+# /api/paths: most paths per response, and vertices per path polyline
+PATHS_MAX_LIMIT = 5000
+PATHS_DEFAULT_POINTS = 32
+PATHS_MAX_POINTS = 128
+
+# Live spot stream: seconds between polls for new spots, recent spots kept for
+# clients resuming with Last-Event-ID, and undelivered spots buffered per client
+SPOT_STREAM_POLL_INTERVAL = float(os.getenv('SPOT_STREAM_POLL_INTERVAL', '0.5'))
+SPOT_STREAM_HISTORY = int(os.getenv('SPOT_STREAM_HISTORY', '5000'))
+SPOT_STREAM_BUFFER = int(os.getenv('SPOT_STREAM_BUFFER', '1000'))
+# Every open stream holds a gunicorn thread: streams allowed per worker, and
+# seconds after which a stream is closed for the client to reconnect
+SPOT_STREAM_MAX_CLIENTS = int(os.getenv('SPOT_STREAM_MAX_CLIENTS', '4'))
+SPOT_STREAM_MAX_SECONDS = float(os.getenv('SPOT_STREAM_MAX_SECONDS', '300'))
+# Seconds between keep-alive comments on a quiet stream
+SPOT_STREAM_KEEPALIVE = 15
+
+# In-process buffer answering recent spot requests: hours of spots kept per
+# worker (0 turns it off) and most spots kept
+RECENT_SPOTS_HOURS = float(os.getenv('RECENT_SPOTS_HOURS', '6'))
+RECENT_SPOTS_MAX = int(os.getenv('RECENT_SPOTS_MAX', '100000'))
+
+# Top callsigns: counters per Space-Saving summary (a count is off by at most
+# 1/CALLSIGN_SKETCH_SIZE of the spots in its window), and the windows that may
+# ask for exact counts from SQL instead
+CALLSIGN_SKETCH_SIZE = int(os.getenv('CALLSIGN_SKETCH_SIZE', '1000'))
+CALLSIGN_EXACT_WINDOWS = set(os.getenv('CALLSIGN_EXACT_WINDOWS', '1h,24h').split(','))
+
+# Endpoints that /api/batch can run, most sub-queries per batch, and threads
+# per worker running sub-queries (each holds a pooled connection while it runs)
+BATCH_PATHS = {
+    '/api/health', '/api/stats', '/api/stats/bands', '/api/stats/top-dx', '/api/stats/top-spotters',
+    '/api/stats/propagation', '/api/spots', '/api/spots/recent', '/api/spots/near', '/api/spots/bbox',
+    '/api/paths', '/api/bands', '/api/frequency/histogram',
+    '/api/activity/hourly', '/api/activity/cube', '/api/propagation/daily', '/api/callsigns/top',
+    '/api/callsigns/resolve', '/api/mof'
+}
+BATCH_MAX_QUERIES = 16
+BATCH_WORKERS = int(os.getenv('API_BATCH_WORKERS', '4'))
+
 class DateTimeEncoder(json.JSONEncoder):
     """Custom JSON encoder for datetime and decimal objects"""
     def default(self, obj):
@@ -47,14 +303,119 @@ class DateTimeEncoder(json.JSONEncoder):
             return float(obj)
         return super().default(obj)
 
-def get_db_connection():
-    """Get database connection with error handling"""
+def get_db_connection(query_class=LIVE):
+    """
+    Get a pooled database connection with error handling
+
+    Analytical queries use the read replica when one is configured and it is
+    within REPLICA_MAX_LAG of the primary; live queries and any replica
+    problem fall back to the primary. The connection's statement_timeout is
+    the endpoint's own, or the query class's. Return it with release_db_connection(); any
+    connection a request does not release is returned when the request ends.
+    """
+    if query_class == ANALYTICS and replica_pool:
+        conn = get_replica_connection()
+        if conn:
+            return track_connection(conn, replica_pool)
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        return conn
+        conn = primary_pool.getconn(statement_timeout(query_class))
     except Exception as e:
         logger.error(f"Database connection error: {e}")
         return None
+    if has_app_context() and g.get('batch_snapshot'):
+        join_snapshot(conn, g.batch_snapshot, statement_timeout(query_class))
+    return track_connection(conn, primary_pool)
+
+def statement_timeout(query_class):
+    """statement_timeout (milliseconds) of the current endpoint, or of the query class"""
+    if has_request_context() and request.url_rule:
+        return ENDPOINT_STATEMENT_TIMEOUTS.get(request.url_rule.rule, STATEMENT_TIMEOUTS[query_class])
+    return STATEMENT_TIMEOUTS[query_class]
+
+def track_connection(conn, pool):
+    """Remember which pool a connection belongs to and which request holds it"""
+    _connection_pools[id(conn)] = pool
+    if has_app_context():
+        g.setdefault('db_connections', []).append(conn)
+    return conn
+
+def release_db_connection(conn):
+    """Return a connection to its pool (safe to call more than once)"""
+    pool = _connection_pools.pop(id(conn), None)
+    if pool:
+        pool.putconn(conn)
+
+@app.teardown_appcontext
+def release_request_connections(exception):
+    """Return connections a request did not release, e.g. after an error"""
+    for conn in g.pop('db_connections', []):
+        release_db_connection(conn)
+
+def export_snapshot():
+    """
+    Start a repeatable-read transaction on the primary and export its snapshot.
+
+    Returns:
+        (connection, snapshot id); the snapshot can be imported until the
+        connection is released. (None, None) if it could not be exported.
+    """
+    conn = get_db_connection()
+    if not conn:
+        return None, None
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            cur.execute("SELECT pg_export_snapshot()")
+            return conn, cur.fetchone()[0]
+    except psycopg2.Error as e:
+        logger.warning(f"Could not export batch snapshot: {e}")
+        release_db_connection(conn)
+        return None, None
+
+def join_snapshot(conn, snapshot, statement_timeout):
+    """Run a freshly checked-out primary connection's transaction in an exported snapshot"""
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            cur.execute("SET TRANSACTION SNAPSHOT %s", (snapshot,))
+    except psycopg2.Error as e:
+        # E.g. the exporting transaction has ended: query the current state instead
+        logger.warning(f"Could not use batch snapshot: {e}")
+        conn.rollback()
+        with conn.cursor() as cur:
+            cur.execute("SET LOCAL statement_timeout = %s", (statement_timeout,))
+
+def replica_lag(conn):
+    """Replication lag of a replica connection in seconds"""
+    with conn.cursor() as cur:
+        cur.execute(REPLICA_LAG_QUERY)
+        return float(cur.fetchone()[0])
+
+def get_replica_connection():
+    """Check out a replica connection, or return None if it is down, busy or lagging"""
+    global _replica_retry_at
+    if time.monotonic() < _replica_retry_at:
+        return None
+    try:
+        conn = replica_pool.getconn(statement_timeout(ANALYTICS))
+    except PoolTimeout as e:
+        logger.warning(f"{e}, using primary")
+        return None
+    except Exception as e:
+        logger.warning(f"Replica connection error, using primary: {e}")
+        _replica_retry_at = time.monotonic() + REPLICA_RETRY_SECONDS
+        return None
+    try:
+        lag = replica_lag(conn)
+    except Exception as e:
+        logger.warning(f"Replica lag check failed, using primary: {e}")
+        replica_pool.putconn(conn)
+        return None
+    if lag > REPLICA_MAX_LAG:
+        logger.warning(f"Replica is {lag:.0f}s behind, using primary")
+        replica_pool.putconn(conn)
+        return None
+    return conn
 
 def validate_parameters(params, allowed_params):
     """Validate request parameters"""
@@ -62,6 +423,224 @@ def validate_parameters(params, allowed_params):
     if invalid_params:
         abort(400, description=f"Invalid parameters: {', '.join(invalid_params)}")
 
+def stats_window(params, allowed_params):
+    """Validate a windowed statistics request and return its 'hours' window (default 24)"""
+    validate_parameters(params, allowed_params)
+    try:
+        hours = int(params.get('hours', 24))
+    except ValueError:
+        abort(400, description="Parameter 'hours' must be an integer")
+    if not 1 <= hours <= STATS_MAX_HOURS:
+        abort(400, description=f"Parameter 'hours' must be between 1 and {STATS_MAX_HOURS}")
+    return hours
+
+def stats_limit(params):
+    """Number of rows requested from a top-N statistics endpoint (default 20)"""
+    try:
+        limit = int(params.get('limit', 20))
+    except ValueError:
+        abort(400, description="Parameter 'limit' must be an integer")
+    if not 1 <= limit <= STATS_MAX_LIMIT:
+        abort(400, description=f"Parameter 'limit' must be between 1 and {STATS_MAX_LIMIT}")
+    return limit
+
+def response_format(params):
+    """Response format of an aggregate endpoint: 'json' (default), 'arrow' or 'parquet'"""
+    requested = params.get('format', 'json')
+    if requested != 'json' and requested not in columnar.COLUMNAR_FORMATS:
+        abort(400, description=f"Invalid format. Allowed: json, {', '.join(columnar.COLUMNAR_FORMATS)}")
+    return requested
+
+def response_shape(params):
+    """Layout of a spot list: 'rows' (default, one object per spot) or 'columns'"""
+    shape = params.get('shape', 'rows')
+    if shape not in ('rows', 'columns'):
+        abort(400, description="Invalid shape. Use 'rows' or 'columns'")
+    return shape
+
+def spot_columns(spots):
+    """
+    Spots as one list per field, for ?shape=columns.
+
+    Band and mode are dictionary-encoded: their lists hold indexes into the
+    returned dictionaries (null stays null).
+
+    Returns:
+        (columns, dictionaries)
+    """
+    columns = {field: [spot.get(field) for spot in spots] for field in SPOT_FIELDS}
+    dictionaries = {}
+    for field in DICTIONARY_FIELDS:
+        codes = {}
+        columns[field] = [None if value is None else codes.setdefault(value, len(codes))
+                          for value in columns[field]]
+        dictionaries[field] = list(codes)
+    return columns, dictionaries
+
+def spot_list(spots, shape):
+    """Response fields holding a list of spots in the requested shape"""
+    if shape == 'columns':
+        columns, dictionaries = spot_columns(spots)
+        return {'columns': columns, 'dictionaries': dictionaries}
+    return {'spots': spots}
+
+def columnar_response(rows, description, columnar_format, name, categorical=()):
+    """Arrow IPC stream or Parquet file of a query result, typed from its cursor description"""
+    schema = columnar.schema_from_description(description, categorical)
+    return schema_response(rows, schema, columnar_format, name)
+
+def schema_response(rows, schema, columnar_format, name):
+    """Arrow IPC stream or Parquet file of dict rows with a fixed schema"""
+    return Response(columnar.encode_table(rows, schema, columnar_format),
+                    mimetype=columnar.COLUMNAR_FORMATS[columnar_format],
+                    headers={'Content-Disposition': f'attachment; filename="{name}.{columnar_format}"'})
+
+def ingest_watermark():
+    """
+    (lowest, highest) spot id on the primary, or None if it cannot be read.
+
+    Moves whenever the scraper commits spots or the archiver removes old ones.
+    Both ends are read from the primary key index.
+    """
+    global _watermark
+    value, read_at = _watermark
+    if value is not None and time.monotonic() - read_at < WATERMARK_INTERVAL:
+        return value
+    conn = get_db_connection()
+    if not conn:
+        return None
+    try:
+        with conn.cursor() as cur:
+            cur.execute(INGEST_WATERMARK_QUERY)
+            value = tuple(cur.fetchone())
+    except Exception as e:
+        logger.warning(f"Could not read ingest watermark, not caching: {e}")
+        return None
+    finally:
+        release_db_connection(conn)
+    _watermark = (value, time.monotonic())
+    return value
+
+def cached_response(view):
+    """
+    Serve an aggregate endpoint from the response cache while no spots change.
+
+    The cache key is the path and the sorted query parameters. Responses get
+    a strong ETag and Cache-Control; a matching If-None-Match returns 304.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        # Read before computing: a response is never older than its watermark
+        watermark = ingest_watermark()
+        if watermark is None:
+            cache_requests.labels(request.url_rule.rule, 'bypass').inc()
+            return view(*args, **kwargs)
+        
+        key = (request.path, tuple(sorted(request.args.items(multi=True))))
+        entry = response_cache.get(key, watermark)
+        if entry:
+            cache_requests.labels(request.url_rule.rule, 'hit').inc()
+        else:
+            cache_requests.labels(request.url_rule.rule, 'miss').inc()
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            headers = {name: value for name, value in response.headers.items()
+                       if name == 'Content-Disposition'}
+            entry = response_cache.put(key, watermark, response.get_data(), response.content_type, headers)
+        
+        response = Response(entry.body, content_type=entry.content_type, headers=entry.headers)
+        response.set_etag(entry.etag)
+        response.cache_control.public = True
+        if CACHE_MAX_AGE:
+            response.cache_control.max_age = CACHE_MAX_AGE
+        else:
+            response.cache_control.no_cache = True
+        return response.make_conditional(request)
+    return wrapper
+
+def client_key(api_key, remote_addr):
+    """Rate limiting key of a client: its API key, or its address"""
+    return f'key:{api_key}' if api_key else f'ip:{remote_addr}'
+
+def check_rate_limit(route, client):
+    """Abort with 429 (and Retry-After) when a client has used up its rate limit"""
+    if not rate_limiter or route in RATE_LIMIT_EXEMPT:
+        return
+    wait = rate_limiter.acquire(client)
+    if wait:
+        guardrails.guardrail_events.labels(route, 'rate_limited').inc()
+        retry_after = math.ceil(wait)
+        abort(429, description=f"Rate limit of {RATE_LIMIT:g} requests per second exceeded; "
+                               f"retry after {retry_after}s", retry_after=retry_after)
+
+def check_query_cost(cur, query, params):
+    """
+    Planner cost estimate of a query (EXPLAIN, not run), recorded per route.
+
+    Callers compare it with QUERY_COST_BUDGET to refuse or downgrade the query.
+    """
+    cost = guardrails.explain(cur, query, params)['Total Cost']
+    guardrails.query_cost.labels(request.url_rule.rule).observe(cost)
+    return cost
+
+@app.before_request
+def start_request_metrics():
+    request_metrics.begin(request.url_rule.rule if request.url_rule else None)
+
+# Runs after start_request_metrics, so refused requests are measured too
+@app.before_request
+def limit_request_rate():
+    route = request.url_rule.rule if request.url_rule else request_metrics.UNMATCHED
+    check_rate_limit(route, client_key(request.headers.get('X-API-Key'), request.remote_addr))
+
+# Registered before compress_response so it runs after it (Flask runs
+# after_request functions in reverse order) and counts the bytes sent
+@app.after_request
+def finish_request_metrics(response):
+    """Record the request's metrics when the response has been sent (closed)"""
+    timing = request_metrics.current()
+    if timing is None:
+        return response
+    if response.is_streamed:
+        response.response = request_metrics.count_bytes(response.response, timing)
+    else:
+        timing.bytes = response.content_length or 0
+    method, status = request.method, response.status_code
+    response.call_on_close(lambda: timing.finish(method, status))
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Compress JSON, NDJSON and CSV bodies with the best encoding the client accepts"""
+    if response.mimetype not in compression.COMPRESSIBLE_TYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = compression.negotiate(request.headers.get('Accept-Encoding'))
+    if encoding is None or 'Content-Encoding' in response.headers:
+        return response
+    
+    # Compressed and plain bodies share the ETag, which is then only weak
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    if response.status_code in (204, 304):
+        return response
+    
+    if response.is_streamed:
+        response.response = compression.compress_chunks(response.response, encoding)
+        response.direct_passthrough = False
+        response.headers.pop('Content-Length', None)
+    else:
+        body = response.get_data()
+        if len(body) < compression.MIN_SIZE:
+            return response
+        start = time.perf_counter()
+        response.set_data(compression.compress(body, encoding))
+        request_metrics.record('compress', time.perf_counter() - start)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
 @app.errorhandler(400)
 def bad_request(error):
     return jsonify({'error': 'Bad request', 'message': str(error.description)}), 400
@@ -70,70 +649,227 @@ def bad_request(error):
 def not_found(error):
     return jsonify({'error': 'Not found', 'message': 'Endpoint not found'}), 404
 
+@app.errorhandler(413)
+def query_too_expensive(error):
+    return jsonify({'error': 'Request too large', 'message': str(error.description)}), 413
+
+@app.errorhandler(429)
+def too_many_requests(error):
+    headers = [(name, value) for name, value in error.get_headers() if name == 'Retry-After']
+    return jsonify({'error': 'Too many requests', 'message': str(error.description)}), 429, headers
+
 @app.errorhandler(500)
 def internal_error(error):
+    # A query cancelled by its statement_timeout is the client's to narrow
+    cause = getattr(error, 'original_exception', None) or error.__context__
+    if isinstance(cause, QueryCanceled):
+        route = request.url_rule.rule if request.url_rule else request_metrics.UNMATCHED
+        guardrails.guardrail_events.labels(route, 'statement_timeout').inc()
+        return jsonify({'error': 'Service unavailable', 'message': STATEMENT_TIMEOUT_MESSAGE}), 503
     return jsonify({'error': 'Internal server error', 'message': 'Database or server error'}), 500
 
+@app.errorhandler(503)
+def service_unavailable(error):
+    return jsonify({'error': 'Service unavailable', 'message': str(error.description)}), 503
+
 @app.route('/api/health')
 def health_check():
-    """Health check endpoint"""
-    conn = get_db_connection()
-    if conn:
-        conn.close()
-        return jsonify({'status': 'healthy', 'database': 'connected'})
-    else:
-        return jsonify({'status': 'unhealthy', 'database': 'disconnected'}), 500
+    """Health check endpoint (uses an idle pooled connection, never waits for one)"""
+    try:
+        primary_pool.ping()
+    except Exception as e:
+        logger.error(f"Database health check failed: {e}")
+        return jsonify({'status': 'unhealthy', 'database': 'disconnected',
+                        'pool': primary_pool.stats()}), 500
+    return jsonify({'status': 'healthy', 'database': 'connected',
+                    'pool': primary_pool.stats(), 'replica': replica_status(),
+                    'cache': response_cache.stats(), 'spot_feed': spot_feed.stats(),
+                    'callsign_sketches': callsign_sketches.stats(), 'mof': mof_tracker.stats(),
+                    'recent_spots': recent_buffer.stats()})
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics (per-route latency, rows and bytes; pool and cache usage; MOF)"""
+    # Scrapes only read the tracker: it is started by the first /api/mof request
+    if mof_tracker.ready:
+        mof_tracker.update_gauges()
+    return Response(generate_latest(), headers={'Content-Type': CONTENT_TYPE_LATEST})
+
+def replica_status():
+    """Replica state reported by the health check"""
+    if not replica_pool:
+        return {'status': 'not configured'}
+    try:
+        lag = replica_pool.ping(REPLICA_LAG_QUERY)
+    except Exception:
+        return {'status': 'disconnected', 'pool': replica_pool.stats()}
+    # lag is None when every replica connection is busy serving requests
+    lagging = lag is not None and float(lag) > REPLICA_MAX_LAG
+    return {
+        'status': 'lagging' if lagging else 'connected',
+        'lag_seconds': None if lag is None or float(lag) == float('inf') else round(float(lag), 1),
+        'pool': replica_pool.stats()
+    }
+
+STATS_TOTAL_QUERY = """
+    SELECT 
+        COUNT(*) as total_spots,
+        COUNT(DISTINCT dx_call) as unique_dx_stations,
+        COUNT(DISTINCT spotter_call) as unique_spotters,
+        MIN(timestamp) as earliest_spot,
+        MAX(timestamp) as latest_spot
+    FROM dx_spots
+"""
+
+STATS_TODAY_QUERY = """
+    SELECT 
+        COUNT(*) as spots_today,
+        COUNT(DISTINCT dx_call) as dx_stations_today,
+        COUNT(DISTINCT spotter_call) as spotters_today
+    FROM dx_spots 
+    WHERE DATE(timestamp) = CURRENT_DATE
+"""
+
+STATS_RECENT_QUERY = """
+    SELECT 
+        COUNT(*) as spots_last_hour,
+        COUNT(DISTINCT spotter_call) as active_spotters
+    FROM dx_spots 
+    WHERE timestamp >= NOW() - INTERVAL '1 hour'
+"""
+
+STATS_RANGE_QUERY = """
+    SELECT 
+        MIN(timestamp) as earliest_spot,
+        MAX(timestamp) as latest_spot,
+        CURRENT_DATE::timestamptz as today
+    FROM dx_spots
+"""
+
+# Approximate distinct counts (counts=approximate) merge the HyperLogLog
+# sketches of the months, days and hours since %(since)s (band_sketches(),
+# migration 013) with bit_or in the database; only the number of
+# registers at each level of each merged sketch is returned
+SKETCH_COLUMNS = """
+        COALESCE(SUM(spot_count), 0)::integer as spot_count,
+        MIN(min_frequency) as min_frequency,
+        MAX(max_frequency) as max_frequency,
+        MAX(latest_spot) as latest_spot,
+        hll_level_counts(bit_or(dx_levels)) as dx_level_counts,
+        hll_level_counts(bit_or(spotter_levels)) as spotter_level_counts
+"""
+
+SKETCH_TOTALS_QUERY = f"""
+    SELECT {SKETCH_COLUMNS}
+    FROM band_sketches(%(since)s)
+"""
+
+BAND_SKETCHES_QUERY = f"""
+    SELECT band, {SKETCH_COLUMNS}
+    FROM band_sketches(%(since)s)
+    WHERE band <> ''
+    GROUP BY band
+    ORDER BY spot_count DESC
+"""
+
+# Per hour: without the day and month rollups
+HOURLY_SKETCHES_QUERY = f"""
+    SELECT start_time as hour, {SKETCH_COLUMNS}
+    FROM band_sketches(%(since)s, false)
+    GROUP BY start_time
+    ORDER BY start_time
+"""
+
+def exact_counts(params, default='exact'):
+    """Whether a request asks for exact counts (counts=exact) rather than approximate ones"""
+    counts = params.get('counts', default)
+    if counts not in ('approximate', 'exact'):
+        abort(400, description="Invalid counts. Use 'approximate' or 'exact'")
+    return counts == 'exact'
+
+def approximate_stats(range_stats, total_sketch, today_sketch, recent_stats):
+    """/api/stats totals from the merged sketches since the earliest spot and since today"""
+    total = total_sketch or {}
+    today = today_sketch or {}
+    return {
+        'total': {
+            'total_spots': total.get('spot_count', 0),
+            'unique_dx_stations': hyperloglog.estimate(total.get('dx_level_counts')),
+            'unique_spotters': hyperloglog.estimate(total.get('spotter_level_counts')),
+            'earliest_spot': range_stats['earliest_spot'],
+            'latest_spot': range_stats['latest_spot']
+        },
+        'today': {
+            'spots_today': today.get('spot_count', 0),
+            'dx_stations_today': hyperloglog.estimate(today.get('dx_level_counts')),
+            'spotters_today': hyperloglog.estimate(today.get('spotter_level_counts'))
+        },
+        # The last hour is cheap to count exactly
+        'recent': recent_stats
+    }
+
+def approximate_response(params):
+    """Reject counts=approximate for Arrow and Parquet, which are typed from an exact query"""
+    if response_format(params) != 'json':
+        abort(400, description="Approximate counts are only available as JSON")
 
 @app.route('/api/stats')
+@cached_response
 def get_stats():
     """Get basic statistics about the database"""
-    conn = get_db_connection()
+    exact = exact_counts(request.args)
+    
+    conn = get_db_connection(ANALYTICS)
     if not conn:
         abort(500, description="Database connection failed")
     
     try:
         cur = conn.cursor(cursor_factory=RealDictCursor)
         
+        if not exact:
+            cur.execute(STATS_RANGE_QUERY)
+            range_stats = cur.fetchone()
+            
+            total_sketch = today_sketch = None
+            if range_stats['earliest_spot'] is not None:
+                cur.execute(SKETCH_TOTALS_QUERY, {'since': range_stats['earliest_spot']})
+                total_sketch = cur.fetchone()
+                cur.execute(SKETCH_TOTALS_QUERY, {'since': range_stats['today']})
+                today_sketch = cur.fetchone()
+            
+            cur.execute(STATS_RECENT_QUERY)
+            recent_stats = cur.fetchone()
+            
+            cur.close()
+            release_db_connection(conn)
+            
+            return jsonify({
+                **approximate_stats(range_stats, total_sketch, today_sketch, dict(recent_stats)),
+                'exact': False,
+                'relative_error': round(hyperloglog.RELATIVE_ERROR, 4),
+                'timestamp': datetime.now().isoformat()
+            })
+        
         # Get basic counts
-        cur.execute("""
-            SELECT 
-                COUNT(*) as total_spots,
-                COUNT(DISTINCT dx_call) as unique_dx_stations,
-                COUNT(DISTINCT spotter_call) as unique_spotters,
-                MIN(timestamp) as earliest_spot,
-                MAX(timestamp) as latest_spot
-            FROM dx_spots
-        """)
+        cur.execute(STATS_TOTAL_QUERY)
         basic_stats = cur.fetchone()
         
         # Get today's stats
-        cur.execute("""
-            SELECT 
-                COUNT(*) as spots_today,
-                COUNT(DISTINCT dx_call) as dx_stations_today,
-                COUNT(DISTINCT spotter_call) as spotters_today
-            FROM dx_spots 
-            WHERE DATE(timestamp) = CURRENT_DATE
-        """)
+        cur.execute(STATS_TODAY_QUERY)
         today_stats = cur.fetchone()
         
         # Get recent activity (last hour)
-        cur.execute("""
-            SELECT 
-                COUNT(*) as spots_last_hour,
-                COUNT(DISTINCT spotter_call) as active_spotters
-            FROM dx_spots 
-            WHERE timestamp >= NOW() - INTERVAL '1 hour'
-        """)
+        cur.execute(STATS_RECENT_QUERY)
         recent_stats = cur.fetchone()
         
         cur.close()
-        conn.close()
+        release_db_connection(conn)
         
         return jsonify({
             'total': dict(basic_stats),
             'today': dict(today_stats),
             'recent': dict(recent_stats),
+            'exact': True,
             'timestamp': datetime.now().isoformat()
         })
         
@@ -141,94 +877,461 @@ def get_stats():
         logger.error(f"Error getting stats: {e}")
         abort(500, description="Error retrieving statistics")
 
-@app.route('/api/spots')
-def get_spots():
-    """Get DX spots with optional filtering"""
-    # Define allowed parameters
-    allowed_params = {
-        'limit', 'offset', 'dx_call', 'spotter_call', 'frequency_min', 'frequency_max',
-        'band', 'mode', 'since', 'until', 'grid_square', 'comment_contains', 'order_by'
-    }
+# Windowed statistics for the dashboard. Each query reads only the spots of
+# the window, from the covering (timestamp, id) index (migration 011).
+
+WINDOW_BAND_STATS_QUERY = """
+    SELECT 
+        band,
+        COUNT(*) as spot_count,
+        COUNT(DISTINCT dx_call) as unique_dx,
+        COUNT(DISTINCT spotter_call) as unique_spotters,
+        COUNT(*) FILTER (WHERE mode = 'CW') as cw_spots,
+        COUNT(*) FILTER (WHERE mode = 'SSB') as ssb_spots,
+        MIN(frequency) as min_freq,
+        MAX(frequency) as max_freq,
+        MAX(timestamp) as latest_spot
+    FROM dx_spots
+    WHERE timestamp >= NOW() - make_interval(hours => %s)
+      AND band IS NOT NULL
+    GROUP BY band
+    ORDER BY spot_count DESC
+"""
+
+@app.route('/api/stats/bands')
+@cached_response
+def get_band_stats():
+    """Get per-band activity over the last `hours` hours"""
+    hours = stats_window(request.args, {'hours', 'format'})
+    output_format = response_format(request.args)
     
-    validate_parameters(request.args, allowed_params)
+    conn = get_db_connection(ANALYTICS)
+    if not conn:
+        abort(500, description="Database connection failed")
     
-    # Parse parameters
-    limit = min(int(request.args.get('limit', 100)), 1000)  # Max 1000 records
-    offset = int(request.args.get('offset', 0))
+    try:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        
+        cur.execute(WINDOW_BAND_STATS_QUERY, (hours,))
+        
+        bands = cur.fetchall()
+        
+        cur.close()
+        release_db_connection(conn)
+        
+        if output_format != 'json':
+            return columnar_response(bands, cur.description, output_format, 'band_stats', categorical={'band'})
+        
+        return jsonify({
+            'bands': [dict(band) for band in bands],
+            'total_spots': sum(band['spot_count'] for band in bands),
+            'hours': hours,
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting band statistics: {e}")
+        abort(500, description="Error retrieving band statistics")
+
+WINDOW_TOP_DX_QUERY = """
+    WITH stations AS (
+        SELECT 
+            dx_call,
+            COUNT(*) as spot_count,
+            COUNT(DISTINCT spotter_call) as spotter_count,
+            ARRAY_AGG(DISTINCT band ORDER BY band) FILTER (WHERE band IS NOT NULL) as bands,
+            MAX(timestamp) as last_spotted
+        FROM dx_spots
+        WHERE timestamp >= NOW() - make_interval(hours => %(hours)s)
+          AND (%(band)s::text IS NULL OR band = %(band)s)
+        GROUP BY dx_call
+        ORDER BY spot_count DESC, dx_call
+        LIMIT %(limit)s
+    )
+    SELECT 
+        s.dx_call,
+        s.spot_count,
+        s.spotter_count,
+        COALESCE(s.bands, '{}') as bands,
+        s.last_spotted,
+        latest.frequency,
+        latest.band,
+        latest.mode,
+        latest.grid_square,
+        latest.dx_country,
+        latest.dx_lat,
+        latest.dx_lon
+    FROM stations s
+    CROSS JOIN LATERAL (
+        SELECT frequency, band, mode, grid_square, dx_country, dx_lat, dx_lon
+        FROM dx_spots
+        WHERE timestamp = s.last_spotted AND dx_call = s.dx_call
+          AND (%(band)s::text IS NULL OR band = %(band)s)
+        ORDER BY id DESC
+        LIMIT 1
+    ) latest
+    ORDER BY s.spot_count DESC, s.dx_call
+"""
+
+@app.route('/api/stats/top-dx')
+@cached_response
+def get_top_dx_stats():
+    """Get the most spotted DX stations over the last `hours` hours, with their latest spot"""
+    hours = stats_window(request.args, {'hours', 'limit', 'band'})
+    limit = stats_limit(request.args)
+    band = request.args.get('band')
+    
+    conn = get_db_connection(ANALYTICS)
+    if not conn:
+        abort(500, description="Database connection failed")
+    
+    try:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        
+        # Rank from the index alone, then fetch the latest spot of each of the
+        # `limit` stations by its exact timestamp
+        cur.execute(WINDOW_TOP_DX_QUERY, {'hours': hours, 'limit': limit, 'band': band})
+        
+        stations = cur.fetchall()
+        
+        cur.close()
+        release_db_connection(conn)
+        
+        return jsonify({
+            'stations': [dict(station) for station in stations],
+            'count': len(stations),
+            'hours': hours,
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting top DX stations: {e}")
+        abort(500, description="Error retrieving top DX stations")
+
+WINDOW_TOP_SPOTTERS_QUERY = """
+    SELECT 
+        spotter_call,
+        COUNT(*) as spot_count,
+        COUNT(DISTINCT dx_call) as dx_count,
+        COALESCE(ARRAY_AGG(DISTINCT band ORDER BY band) FILTER (WHERE band IS NOT NULL), '{}') as bands,
+        MAX(timestamp) as last_spot
+    FROM dx_spots
+    WHERE timestamp >= NOW() - make_interval(hours => %(hours)s)
+      AND (%(band)s::text IS NULL OR band = %(band)s)
+    GROUP BY spotter_call
+    ORDER BY spot_count DESC, spotter_call
+    LIMIT %(limit)s
+"""
+
+@app.route('/api/stats/top-spotters')
+@cached_response
+def get_top_spotter_stats():
+    """Get the most active spotters over the last `hours` hours"""
+    hours = stats_window(request.args, {'hours', 'limit', 'band'})
+    limit = stats_limit(request.args)
+    band = request.args.get('band')
     
-    # Build WHERE clause
+    conn = get_db_connection(ANALYTICS)
+    if not conn:
+        abort(500, description="Database connection failed")
+    
+    try:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        
+        cur.execute(WINDOW_TOP_SPOTTERS_QUERY, {'hours': hours, 'limit': limit, 'band': band})
+        
+        spotters = cur.fetchall()
+        
+        cur.close()
+        release_db_connection(conn)
+        
+        return jsonify({
+            'spotters': [dict(spotter) for spotter in spotters],
+            'count': len(spotters),
+            'hours': hours,
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting top spotters: {e}")
+        abort(500, description="Error retrieving top spotters")
+
+# Same definitions as the daily summary (migration 009)
+WINDOW_SUMMARY_QUERY = """
+    SELECT 
+        COUNT(*) as total_spots,
+        COUNT(DISTINCT dx_call) as unique_dx,
+        COUNT(DISTINCT spotter_call) as unique_spotters,
+        COUNT(DISTINCT NULLIF(band, '')) as active_bands,
+        AVG(frequency) FILTER (WHERE frequency > 0)::double precision as avg_frequency,
+        COALESCE(100.0 * COUNT(*) FILTER (WHERE mode = 'CW') / NULLIF(COUNT(NULLIF(mode, '')), 0), 0)::double precision as cw_percentage,
+        COALESCE(100.0 * COUNT(*) FILTER (WHERE mode = 'SSB') / NULLIF(COUNT(NULLIF(mode, '')), 0), 0)::double precision as ssb_percentage,
+        MAX(timestamp) as latest_spot
+    FROM dx_spots
+    WHERE timestamp >= NOW() - make_interval(hours => %s)
+"""
+
+WINDOW_BAND_PROPAGATION_QUERY = """
+    SELECT 
+        band,
+        COUNT(*) as spot_count,
+        COUNT(DISTINCT dx_call) as unique_dx,
+        COUNT(*) FILTER (WHERE timestamp >= NOW() - INTERVAL '1 hour') as spots_last_hour,
+        MAX(frequency) as max_freq,
+        MAX(timestamp) as latest_spot
+    FROM dx_spots
+    WHERE timestamp >= NOW() - make_interval(hours => %s)
+      AND band IS NOT NULL
+    GROUP BY band
+    ORDER BY spot_count DESC
+"""
+
+WINDOW_HOURLY_BANDS_QUERY = """
+    SELECT 
+        DATE_TRUNC('hour', timestamp) as hour,
+        band,
+        COUNT(*) as spot_count
+    FROM dx_spots
+    WHERE timestamp >= NOW() - make_interval(hours => %s)
+      AND band IS NOT NULL
+    GROUP BY hour, band
+    ORDER BY hour, band
+"""
+
+def propagation_summary(summary, bands, hourly, hours):
+    """Propagation response from the window query results, adding band shares, active hours and the peak hour"""
+    for band in bands:
+        band['percentage'] = 100.0 * band['spot_count'] / summary['total_spots']
+        band['hourly_average'] = band['spot_count'] / hours
+    
+    spots_per_hour = defaultdict(int)
+    for row in hourly:
+        spots_per_hour[row['hour']] += row['spot_count']
+    summary['activity_hours'] = len(spots_per_hour)
+    summary['peak_hour'] = max(spots_per_hour, key=spots_per_hour.get) if spots_per_hour else None
+    
+    return {'summary': summary, 'bands': bands, 'hourly': hourly, 'hours': hours}
+
+@app.route('/api/stats/propagation')
+@cached_response
+def get_propagation_stats():
+    """Get a propagation summary (overall, per band and per hour) for the last `hours` hours"""
+    hours = stats_window(request.args, {'hours'})
+    
+    conn = get_db_connection(ANALYTICS)
+    if not conn:
+        abort(500, description="Database connection failed")
+    
+    try:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        
+        cur.execute(WINDOW_SUMMARY_QUERY, (hours,))
+        summary = dict(cur.fetchone())
+        
+        cur.execute(WINDOW_BAND_PROPAGATION_QUERY, (hours,))
+        bands = [dict(band) for band in cur.fetchall()]
+        
+        cur.execute(WINDOW_HOURLY_BANDS_QUERY, (hours,))
+        hourly = [dict(row) for row in cur.fetchall()]
+        
+        cur.close()
+        release_db_connection(conn)
+        
+        return jsonify({
+            **propagation_summary(summary, bands, hourly, hours),
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting propagation summary: {e}")
+        abort(500, description="Error retrieving propagation summary")
+
+def encode_cursor(spot, direction):
+    """Opaque cursor pointing just past a spot in (timestamp, id) order"""
+    payload = json.dumps([spot['timestamp'].isoformat(), spot['id'], direction])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, direction):
+    """(timestamp, id) of a cursor made by encode_cursor(), or a 400 error"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, spot_id, cursor_direction = json.loads(base64.urlsafe_b64decode(padded))
+        timestamp = datetime.fromisoformat(timestamp)
+        spot_id = int(spot_id)
+    except (ValueError, TypeError):
+        abort(400, description="Invalid 'cursor'")
+    if cursor_direction != direction:
+        abort(400, description="The cursor was created for a different order_by direction")
+    return timestamp, spot_id
+
+def estimate_count(cur, where_clause, params):
+    """Planner estimate of the rows matching a WHERE clause (no table scan)"""
+    return int(guardrails.explain(cur, f"SELECT 1 FROM dx_spots {where_clause}", params)['Plan Rows'])
+
+def merge_archived_spots(spots, since, until, filters, order_field, descending, count, after=None):
+    """
+    Combine live spots with matching spots from the Parquet archive.
+
+    spots must be the first `count` live rows in the requested order (LIMIT
+    count, no OFFSET); the first `count` rows of the merged order are returned.
+    after is the (timestamp, id) of a keyset cursor.
+    """
+    archived, _ = spot_archive.query_archive(
+        'dx_spots', since, until, filters, SPOT_FIELDS,
+        order_by=order_field, descending=descending, limit=count, after=after)
+
+    # Rows caught between export and delete by an interrupted archiver run
+    live_ids = {spot['id'] for spot in spots}
+    merged = spots + [{field: spot.get(field) for field in SPOT_FIELDS}
+                      for spot in archived if spot['id'] not in live_ids]
+    merged.sort(key=lambda spot: (spot.get(order_field) is None, spot.get(order_field), spot['id']),
+                reverse=descending)
+    return merged[:count]
+
+def spot_filters(args):
+    """
+    WHERE conditions for the spot filter parameters shared by the spot endpoints.
+
+    Returns:
+        tuple: (SQL conditions, their parameters, the equivalent archive
+                filters, since datetime or None, until datetime or None)
+    """
     where_conditions = []
     params = []
+    archive_filters = []
+    since_dt = until_dt = None
     
-    if request.args.get('dx_call'):
+    if args.get('dx_call'):
         where_conditions.append("dx_call ILIKE %s")
-        params.append(f"%{request.args.get('dx_call')}%")
+        params.append(f"%{args.get('dx_call')}%")
+        archive_filters.append(('dx_call', 'contains', args.get('dx_call')))
     
-    if request.args.get('spotter_call'):
+    if args.get('spotter_call'):
         where_conditions.append("spotter_call ILIKE %s")
-        params.append(f"%{request.args.get('spotter_call')}%")
+        params.append(f"%{args.get('spotter_call')}%")
+        archive_filters.append(('spotter_call', 'contains', args.get('spotter_call')))
     
-    if request.args.get('frequency_min'):
+    if args.get('frequency_min'):
         where_conditions.append("frequency >= %s")
-        params.append(float(request.args.get('frequency_min')))
+        params.append(float(args.get('frequency_min')))
+        archive_filters.append(('frequency', '>=', float(args.get('frequency_min'))))
     
-    if request.args.get('frequency_max'):
+    if args.get('frequency_max'):
         where_conditions.append("frequency <= %s")
-        params.append(float(request.args.get('frequency_max')))
+        params.append(float(args.get('frequency_max')))
+        archive_filters.append(('frequency', '<=', float(args.get('frequency_max'))))
     
-    if request.args.get('band'):
+    if args.get('band'):
         where_conditions.append("band = %s")
-        params.append(request.args.get('band'))
+        params.append(args.get('band'))
+        archive_filters.append(('band', '=', args.get('band')))
     
-    if request.args.get('mode'):
+    if args.get('mode'):
         where_conditions.append("mode ILIKE %s")
-        params.append(f"%{request.args.get('mode')}%")
+        params.append(f"%{args.get('mode')}%")
+        archive_filters.append(('mode', 'contains', args.get('mode')))
     
-    if request.args.get('since'):
+    if args.get('since'):
         try:
-            since_dt = datetime.fromisoformat(request.args.get('since').replace('Z', '+00:00'))
+            since_dt = datetime.fromisoformat(args.get('since').replace('Z', '+00:00'))
             where_conditions.append("timestamp >= %s")
             params.append(since_dt)
         except ValueError:
             abort(400, description="Invalid 'since' datetime format. Use ISO format.")
     
-    if request.args.get('until'):
+    if args.get('until'):
         try:
-            until_dt = datetime.fromisoformat(request.args.get('until').replace('Z', '+00:00'))
+            until_dt = datetime.fromisoformat(args.get('until').replace('Z', '+00:00'))
             where_conditions.append("timestamp <= %s")
             params.append(until_dt)
         except ValueError:
             abort(400, description="Invalid 'until' datetime format. Use ISO format.")
     
-    if request.args.get('grid_square'):
+    if args.get('grid_square'):
         where_conditions.append("grid_square ILIKE %s")
-        params.append(f"%{request.args.get('grid_square')}%")
+        params.append(f"%{args.get('grid_square')}%")
+        archive_filters.append(('grid_square', 'contains', args.get('grid_square')))
     
-    if request.args.get('comment_contains'):
+    if args.get('comment_contains'):
         where_conditions.append("comment ILIKE %s")
-        params.append(f"%{request.args.get('comment_contains')}%")
+        params.append(f"%{args.get('comment_contains')}%")
+        archive_filters.append(('comment', 'contains', args.get('comment_contains')))
     
-    # Build ORDER BY clause
+    return where_conditions, params, archive_filters, since_dt, until_dt
+
+@app.route('/api/spots')
+def get_spots():
+    """Get DX spots with optional filtering"""
+    # Define allowed parameters
+    allowed_params = {
+        'limit', 'offset', 'dx_call', 'spotter_call', 'frequency_min', 'frequency_max',
+        'band', 'mode', 'since', 'until', 'grid_square', 'comment_contains', 'order_by',
+        'cursor', 'count', 'shape'
+    }
+    
+    validate_parameters(request.args, allowed_params)
+    shape = response_shape(request.args)
+    
+    # Parse parameters
+    limit = min(int(request.args.get('limit', 100)), 1000)  # Max 1000 records
+    offset = int(request.args.get('offset', 0))
+    cursor = request.args.get('cursor')
+    # Totals are exact by default for offset paging; cursor pages skip them
+    count_mode = request.args.get('count', 'none' if cursor else 'exact')
+    if count_mode not in ('exact', 'estimate', 'none'):
+        abort(400, description="Invalid count. Use 'exact', 'estimate' or 'none'")
+    if cursor and offset:
+        abort(400, description="Use either 'cursor' or 'offset', not both")
+    
+    # Build WHERE clause (and the equivalent filters for archived spots)
+    where_conditions, params, archive_filters, since_dt, until_dt = spot_filters(request.args)
+    
+    # Build ORDER BY clause; id breaks ties so every spot has a fixed position
     order_by = request.args.get('order_by', 'timestamp DESC')
     allowed_order_fields = ['timestamp', 'frequency', 'dx_call', 'spotter_call']
-    order_field = order_by.split()[0]
+    order_parts = order_by.split()
+    order_field = order_parts[0] if order_parts else ''
     if order_field not in allowed_order_fields:
         abort(400, description=f"Invalid order_by field. Allowed: {', '.join(allowed_order_fields)}")
+    direction = order_parts[1].upper() if len(order_parts) > 1 else 'ASC'
+    if len(order_parts) > 2 or direction not in ('ASC', 'DESC'):
+        abort(400, description="Invalid order_by direction. Use ASC or DESC")
+    descending = direction == 'DESC'
+    order_clause = f"{order_field} {direction}, id {direction}"
+    
+    # Keyset pagination: continue after the (timestamp, id) of the cursor,
+    # which an index range scan finds directly, instead of skipping OFFSET rows
+    keyset = order_field == 'timestamp'
+    after = None
+    page_conditions = list(where_conditions)
+    page_params = list(params)
+    if cursor:
+        if not keyset:
+            abort(400, description="Cursors are only supported when ordering by timestamp")
+        after = decode_cursor(cursor, direction)
+        page_conditions.append(f"(timestamp, id) {'<' if descending else '>'} (%s, %s)")
+        page_params.extend(after)
     
     # Build the query
     where_clause = f"WHERE {' AND '.join(where_conditions)}" if where_conditions else ""
+    page_where_clause = f"WHERE {' AND '.join(page_conditions)}" if page_conditions else ""
     
+    # One extra row tells whether another page follows
     query = f"""
-        SELECT 
-            id, timestamp, dx_call, frequency, spotter_call, 
-            comment, mode, signal_report, grid_square, band
+        SELECT {SPOT_COLUMNS}
         FROM dx_spots 
-        {where_clause}
-        ORDER BY {order_by}
+        {page_where_clause}
+        ORDER BY {order_clause}
         LIMIT %s OFFSET %s
     """
     
-    params.extend([limit, offset])
+    # Ranges reaching back past the archive horizon also read the Parquet archive;
+    # the page is then cut after merging live and archived spots
+    use_archive = bool(since_dt) and spot_archive.reaches_archive('dx_spots', since_dt)
+    if use_archive:
+        page_params.extend([offset + limit + 1, 0])
+    else:
+        page_params.extend([limit + 1, offset])
     
     # Count query for pagination
     count_query = f"""
@@ -237,109 +1340,745 @@ def get_spots():
         {where_clause}
     """
     
-    conn = get_db_connection()
+    # Recent ranges in time order are answered from the in-process buffer
+    buffered = buffered_spots(since_dt, until_dt, archive_filters) if keyset and since_dt and not use_archive else None
+    if buffered is not None:
+        if descending:
+            buffered.reverse()
+        if after:
+            buffered = [spot for spot in buffered
+                        if ((spot['timestamp'], spot['id']) < after if descending
+                            else (spot['timestamp'], spot['id']) > after)]
+        # The buffer's totals are exact whatever count asked for
+        total_count = None if count_mode == 'none' else len(buffered)
+        return spots_page(buffered[offset:offset + limit + 1], total_count, 'exact',
+                          limit, offset, shape, keyset, direction)
+    
+    conn = get_db_connection()
+    if not conn:
+        abort(500, description="Database connection failed")
+    
+    try:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        
+        # Pages the planner expects to be expensive are refused before they
+        # run, and exact totals that would cost as much are estimated instead
+        cost = check_query_cost(cur, query, page_params)
+        if cost > QUERY_COST_BUDGET:
+            guardrails.guardrail_events.labels(request.url_rule.rule, 'cost_rejected').inc()
+            abort(413, description=f"Query too expensive (estimated cost {cost:.0f}, budget "
+                                   f"{QUERY_COST_BUDGET:.0f}); narrow it with since/until or an exact "
+                                   f"dx_call, spotter_call or band filter, or page with cursor")
+        if count_mode == 'exact' and check_query_cost(cur, count_query, params) > QUERY_COST_BUDGET:
+            guardrails.guardrail_events.labels(request.url_rule.rule, 'count_downgraded').inc()
+            count_mode = 'estimate'
+        
+        # Get total count
+        total_count = None
+        if count_mode == 'exact':
+            cur.execute(count_query, params)
+            total_count = cur.fetchone()['total']
+        elif count_mode == 'estimate':
+            total_count = estimate_count(cur, where_clause, params)
+        
+        # Get spots
+        cur.execute(query, page_params)
+        spots = [dict(spot) for spot in cur.fetchall()]
+        
+        cur.close()
+        release_db_connection(conn)
+        
+        if use_archive:
+            spots = merge_archived_spots(
+                spots, since_dt, until_dt, archive_filters,
+                order_field, descending, offset + limit + 1, after)[offset:]
+            if count_mode == 'exact':
+                total_count += spot_archive.count_archive('dx_spots', since_dt, until_dt, archive_filters)
+            elif count_mode == 'estimate':
+                total_count += spot_archive.estimate_archive_rows('dx_spots', since_dt, until_dt)
+        
+        return spots_page(spots, total_count, count_mode, limit, offset, shape, keyset, direction)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting spots: {e}")
+        abort(500, description="Error retrieving spots")
+
+def spots_page(spots, total_count, count_mode, limit, offset, shape, keyset, direction):
+    """/api/spots response from up to limit + 1 spots of the page (one more means more follow)"""
+    has_more = len(spots) > limit
+    spots = spots[:limit]
+    
+    return jsonify({
+        **spot_list(spots, shape),
+        'pagination': {
+            'total': total_count,
+            'total_is_estimate': count_mode == 'estimate',
+            'limit': limit,
+            'offset': offset,
+            'has_more': has_more,
+            'next_cursor': encode_cursor(spots[-1], direction) if keyset and has_more else None
+        },
+        'timestamp': datetime.now().isoformat()
+    })
+
+RECENT_SPOTS_QUERY = f"""
+    SELECT {SPOT_COLUMNS}
+    FROM dx_spots 
+    WHERE timestamp >= NOW() - INTERVAL '%s hours'
+    ORDER BY timestamp DESC
+    LIMIT %s
+"""
+
+@app.route('/api/spots/recent')
+def get_recent_spots():
+    """Get recent spots (last N hours)"""
+    hours = min(int(request.args.get('hours', 24)), 168)  # Max 7 days
+    limit = min(int(request.args.get('limit', 50)), 500)
+    shape = response_shape(request.args)
+    
+    spots = buffered_recent_spots(hours, limit)
+    if spots is not None:
+        return jsonify({
+            **spot_list(spots, shape),
+            'hours': hours,
+            'count': len(spots),
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    conn = get_db_connection()
+    if not conn:
+        abort(500, description="Database connection failed")
+    
+    try:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        
+        cur.execute(RECENT_SPOTS_QUERY, (hours, limit))
+        
+        spots = cur.fetchall()
+        
+        cur.close()
+        release_db_connection(conn)
+        
+        return jsonify({
+            **spot_list([dict(spot) for spot in spots], shape),
+            'hours': hours,
+            'count': len(spots),
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting recent spots: {e}")
+        abort(500, description="Error retrieving recent spots")
+
+LOCATION_PARAMS = {
+    'location', 'hours', 'limit', 'shape', 'dx_call', 'spotter_call', 'frequency_min', 'frequency_max',
+    'band', 'mode', 'since', 'until', 'grid_square', 'comment_contains'
+}
+
+def coordinate_param(params, name, bound, default=None):
+    """A latitude, longitude or distance parameter within [-bound, bound]"""
+    if params.get(name) is None:
+        if default is None:
+            abort(400, description=f"Parameter '{name}' is required")
+        return default
+    try:
+        value = float(params.get(name))
+    except ValueError:
+        abort(400, description=f"Parameter '{name}' must be a number")
+    if not -bound <= value <= bound:
+        abort(400, description=f"Parameter '{name}' must be between {-bound} and {bound}")
+    return value
+
+def spot_limit(params, default, maximum):
+    """Number of spots requested, at most `maximum`"""
+    try:
+        return min(int(params.get('limit', default)), maximum)
+    except ValueError:
+        abort(400, description="Parameter 'limit' must be an integer")
+
+def near_center(params):
+    """
+    Center and radius of a radius search: 'grid', or 'lat' and 'lon', and 'radius_km'.
+
+    Returns:
+        tuple: (lat, lon, grid or None, radius_km)
+    """
+    grid = params.get('grid')
+    if grid:
+        if 'lat' in params or 'lon' in params:
+            abort(400, description="Use either 'grid' or 'lat' and 'lon', not both")
+        if not geo.is_grid(grid):
+            abort(400, description="Invalid grid. Use a 4, 6 or 8 character Maidenhead locator")
+        lat, lon = geo.grid_center(grid)
+        grid = grid.upper()
+    else:
+        lat = coordinate_param(params, 'lat', 90)
+        lon = coordinate_param(params, 'lon', 180)
+    radius_km = coordinate_param(params, 'radius_km', NEAR_MAX_RADIUS_KM, NEAR_DEFAULT_RADIUS_KM)
+    if radius_km <= 0:
+        abort(400, description="Parameter 'radius_km' must be positive")
+    return lat, lon, grid, radius_km
+
+def location_spots(params, allowed_params, box, limit, distance_from=None, radius_km=None, order_by='timestamp'):
+    """
+    Spots whose stored coordinates fall in a box, and within a radius of a point if given.
+
+    The rows are found through the (square, timestamp) location indexes
+    (migration 012): the query lists the 4-character squares overlapping the
+    box, so only the spots of those squares within the time window are read.
+    Boxes covering more than geo.MAX_SQUARES squares scan the time window.
+
+    Returns:
+        tuple: (spots, location, hours or None when 'since' is given)
+    """
+    hours = stats_window(params, allowed_params)
+    location = params.get('location', 'dx')
+    if location not in SPOT_LOCATIONS:
+        abort(400, description="Invalid location. Use 'dx' or 'spotter'")
+    lat, lon = SPOT_LOCATIONS[location]
+
+    where_conditions, query_params, _, since_dt, _ = spot_filters(params)
+    if not since_dt:
+        where_conditions.append("timestamp >= NOW() - INTERVAL '%s hours'")
+        query_params.append(hours)
+
+    min_lat, min_lon, max_lat, max_lon = box
+    squares = geo.squares_in_box(min_lat, min_lon, max_lat, max_lon)
+    if squares is not None:
+        where_conditions.append(f"latlon_to_maidenhead({lat}::float8, {lon}::float8, 4) = ANY(%s)")
+        query_params.append(squares)
+    where_conditions.append(f"{lat} BETWEEN %s AND %s")
+    query_params.extend([min_lat, max_lat])
+    if min_lon <= max_lon:
+        where_conditions.append(f"{lon} BETWEEN %s AND %s")
+    else:
+        where_conditions.append(f"({lon} >= %s OR {lon} <= %s)")
+    query_params.extend([min_lon, max_lon])
+
+    if distance_from:
+        # Haversine distance from the center, tested on the rows found above
+        distance = (f"2 * {geo.EARTH_RADIUS_KM} * asin(sqrt(least(1, "
+                    f"power(sin(radians({lat}::float8 - %s) / 2), 2) + cos(radians(%s)) * "
+                    f"cos(radians({lat}::float8)) * power(sin(radians({lon}::float8 - %s) / 2), 2))))")
+        center_lat, center_lon = distance_from
+        select_params = [center_lat, center_lat, center_lon]
+        outer = "WHERE distance_km <= %s"
+        outer_params = [radius_km]
+    else:
+        distance = "NULL::float8"
+        select_params = []
+        outer = ""
+        outer_params = []
+    order_clause = "distance_km, timestamp DESC" if order_by == 'distance' else "timestamp DESC, id DESC"
+
+    query = f"""
+        SELECT * FROM (
+            SELECT {SPOT_COLUMNS}, {distance} AS distance_km
+            FROM dx_spots
+            WHERE {' AND '.join(where_conditions)}
+        ) AS located
+        {outer}
+        ORDER BY {order_clause}
+        LIMIT %s
+    """
+
+    conn = get_db_connection()
+    if not conn:
+        abort(500, description="Database connection failed")
+
+    try:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur.execute(query, select_params + query_params + outer_params + [limit])
+        spots = [dict(spot) for spot in cur.fetchall()]
+        cur.close()
+        release_db_connection(conn)
+    except Exception as e:
+        logger.error(f"Error getting spots by location: {e}")
+        abort(500, description="Error retrieving spots")
+
+    if not distance_from:
+        for spot in spots:
+            del spot['distance_km']
+    return spots, location, None if since_dt else hours
+
+@app.route('/api/spots/near')
+def get_spots_near():
+    """Spots within radius_km of a grid square's center or a lat/lon point, newest or nearest first"""
+    allowed_params = LOCATION_PARAMS | {'grid', 'lat', 'lon', 'radius_km', 'order_by'}
+    validate_parameters(request.args, allowed_params)
+    shape = response_shape(request.args)
+
+    lat, lon, grid, radius_km = near_center(request.args)
+    order_by = request.args.get('order_by', 'timestamp')
+    if order_by not in ('timestamp', 'distance'):
+        abort(400, description="Invalid order_by. Use 'timestamp' or 'distance'")
+
+    spots, location, hours = location_spots(
+        request.args, allowed_params, geo.radius_box(lat, lon, radius_km), spot_limit(request.args, 100, 1000),
+        distance_from=(lat, lon), radius_km=radius_km, order_by=order_by)
+    listed = spot_list(spots, shape)
+    if shape == 'columns':
+        listed['columns']['distance_km'] = [spot['distance_km'] for spot in spots]
+
+    return jsonify({
+        **listed,
+        'center': {'lat': lat, 'lon': lon, 'grid': grid},
+        'radius_km': radius_km,
+        'location': location,
+        'hours': hours,
+        'count': len(spots),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/spots/bbox')
+def get_spots_in_box():
+    """Spots inside a latitude/longitude box, newest first"""
+    allowed_params = LOCATION_PARAMS | {'min_lat', 'min_lon', 'max_lat', 'max_lon'}
+    validate_parameters(request.args, allowed_params)
+    shape = response_shape(request.args)
+
+    min_lat = coordinate_param(request.args, 'min_lat', 90)
+    max_lat = coordinate_param(request.args, 'max_lat', 90)
+    min_lon = coordinate_param(request.args, 'min_lon', 180)
+    max_lon = coordinate_param(request.args, 'max_lon', 180)
+    if min_lat > max_lat:
+        abort(400, description="Parameter 'min_lat' must not be greater than 'max_lat'")
+
+    # min_lon > max_lon is a box crossing the antimeridian
+    spots, location, hours = location_spots(
+        request.args, allowed_params, (min_lat, min_lon, max_lat, max_lon), spot_limit(request.args, 100, 1000))
+
+    return jsonify({
+        **spot_list(spots, shape),
+        'box': {'min_lat': min_lat, 'min_lon': min_lon, 'max_lat': max_lat, 'max_lon': max_lon},
+        'location': location,
+        'hours': hours,
+        'count': len(spots),
+        'timestamp': datetime.now().isoformat()
+    })
+
+PATH_FIELDS = ['id', 'timestamp', 'dx_call', 'spotter_call', 'frequency', 'band', 'mode']
+
+def spot_paths(spots, points):
+    """
+    Spotter to DX great-circle paths of the spots with stored coordinates.
+
+    All paths are computed together by geo.great_circle_paths; each gets its
+    distance, initial bearing (from the spotter) and a polyline of `points`
+    [lon, lat] vertices.
+    """
+    spots = [spot for spot in spots
+             if None not in (spot['spotter_lat'], spot['spotter_lon'], spot['dx_lat'], spot['dx_lon'])]
+    if not spots:
+        return []
+    ends = np.array([(spot['spotter_lat'], spot['spotter_lon'], spot['dx_lat'], spot['dx_lon'])
+                     for spot in spots], dtype=float)
+    distance, bearing, lats, lons = geo.great_circle_paths(*ends.T, points)
+    lines = np.round(np.stack([lons, lats], axis=-1), 4).tolist()
+    return [{**{field: spot[field] for field in PATH_FIELDS},
+             'distance_km': spot_distance, 'bearing': spot_bearing, 'path': line}
+            for spot, spot_distance, spot_bearing, line
+            in zip(spots, np.round(distance, 1).tolist(), np.round(bearing, 1).tolist(), lines)]
+
+WINDOW_PATH_SPOTS_QUERY = """
+    SELECT {fields}, spotter_lat, spotter_lon, dx_lat, dx_lon
+    FROM dx_spots
+    WHERE {conditions}
+      AND spotter_lat IS NOT NULL AND spotter_lon IS NOT NULL AND dx_lat IS NOT NULL AND dx_lon IS NOT NULL
+    ORDER BY timestamp DESC, id DESC
+    LIMIT %s
+"""
+
+@app.route('/api/paths')
+@cached_response
+def get_paths():
+    """Great-circle paths of the newest spots in a window, optionally near a grid square or point"""
+    allowed_params = (LOCATION_PARAMS - {'shape'}) | {'grid', 'lat', 'lon', 'radius_km', 'points', 'format'}
+    validate_parameters(request.args, allowed_params)
+    limit = spot_limit(request.args, 1000, PATHS_MAX_LIMIT)
+    try:
+        points = int(request.args.get('points', PATHS_DEFAULT_POINTS))
+    except ValueError:
+        abort(400, description="Parameter 'points' must be an integer")
+    if not 2 <= points <= PATHS_MAX_POINTS:
+        abort(400, description=f"Parameter 'points' must be between 2 and {PATHS_MAX_POINTS}")
+    output = request.args.get('format', 'json')
+    if output not in ('json', 'geojson'):
+        abort(400, description="Invalid format. Use 'json' or 'geojson'")
+
+    center = None
+    if any(name in request.args for name in ('grid', 'lat', 'lon')):
+        lat, lon, grid, radius_km = near_center(request.args)
+        spots, location, hours = location_spots(
+            request.args, allowed_params, geo.radius_box(lat, lon, radius_km), limit,
+            distance_from=(lat, lon), radius_km=radius_km)
+        center = {'lat': lat, 'lon': lon, 'grid': grid, 'radius_km': radius_km, 'location': location}
+    else:
+        if 'location' in request.args or 'radius_km' in request.args:
+            abort(400, description="Parameters 'location' and 'radius_km' need 'grid' or 'lat' and 'lon'")
+        hours = stats_window(request.args, allowed_params)
+        where_conditions, params, _, since_dt, _ = spot_filters(request.args)
+        if since_dt:
+            hours = None
+        else:
+            where_conditions.append("timestamp >= NOW() - make_interval(hours => %s)")
+            params.append(hours)
+
+        conn = get_db_connection(ANALYTICS)
+        if not conn:
+            abort(500, description="Database connection failed")
+        try:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            cur.execute(WINDOW_PATH_SPOTS_QUERY.format(fields=', '.join(PATH_FIELDS),
+                                                       conditions=' AND '.join(where_conditions)),
+                        params + [limit])
+            spots = cur.fetchall()
+            cur.close()
+            release_db_connection(conn)
+        except Exception as e:
+            logger.error(f"Error getting path spots: {e}")
+            abort(500, description="Error retrieving paths")
+
+    paths = spot_paths(spots, points)
+
+    if output == 'geojson':
+        response = jsonify({
+            'type': 'FeatureCollection',
+            'features': [{
+                'type': 'Feature',
+                'geometry': {'type': 'LineString', 'coordinates': path.pop('path')},
+                'properties': path
+            } for path in paths]
+        })
+        response.mimetype = 'application/geo+json'
+        return response
+
+    return jsonify({
+        'paths': paths,
+        'points': points,
+        'center': center,
+        'hours': hours,
+        'count': len(paths),
+        'timestamp': datetime.now().isoformat()
+    })
+
+def fetch_new_spots(after_id, limit):
+    """Spots with an id above after_id in id order, or the newest `limit` spots when after_id is None"""
+    conn = get_db_connection()
+    if not conn:
+        raise psycopg2.OperationalError("Database connection failed")
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            if after_id is None:
+                cur.execute(f"""
+                    SELECT * FROM (
+                        SELECT {SPOT_COLUMNS}
+                        FROM dx_spots
+                        ORDER BY id DESC
+                        LIMIT %s
+                    ) newest
+                    ORDER BY id
+                """, (limit,))
+            else:
+                cur.execute(f"""
+                    SELECT {SPOT_COLUMNS}
+                    FROM dx_spots
+                    WHERE id > %s
+                    ORDER BY id
+                    LIMIT %s
+                """, (after_id, limit))
+            return [dict(spot) for spot in cur.fetchall()]
+    finally:
+        release_db_connection(conn)
+
+spot_feed = SpotFeed(fetch_new_spots, poll_interval=SPOT_STREAM_POLL_INTERVAL, history_size=SPOT_STREAM_HISTORY,
+                     max_subscriptions=SPOT_STREAM_MAX_CLIENTS)
+
+# The last RECENT_SPOTS_HOURS of spots, kept up to date from the live spot
+# feed by recent_buffer; the spots already stored are read once per worker
+RECENT_BUFFER_QUERY = f"""
+    SELECT {SPOT_COLUMNS}
+    FROM dx_spots
+    WHERE id <= %(last_id)s
+      AND timestamp > NOW() - make_interval(secs => %(seconds)s)
+    ORDER BY timestamp, id
+"""
+
+def load_recent_spots(last_id, seconds):
+    """Spots up to last_id of the last `seconds` seconds, oldest first, for recent_buffer"""
+    # Read from the primary: a replica may not have every spot up to last_id yet
+    conn = primary_pool.getconn(STATEMENT_TIMEOUTS[ANALYTICS])
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(RECENT_BUFFER_QUERY, {'last_id': last_id, 'seconds': seconds})
+            return [dict(spot) for spot in cur.fetchall()]
+    finally:
+        primary_pool.putconn(conn)
+
+recent_buffer = recent_spots.RecentSpots(RECENT_SPOTS_HOURS, RECENT_SPOTS_MAX)
+
+def start_recent_spots():
+    """Start loading recent_buffer once per worker (threads do not survive the fork)"""
+    if RECENT_SPOTS_HOURS > 0:
+        recent_buffer.start(spot_feed, load_recent_spots)
+
+@app.before_request
+def start_request_work():
+    """Start the recent spots buffer with the first request of each worker"""
+    # Prometheus scrapes do not start background work
+    if request.path != '/metrics':
+        start_recent_spots()
+
+def buffered_spots(since, until, filters):
+    """
+    Spots from since to until that pass archive-style filters, oldest first,
+    from recent_buffer; None when the database has to answer.
+    """
+    if RECENT_SPOTS_HOURS <= 0 or not recent_spots.buffer_filters(filters):
+        spots = None
+    else:
+        spots = recent_buffer.select(since, until, filters)
+    recent_spots.recent_spot_requests.labels('/api/spots', 'database' if spots is None else 'buffer').inc()
+    return spots
+
+def buffered_recent_spots(hours, limit):
+    """The newest `limit` spots of the last `hours` hours from recent_buffer; None when the database has to answer"""
+    spots = None
+    if RECENT_SPOTS_HOURS > 0:
+        spots = recent_buffer.newest(datetime.now(timezone.utc) - timedelta(hours=hours), limit)
+    recent_spots.recent_spot_requests.labels('/api/spots/recent', 'database' if spots is None else 'buffer').inc()
+    return spots
+
+def spot_events(subscription):
+    """Server-sent events for a stream subscription, until it overflows or SPOT_STREAM_MAX_SECONDS pass"""
+    try:
+        # Reconnect after 2s; EventSource resends the last id as Last-Event-ID
+        yield "retry: 2000\n\n"
+        if subscription.gap:
+            yield "event: gap\ndata: {}\n\n"
+        deadline = time.monotonic() + SPOT_STREAM_MAX_SECONDS
+        while time.monotonic() < deadline:
+            spots = subscription.get(timeout=min(SPOT_STREAM_KEEPALIVE, deadline - time.monotonic()))
+            if spots is None:
+                yield "event: overflow\ndata: {}\n\n"
+                return
+            if not spots:
+                yield ": keep-alive\n\n"
+                continue
+            yield ''.join(f"id: {spot['id']}\ndata: {app.json.dumps(spot)}\n\n" for spot in spots)
+    finally:
+        spot_feed.unsubscribe(subscription)
+
+@app.route('/api/spots/stream')
+def stream_spots():
+    """Push newly stored spots as server-sent events"""
+    validate_parameters(request.args, {
+        'dx_call', 'spotter_call', 'frequency_min', 'frequency_max', 'band', 'mode',
+        'grid_square', 'comment_contains', 'last_event_id'
+    })
+    
+    _, _, filters, _, _ = spot_filters(request.args)
+    
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        after_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        abort(400, description="Invalid Last-Event-ID; it must be a spot id")
+    
+    try:
+        subscription = spot_feed.subscribe(filters, after_id, buffer_size=SPOT_STREAM_BUFFER)
+    except Exception as e:
+        logger.error(f"Error starting spot feed: {e}")
+        abort(500, description="Error starting spot stream")
+    if subscription is None:
+        abort(503, description="Too many live streams; retry later or poll /api/spots/recent")
+    
+    return Response(spot_events(subscription), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def export_chunks(rows, export_format, fields):
+    """Serialize spot rows to NDJSON or CSV text, EXPORT_BATCH_SIZE rows per chunk"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format == 'csv':
+        writer.writerow(fields)
+    for n, row in enumerate(rows, 1):
+        if export_format == 'csv':
+            writer.writerow([value.isoformat() if isinstance(value, datetime) else value
+                             for value in (row.get(field) for field in fields)])
+        else:
+            # One spot object per line, encoded exactly as /api/spots encodes it
+            buffer.write(app.json.dumps(row))
+            buffer.write('\n')
+        if n % EXPORT_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+@app.route('/api/spots/export')
+def export_spots():
+    """
+    Stream every spot in a time range as NDJSON, CSV, Arrow or Parquet, oldest first.
+
+    Rows are read from a server-side cursor and written in chunks as they
+    arrive, so neither the API nor the client holds the range in memory.
+    """
+    allowed_params = {
+        'format', 'columns', 'dx_call', 'spotter_call', 'frequency_min', 'frequency_max',
+        'band', 'mode', 'since', 'until', 'grid_square', 'comment_contains'
+    }
+    
+    validate_parameters(request.args, allowed_params)
+    
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        abort(400, description=f"Invalid format. Allowed: {', '.join(EXPORT_FORMATS)}")
+    
+    fields = SPOT_FIELDS
+    if request.args.get('columns'):
+        fields = list(dict.fromkeys(f.strip() for f in request.args.get('columns').split(',') if f.strip()))
+        unknown = [field for field in fields if field not in SPOT_EXPRESSIONS]
+        if unknown or not fields:
+            abort(400, description=f"Invalid columns. Allowed: {', '.join(SPOT_FIELDS)}")
+    
+    where_conditions, params, archive_filters, since_dt, until_dt = spot_filters(request.args)
+    
+    # Days before the archive horizon are read from Parquet and the rest from
+    # the database, so no spot is exported twice
+    horizon = spot_archive.archive_horizon('dx_spots')
+    use_archive = horizon is not None and (
+        since_dt is None or spot_archive.reaches_archive('dx_spots', since_dt))
+    if use_archive:
+        where_conditions.append("timestamp >= %s")
+        params.append(horizon)
+    
+    where_clause = f"WHERE {' AND '.join(where_conditions)}" if where_conditions else ""
+    query = f"""
+        SELECT {', '.join(SPOT_EXPRESSIONS[field] for field in fields)}
+        FROM dx_spots
+        {where_clause}
+        ORDER BY timestamp, id
+    """
+    
+    conn = get_db_connection(ANALYTICS)
     if not conn:
         abort(500, description="Database connection failed")
     
     try:
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Get total count
-        cur.execute(count_query, params[:-2])  # Exclude limit and offset
-        total_count = cur.fetchone()['total']
-        
-        # Get spots
+        # Named cursor: the result stays on the server and is fetched
+        # EXPORT_BATCH_SIZE rows at a time
+        cur = conn.cursor(name='spots_export', cursor_factory=RealDictCursor)
+        cur.itersize = EXPORT_BATCH_SIZE
         cur.execute(query, params)
-        spots = cur.fetchall()
-        
-        cur.close()
-        conn.close()
-        
-        return jsonify({
-            'spots': [dict(spot) for spot in spots],
-            'pagination': {
-                'total': total_count,
-                'limit': limit,
-                'offset': offset,
-                'has_more': offset + limit < total_count
-            },
-            'timestamp': datetime.now().isoformat()
-        })
-        
     except Exception as e:
-        logger.error(f"Error getting spots: {e}")
-        abort(500, description="Error retrieving spots")
-
-@app.route('/api/spots/recent')
-def get_recent_spots():
-    """Get recent spots (last N hours)"""
-    hours = min(int(request.args.get('hours', 24)), 168)  # Max 7 days
-    limit = min(int(request.args.get('limit', 50)), 500)
+        logger.error(f"Error exporting spots: {e}")
+        abort(500, description="Error exporting spots")
     
-    conn = get_db_connection()
-    if not conn:
-        abort(500, description="Database connection failed")
+    # The response outlives the request, so the connection is returned when the
+    # response is closed (finished, failed or disconnected), not at teardown
+    g.db_connections.remove(conn)
     
-    try:
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
-            SELECT 
-                id, timestamp, dx_call, frequency, spotter_call, 
-                comment, mode, signal_report, grid_square, band
-            FROM dx_spots 
-            WHERE timestamp >= NOW() - INTERVAL '%s hours'
-            ORDER BY timestamp DESC
-            LIMIT %s
-        """, (hours, limit))
-        
-        spots = cur.fetchall()
-        
-        cur.close()
-        conn.close()
-        
-        return jsonify({
-            'spots': [dict(spot) for spot in spots],
-            'hours': hours,
-            'count': len(spots),
-            'timestamp': datetime.now().isoformat()
-        })
-        
-    except Exception as e:
-        logger.error(f"Error getting recent spots: {e}")
-        abort(500, description="Error retrieving recent spots")
+    def generate():
+        try:
+            archived = ()
+            if use_archive:
+                archived = ({field: spot.get(field) for field in fields}
+                            for spot in spot_archive.iter_archive(
+                                'dx_spots', since_dt, until_dt, archive_filters, fields))
+            rows = itertools.chain(archived, cur)
+            if export_format in columnar.COLUMNAR_FORMATS:
+                schema = pa.schema([SPOT_SCHEMA.field(field) for field in fields])
+                yield from columnar.encode_chunks(rows, schema, export_format, EXPORT_BATCH_SIZE)
+            else:
+                yield from export_chunks(rows, export_format, fields)
+        except Exception as e:
+            # The status line has already been sent: drop the connection so the
+            # client sees an incomplete response rather than a short export
+            logger.error(f"Error exporting spots: {e}")
+            raise
+    
+    response = Response(stream_with_context(generate()), mimetype=EXPORT_FORMATS[export_format],
+                        headers={'Content-Disposition': f'attachment; filename="dx_spots.{export_format}"'})
+    response.call_on_close(lambda: release_db_connection(conn))
+    return response
+
+BANDS_QUERY = """
+    SELECT 
+        band,
+        COUNT(*) as spot_count,
+        COUNT(DISTINCT dx_call) as dx_stations,
+        MIN(frequency) as min_freq,
+        MAX(frequency) as max_freq,
+        MAX(timestamp) as latest_spot
+    FROM dx_spots 
+    WHERE band IS NOT NULL
+    GROUP BY band
+    ORDER BY spot_count DESC
+"""
+
+def approximate_bands(sketches):
+    """/api/bands rows from the merged sketches of each band, most spots first"""
+    return [{
+        'band': row['band'],
+        'spot_count': row['spot_count'],
+        'dx_stations': hyperloglog.estimate(row['dx_level_counts']),
+        'min_freq': row['min_frequency'],
+        'max_freq': row['max_frequency'],
+        'latest_spot': row['latest_spot']
+    } for row in sketches]
 
 @app.route('/api/bands')
+@cached_response
 def get_bands():
     """Get list of active bands with spot counts"""
-    conn = get_db_connection()
+    output_format = response_format(request.args)
+    exact = exact_counts(request.args)
+    if not exact:
+        approximate_response(request.args)
+    
+    conn = get_db_connection(ANALYTICS)
     if not conn:
         abort(500, description="Database connection failed")
     
     try:
         cur = conn.cursor(cursor_factory=RealDictCursor)
         
-        cur.execute("""
-            SELECT 
-                band,
-                COUNT(*) as spot_count,
-                COUNT(DISTINCT dx_call) as dx_stations,
-                MIN(frequency) as min_freq,
-                MAX(frequency) as max_freq,
-                MAX(timestamp) as latest_spot
-            FROM dx_spots 
-            WHERE band IS NOT NULL
-            GROUP BY band
-            ORDER BY spot_count DESC
-        """)
+        if not exact:
+            cur.execute(STATS_RANGE_QUERY)
+            range_stats = cur.fetchone()
+            
+            sketches = []
+            if range_stats['earliest_spot'] is not None:
+                cur.execute(BAND_SKETCHES_QUERY, {'since': range_stats['earliest_spot']})
+                sketches = cur.fetchall()
+            
+            cur.close()
+            release_db_connection(conn)
+            
+            return jsonify({
+                'bands': approximate_bands(sketches),
+                'exact': False,
+                'relative_error': round(hyperloglog.RELATIVE_ERROR, 4),
+                'timestamp': datetime.now().isoformat()
+            })
+        
+        cur.execute(BANDS_QUERY)
         
         bands = cur.fetchall()
         
         cur.close()
-        conn.close()
+        release_db_connection(conn)
+        
+        if output_format != 'json':
+            return columnar_response(bands, cur.description, output_format, 'bands', categorical={'band'})
         
         return jsonify({
             'bands': [dict(band) for band in bands],
+            'exact': True,
             'timestamp': datetime.now().isoformat()
         })
         
@@ -347,63 +2086,186 @@ def get_bands():
         logger.error(f"Error getting bands: {e}")
         abort(500, description="Error retrieving band information")
 
+# Frequency histograms: uniform bins between the lowest and highest frequency
+# spotted, or (edges=band, or a single band) bins between the edges of each
+# band in frequency_bands (migration 014). Each query reads the spots once and
+# bins them with width_bucket; the top edge falls in the last bin.
+
+FREQUENCY_HISTOGRAM_QUERY = """
+    WITH spots AS MATERIALIZED (
+        SELECT frequency
+        FROM dx_spots
+        WHERE timestamp >= %(since)s
+          AND frequency IS NOT NULL
+    ),
+    edges AS (
+        SELECT MIN(frequency) as low, MAX(frequency) as high
+        FROM spots
+    )
+    SELECT 
+        NULL::text as band,
+        edges.low,
+        edges.high,
+        LEAST(width_bucket(spots.frequency, edges.low, GREATEST(edges.high, edges.low + 1), %(bins)s), %(bins)s) as bin,
+        COUNT(*) as spot_count
+    FROM spots, edges
+    GROUP BY edges.low, edges.high, bin
+"""
+
+BAND_HISTOGRAM_QUERY = """
+    SELECT 
+        spot.band,
+        edges.low_khz as low,
+        edges.high_khz as high,
+        LEAST(width_bucket(spot.frequency, edges.low_khz, edges.high_khz, %(bins)s), %(bins)s) as bin,
+        COUNT(*) as spot_count
+    FROM dx_spots spot
+    JOIN frequency_bands edges ON edges.band = spot.band
+    WHERE spot.timestamp >= %(since)s
+      AND spot.frequency BETWEEN edges.low_khz AND edges.high_khz
+      AND (%(band)s::text IS NULL OR spot.band = %(band)s)
+    GROUP BY spot.band, edges.low_khz, edges.high_khz, bin
+"""
+
+# Band histograms of the last N hours add up the bin arrays of the completed
+# hours in hourly_frequency_bins; the partial first hour (since to
+# first_hour) and the hours after the last refresh are binned from dx_spots
+HOURLY_FREQUENCY_BINS_QUERY = """
+    WITH bounds AS (
+        SELECT (SELECT MAX(hour) + INTERVAL '1 hour' FROM hourly_frequency_bins) as refreshed
+    ),
+    hourly AS (
+        SELECT band, bin_counts
+        FROM hourly_frequency_bins
+        WHERE hour >= %(first_hour)s
+        UNION ALL
+        SELECT binned.band, binned.bin_counts
+        FROM spot_frequency_bins(%(since)s, %(first_hour)s) binned
+        UNION ALL
+        SELECT binned.band, binned.bin_counts
+        FROM bounds, spot_frequency_bins(GREATEST(%(first_hour)s, bounds.refreshed), 'infinity') binned
+    )
+    SELECT hourly.band, edges.low_khz as low, edges.high_khz as high, hourly.bin_counts
+    FROM hourly
+    JOIN frequency_bands edges ON edges.band = hourly.band
+    WHERE %(band)s::text IS NULL OR hourly.band = %(band)s
+"""
+
+def histogram_request(params):
+    """
+    Validate a frequency histogram request.
+
+    Returns:
+        (bins, hours or None for all spots, band or None, edges)
+    """
+    validate_parameters(params, {'bins', 'hours', 'band', 'edges', 'format'})
+    edges = params.get('edges', 'uniform')
+    if edges not in HISTOGRAM_EDGES:
+        abort(400, description=f"Invalid edges. Use {', '.join(HISTOGRAM_EDGES)}")
+    try:
+        bins = min(int(params.get('bins', 50)), HISTOGRAM_MAX_BINS)
+        hours = int(params['hours']) if 'hours' in params else None
+    except ValueError:
+        abort(400, description="Parameters 'bins' and 'hours' must be integers")
+    if bins < 1:
+        abort(400, description="Parameter 'bins' must be at least 1")
+    if hours is not None and not 1 <= hours <= STATS_MAX_HOURS:
+        abort(400, description=f"Parameter 'hours' must be between 1 and {STATS_MAX_HOURS}")
+    return bins, hours, params.get('band'), edges
+
+def histogram_query(bins, hours, band, edges):
+    """
+    Query answering a frequency histogram request.
+
+    Returns:
+        (query, parameters, precomputed): precomputed is True when the
+        hourly bin arrays are used
+    """
+    since = datetime.now(timezone.utc) - timedelta(hours=hours) if hours else '-infinity'
+    if band is None and edges == 'uniform':
+        return FREQUENCY_HISTOGRAM_QUERY, {'since': since, 'bins': bins}, False
+    if hours and FREQUENCY_FINE_BINS % bins == 0:
+        first_hour = since.replace(minute=0, second=0, microsecond=0)
+        if first_hour < since:
+            first_hour += timedelta(hours=1)
+        return HOURLY_FREQUENCY_BINS_QUERY, {'since': since, 'first_hour': first_hour, 'band': band}, True
+    return BAND_HISTOGRAM_QUERY, {'since': since, 'bins': bins, 'band': band}, False
+
+def frequency_histogram(rows, bins):
+    """
+    Histogram bins, lowest frequency first, from histogram query rows.
+
+    Rows hold a bin number and spot count, or (precomputed) an array of
+    FREQUENCY_FINE_BINS counts that is merged into `bins` bins. Every bin of
+    a band with spots is returned, including the empty ones.
+    """
+    ranges = {}
+    for row in rows:
+        key = (float(row['low']), float(row['high']), row['band'])
+        counts = ranges.get(key)
+        if counts is None:
+            counts = ranges[key] = np.zeros(bins, dtype=np.int64)
+        if 'bin_counts' in row:
+            counts += np.asarray(row['bin_counts'], dtype=np.int64).reshape(bins, -1).sum(axis=1)
+        else:
+            counts[row['bin'] - 1] += row['spot_count']
+    
+    histogram = []
+    for (low, high, band), counts in sorted(ranges.items()):
+        width = (high - low) / bins
+        for index, spot_count in enumerate(counts.tolist()):
+            histogram.append({
+                'bin_number': len(histogram),
+                'band': band,
+                'bin_start': round(low + index * width, 3),
+                'bin_end': round(low + (index + 1) * width, 3),
+                'spot_count': spot_count
+            })
+    return histogram
+
+def histogram_fields(histogram, bins, hours, band, edges, precomputed):
+    """Response fields of a frequency histogram"""
+    ranges = {entry['band'] for entry in histogram}
+    return {
+        'histogram': histogram,
+        'bins': bins,
+        'edges': edges,
+        'band': band,
+        'hours': hours,
+        # Band edges give each band its own bin width
+        'bin_width': round(histogram[0]['bin_end'] - histogram[0]['bin_start'], 3) if len(ranges) == 1 else None,
+        'frequency_range': {'min': histogram[0]['bin_start'], 'max': histogram[-1]['bin_end']} if histogram else None,
+        'total_spots': sum(entry['spot_count'] for entry in histogram),
+        'precomputed': precomputed
+    }
+
 @app.route('/api/frequency/histogram')
+@cached_response
 def get_frequency_histogram():
-    """Get frequency distribution histogram"""
-    bins = min(int(request.args.get('bins', 50)), 200)  # Max 200 bins
+    """Get frequency distribution histogram, optionally of the last N hours and with band edges"""
+    bins, hours, band, edges = histogram_request(request.args)
+    output_format = response_format(request.args)
+    query, query_params, precomputed = histogram_query(bins, hours, band, edges)
     
-    conn = get_db_connection()
+    conn = get_db_connection(ANALYTICS)
     if not conn:
         abort(500, description="Database connection failed")
     
     try:
         cur = conn.cursor(cursor_factory=RealDictCursor)
         
-        cur.execute("""
-            SELECT 
-                MIN(frequency) as min_freq,
-                MAX(frequency) as max_freq,
-                COUNT(*) as total_spots
-            FROM dx_spots
-        """)
-        
-        freq_range = cur.fetchone()
-        
-        if freq_range['total_spots'] == 0:
-            return jsonify({
-                'histogram': [],
-                'bins': 0,
-                'total_spots': 0,
-                'timestamp': datetime.now().isoformat()
-            })
-        
-        # Calculate bin width
-        min_freq = float(freq_range['min_freq'])
-        max_freq = float(freq_range['max_freq'])
-        bin_width = (max_freq - min_freq) / bins
-        
-        cur.execute("""
-            SELECT 
-                FLOOR((frequency - %s) / %s) as bin_number,
-                COUNT(*) as spot_count,
-                MIN(frequency) as bin_min_freq,
-                MAX(frequency) as bin_max_freq
-            FROM dx_spots
-            GROUP BY bin_number
-            ORDER BY bin_number
-        """, (min_freq, bin_width))
+        cur.execute(query, query_params)
         
-        histogram = cur.fetchall()
+        histogram = frequency_histogram(cur.fetchall(), bins)
         
         cur.close()
-        conn.close()
+        release_db_connection(conn)
+        
+        if output_format != 'json':
+            return schema_response(histogram, HISTOGRAM_SCHEMA, output_format, 'frequency_histogram')
         
         return jsonify({
-            'histogram': [dict(bin_data) for bin_data in histogram],
-            'bins': bins,
-            'bin_width': bin_width,
-            'frequency_range': {'min': min_freq, 'max': max_freq},
-            'total_spots': freq_range['total_spots'],
+            **histogram_fields(histogram, bins, hours, band, edges, precomputed),
             'timestamp': datetime.now().isoformat()
         })
         
@@ -411,10 +2273,36 @@ def get_frequency_histogram():
         logger.error(f"Error getting frequency histogram: {e}")
         abort(500, description="Error retrieving frequency histogram")
 
+HOURLY_ACTIVITY_QUERY = """
+    SELECT 
+        DATE_TRUNC('hour', timestamp) as hour,
+        COUNT(*) as spot_count,
+        COUNT(DISTINCT dx_call) as unique_dx_stations,
+        COUNT(DISTINCT spotter_call) as unique_spotters
+    FROM dx_spots
+    WHERE timestamp >= NOW() - INTERVAL '%s hours'
+    GROUP BY hour
+    ORDER BY hour
+"""
+
+def approximate_hourly_activity(sketches):
+    """/api/activity/hourly rows from the merged sketches of each hour, oldest hour first"""
+    return [{
+        'hour': row['hour'],
+        'spot_count': row['spot_count'],
+        'unique_dx_stations': hyperloglog.estimate(row['dx_level_counts']),
+        'unique_spotters': hyperloglog.estimate(row['spotter_level_counts'])
+    } for row in sketches]
+
 @app.route('/api/activity/hourly')
+@cached_response
 def get_hourly_activity():
     """Get hourly activity statistics"""
     hours = min(int(request.args.get('hours', 24)), 168)  # Max 7 days
+    output_format = response_format(request.args)
+    exact = exact_counts(request.args)
+    if not exact:
+        approximate_response(request.args)
     
     conn = get_db_connection()
     if not conn:
@@ -423,26 +2311,37 @@ def get_hourly_activity():
     try:
         cur = conn.cursor(cursor_factory=RealDictCursor)
         
-        cur.execute("""
-            SELECT 
-                DATE_TRUNC('hour', timestamp) as hour,
-                COUNT(*) as spot_count,
-                COUNT(DISTINCT dx_call) as unique_dx_stations,
-                COUNT(DISTINCT spotter_call) as unique_spotters
-            FROM dx_spots
-            WHERE timestamp >= NOW() - INTERVAL '%s hours'
-            GROUP BY hour
-            ORDER BY hour
-        """, (hours,))
+        if not exact:
+            # Whole UTC hours: the first hour of the window is counted in full
+            cur.execute(HOURLY_SKETCHES_QUERY, {'since': datetime.now(timezone.utc) - timedelta(hours=hours)})
+            
+            sketches = cur.fetchall()
+            
+            cur.close()
+            release_db_connection(conn)
+            
+            return jsonify({
+                'activity': approximate_hourly_activity(sketches),
+                'hours': hours,
+                'exact': False,
+                'relative_error': round(hyperloglog.RELATIVE_ERROR, 4),
+                'timestamp': datetime.now().isoformat()
+            })
+        
+        cur.execute(HOURLY_ACTIVITY_QUERY, (hours,))
         
         activity = cur.fetchall()
         
         cur.close()
-        conn.close()
+        release_db_connection(conn)
+        
+        if output_format != 'json':
+            return columnar_response(activity, cur.description, output_format, 'hourly_activity')
         
         return jsonify({
             'activity': [dict(hour_data) for hour_data in activity],
             'hours': hours,
+            'exact': True,
             'timestamp': datetime.now().isoformat()
         })
         
@@ -450,16 +2349,340 @@ def get_hourly_activity():
         logger.error(f"Error getting hourly activity: {e}")
         abort(500, description="Error retrieving hourly activity")
 
-@app.route('/api/callsigns/top')
-def get_top_callsigns():
-    """Get top active callsigns (spotters and spotted)"""
-    limit = min(int(request.args.get('limit', 20)), 100)
-    category = request.args.get('category', 'both')  # 'spotters', 'spotted', or 'both'
+# Activity cube: spot counts and distinct stations per UTC day, hour of day
+# and band (and mode) from hourly_activity_rollup (migration 015); the hours
+# after the last refresh are counted from dx_spots. Spots without a band are
+# left out. Rows with mode '*' count every spot of their hour and band.
+ACTIVITY_CUBE_QUERY = """
+    WITH bounds AS (
+        SELECT (SELECT MAX(hour) + INTERVAL '1 hour' FROM hourly_activity_rollup) as refreshed
+    ),
+    cells AS (
+        SELECT hour, band, mode, spot_count, unique_dx, unique_spotters
+        FROM hourly_activity_rollup
+        WHERE hour >= %(start)s
+          AND hour < %(end)s
+        UNION ALL
+        SELECT activity.*
+        FROM bounds, spot_activity(GREATEST(%(start)s, bounds.refreshed), %(end)s) activity
+    )
+    SELECT cells.*, edges.low_khz
+    FROM cells
+    LEFT JOIN frequency_bands edges ON edges.band = cells.band
+    WHERE cells.band <> ''
+      AND (cells.mode = '*') = %(all_modes)s
+"""
+
+def cube_request(params):
+    """
+    Validate an activity cube request.
+
+    Returns:
+        (first day, number of days, by mode, encoding)
+    """
+    validate_parameters(params, {'since', 'until', 'by', 'encoding'})
+    days = {}
+    for name in ('since', 'until'):
+        if params.get(name):
+            try:
+                days[name] = datetime.strptime(params.get(name)[:10], '%Y-%m-%d').date()
+            except ValueError:
+                abort(400, description=f"Invalid '{name}' date format. Use YYYY-MM-DD.")
+    until = days.get('until', datetime.now(timezone.utc).date())
+    since = days.get('since', until - timedelta(days=CUBE_DEFAULT_DAYS - 1))
+    day_count = (until - since).days + 1
+    if not 1 <= day_count <= CUBE_MAX_DAYS:
+        abort(400, description=f"'since' must be on or before 'until', at most {CUBE_MAX_DAYS} days apart")
+    by = params.get('by', 'band')
+    if by not in CUBE_GROUPINGS:
+        abort(400, description=f"Invalid by. Use {', '.join(CUBE_GROUPINGS)}")
+    encoding = params.get('encoding', 'list')
+    if encoding not in CUBE_ENCODINGS:
+        abort(400, description=f"Invalid encoding. Use {', '.join(CUBE_ENCODINGS)}")
+    return since, day_count, by == 'band_mode', encoding
+
+def cube_query_params(since, day_count, by_mode):
+    """Parameters of ACTIVITY_CUBE_QUERY for a range of UTC days"""
+    start = datetime.combine(since, datetime.min.time(), timezone.utc)
+    return {'start': start, 'end': start + timedelta(days=day_count), 'all_modes': not by_mode}
+
+def activity_cube(rows, since, day_count, by_mode, encoding):
+    """
+    Response fields of an activity cube: one dense (day, hour, band[, mode])
+    array per metric, bands in frequency order and modes busiest first.
+    """
+    start = datetime.combine(since, datetime.min.time(), timezone.utc)
+    low = {row['band']: row['low_khz'] for row in rows}
+    bands = sorted(low, key=lambda band: (low[band] is None, low[band], band))
+    mode_spots = defaultdict(int)
+    for row in rows:
+        mode_spots[row['mode']] += row['spot_count']
+    modes = sorted(mode_spots, key=lambda mode: (-mode_spots[mode], mode)) if by_mode else []
+    
+    shape = (day_count, 24, len(bands)) + ((len(modes),) if by_mode else ())
+    cube = {metric: np.zeros(shape, dtype=np.uint32) for metric in CUBE_METRICS}
+    if rows:
+        band_index = {band: index for index, band in enumerate(bands)}
+        mode_index = {mode: index for index, mode in enumerate(modes)}
+        hours = np.array([(row['hour'] - start) // timedelta(hours=1) for row in rows])
+        index = (hours // 24, hours % 24, np.array([band_index[row['band']] for row in rows]))
+        if by_mode:
+            index += (np.array([mode_index[row['mode']] for row in rows]),)
+        # Add rather than assign, so that a repeated cell is not overwritten
+        for metric in CUBE_METRICS:
+            np.add.at(cube[metric], index, np.array([row[metric] for row in rows], dtype=np.uint32))
+    
+    # Smallest unsigned type that holds every count (uint8, uint16 or uint32)
+    dtype = np.min_scalar_type(max(int(values.max(initial=0)) for values in cube.values()))
+    if encoding == 'base64':
+        # Row-major little-endian, e.g. np.frombuffer(b64decode(data), dtype).reshape(shape)
+        data = {metric: base64.b64encode(values.astype(dtype.newbyteorder('<')).tobytes()).decode()
+                for metric, values in cube.items()}
+    else:
+        data = {metric: values.tolist() for metric, values in cube.items()}
+    
+    return {
+        'dims': ['day', 'hour', 'band', 'mode'] if by_mode else ['day', 'hour', 'band'],
+        'shape': list(shape),
+        'days': [(since + timedelta(days=day)).isoformat() for day in range(day_count)],
+        'bands': bands,
+        # Spots without a mode are counted under null
+        'modes': [mode or None for mode in modes] if by_mode else None,
+        'encoding': encoding,
+        'dtype': dtype.name,
+        'data': data
+    }
+
+@app.route('/api/activity/cube')
+@cached_response
+def get_activity_cube():
+    """Get spot counts and distinct stations per UTC day, hour and band (and mode) over a date range"""
+    since, day_count, by_mode, encoding = cube_request(request.args)
     
+    conn = get_db_connection(ANALYTICS)
+    if not conn:
+        abort(500, description="Database connection failed")
+    
+    try:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        
+        cur.execute(ACTIVITY_CUBE_QUERY, cube_query_params(since, day_count, by_mode))
+        
+        rows = cur.fetchall()
+        
+        cur.close()
+        release_db_connection(conn)
+        
+        return jsonify({
+            **activity_cube(rows, since, day_count, by_mode, encoding),
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting activity cube: {e}")
+        abort(500, description="Error retrieving activity cube")
+
+@app.route('/api/propagation/daily')
+def get_daily_propagation():
+    """Get per-day propagation features from the daily summary table"""
+    validate_parameters(request.args, {'since', 'until', 'format'})
+    output_format = response_format(request.args)
+
+    where_conditions = []
+    params = []
+
+    for name, condition in (('since', 'day >= %s'), ('until', 'day <= %s')):
+        if request.args.get(name):
+            try:
+                params.append(datetime.strptime(request.args.get(name)[:10], '%Y-%m-%d').date())
+                where_conditions.append(condition)
+            except ValueError:
+                abort(400, description=f"Invalid '{name}' date format. Use YYYY-MM-DD.")
+
+    where_clause = f"WHERE {' AND '.join(where_conditions)}" if where_conditions else ""
+
+    conn = get_db_connection(ANALYTICS)
+    if not conn:
+        abort(500, description="Database connection failed")
+
+    try:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+
+        cur.execute(f"""
+            SELECT
+                day,
+                total_spots,
+                avg_frequency,
+                num_bands_active,
+                avg_signal_quality,
+                signal_quality_std,
+                cw_percentage,
+                ssb_percentage,
+                activity_hours,
+                peak_hour,
+                band_40m_percentage,
+                refreshed_at
+            FROM daily_propagation_summary
+            {where_clause}
+            ORDER BY day
+        """, params)
+
+        days = cur.fetchall()
+
+        cur.close()
+        release_db_connection(conn)
+
+        if output_format != 'json':
+            return columnar_response(days, cur.description, output_format, 'daily_propagation')
+
+        return jsonify({
+            'days': [dict(day, day=day['day'].isoformat()) for day in days],
+            'count': len(days),
+            'timestamp': datetime.now().isoformat()
+        })
+
+    except Exception as e:
+        logger.error(f"Error getting daily propagation summary: {e}")
+        abort(500, description="Error retrieving daily propagation summary")
+
+TOP_SPOTTERS_QUERY = """
+    SELECT 
+        spotter_call as callsign,
+        COUNT(*) as spot_count,
+        COUNT(DISTINCT dx_call) as stations_spotted,
+        MAX(timestamp) as last_activity
+    FROM dx_spots
+    WHERE %(hours)s::int IS NULL OR timestamp >= NOW() - make_interval(hours => %(hours)s)
+    GROUP BY spotter_call
+    ORDER BY spot_count DESC
+    LIMIT %(limit)s
+"""
+
+TOP_SPOTTED_QUERY = """
+    SELECT 
+        dx_call as callsign,
+        COUNT(*) as times_spotted,
+        COUNT(DISTINCT spotter_call) as spotted_by,
+        MAX(timestamp) as last_spotted
+    FROM dx_spots
+    WHERE %(hours)s::int IS NULL OR timestamp >= NOW() - make_interval(hours => %(hours)s)
+    GROUP BY dx_call
+    ORDER BY times_spotted DESC
+    LIMIT %(limit)s
+"""
+
+# Exact counts of each callsign per time bucket, to load the summaries of a
+# sliding window (one bucket more than the window: its oldest bucket starts
+# before the window does)
+CALLSIGN_BUCKET_COUNTS_QUERY = """
+    SELECT 
+        floor(extract(epoch FROM timestamp) / %(bucket)s)::bigint as bucket,
+        {field} as callsign,
+        COUNT(*) as spots,
+        MAX(timestamp) as last_seen
+    FROM dx_spots
+    WHERE id <= %(last_id)s AND {field} IS NOT NULL
+      AND timestamp >= NOW() - make_interval(secs => %(seconds)s)
+    GROUP BY 1, 2
+    ORDER BY 1, 3 DESC
+"""
+
+CALLSIGN_COUNTS_QUERY = """
+    SELECT 
+        {field} as callsign,
+        COUNT(*) as spots,
+        MAX(timestamp) as last_seen
+    FROM dx_spots
+    WHERE id <= %(last_id)s AND {field} IS NOT NULL
+    GROUP BY 1
+    ORDER BY 2 DESC
+    LIMIT %(limit)s
+"""
+
+# Response fields of the top callsigns of each category: list, count, last time seen
+TOP_CALLSIGN_FIELDS = {
+    'spotters': ('top_spotters', 'spot_count', 'last_activity'),
+    'spotted': ('top_spotted', 'times_spotted', 'last_spotted')
+}
+
+def load_callsign_counts(last_id):
+    """Exact callsign counts of the spots up to last_id, per summary and bucket, for callsign_sketches"""
+    # Read from the primary: a replica may not have every spot up to last_id yet
+    conn = primary_pool.getconn(STATEMENT_TIMEOUTS[ANALYTICS])
+    try:
+        counts = {}
+        with conn.cursor() as cur:
+            for category, field in heavy_hitters.CATEGORIES.items():
+                for window, (seconds, bucket) in heavy_hitters.WINDOWS.items():
+                    if seconds is None:
+                        cur.execute(CALLSIGN_COUNTS_QUERY.format(field=field),
+                                    {'last_id': last_id, 'limit': CALLSIGN_SKETCH_SIZE + 1})
+                        counts[(category, window)] = {0: cur.fetchall()}
+                        continue
+                    cur.execute(CALLSIGN_BUCKET_COUNTS_QUERY.format(field=field),
+                                {'last_id': last_id, 'bucket': bucket, 'seconds': seconds + bucket})
+                    buckets = counts[(category, window)] = defaultdict(list)
+                    for number, callsign, spots, last_seen in cur.fetchall():
+                        buckets[number].append((callsign, spots, last_seen))
+        return counts
+    finally:
+        primary_pool.putconn(conn)
+
+callsign_sketches = heavy_hitters.CallsignSketches(CALLSIGN_SKETCH_SIZE)
+
+def top_callsigns_request(params):
+    """
+    Validated top callsigns parameters.
+
+    Returns:
+        tuple: (limit, category, window, exact)
+    """
+    limit = min(int(params.get('limit', 20)), 100)
+    category = params.get('category', 'both')  # 'spotters', 'spotted', or 'both'
     if category not in ['spotters', 'spotted', 'both']:
         abort(400, description="Invalid category. Use 'spotters', 'spotted', or 'both'")
+    window = params.get('window', 'all')
+    if window not in heavy_hitters.WINDOWS:
+        abort(400, description=f"Invalid window. Use {', '.join(heavy_hitters.WINDOWS)}")
+    exact = exact_counts(params, default='approximate')
+    if exact and window not in CALLSIGN_EXACT_WINDOWS:
+        abort(400, description=f"Exact counts are only available for the "
+                               f"{', '.join(sorted(CALLSIGN_EXACT_WINDOWS))} windows")
+    return limit, category, window, exact
+
+def sketch_top_callsigns(category, window, limit):
+    """
+    Top callsigns from the streaming summaries, or None while they are loading.
+
+    Each count is an upper bound; count_error bounds how far above the true count it may be.
+    """
+    try:
+        callsign_sketches.start(spot_feed, load_callsign_counts)
+    except Exception as e:
+        logger.warning(f"Could not start the callsign summaries: {e}")
+        return None
+    result = {}
+    for name in (['spotters', 'spotted'] if category == 'both' else [category]):
+        top = callsign_sketches.top(name, window, limit)
+        if top is None:
+            return None
+        field, count_field, seen_field = TOP_CALLSIGN_FIELDS[name]
+        result[field] = [{'callsign': callsign, count_field: count, 'count_error': error, seen_field: seen}
+                         for callsign, count, error, seen in top]
+    return result
+
+@app.route('/api/callsigns/top')
+@cached_response
+def get_top_callsigns():
+    """Get top active callsigns (spotters and spotted) over a window"""
+    limit, category, window, exact = top_callsigns_request(request.args)
     
-    conn = get_db_connection()
+    result = None if exact else sketch_top_callsigns(category, window, limit)
+    if result is not None:
+        return jsonify({**result, 'window': window, 'exact': False, 'timestamp': datetime.now().isoformat()})
+    
+    # Exact counts, or the summaries are still loading
+    conn = get_db_connection(ANALYTICS)
     if not conn:
         abort(500, description="Database connection failed")
     
@@ -467,40 +2690,23 @@ def get_top_callsigns():
         cur = conn.cursor(cursor_factory=RealDictCursor)
         
         result = {}
+        params = {'hours': heavy_hitters.window_hours(window), 'limit': limit}
         
         if category in ['spotters', 'both']:
-            cur.execute("""
-                SELECT 
-                    spotter_call as callsign,
-                    COUNT(*) as spot_count,
-                    COUNT(DISTINCT dx_call) as stations_spotted,
-                    MAX(timestamp) as last_activity
-                FROM dx_spots
-                GROUP BY spotter_call
-                ORDER BY spot_count DESC
-                LIMIT %s
-            """, (limit,))
+            cur.execute(TOP_SPOTTERS_QUERY, params)
             
             result['top_spotters'] = [dict(spotter) for spotter in cur.fetchall()]
         
         if category in ['spotted', 'both']:
-            cur.execute("""
-                SELECT 
-                    dx_call as callsign,
-                    COUNT(*) as times_spotted,
-                    COUNT(DISTINCT spotter_call) as spotted_by,
-                    MAX(timestamp) as last_spotted
-                FROM dx_spots
-                GROUP BY dx_call
-                ORDER BY times_spotted DESC
-                LIMIT %s
-            """, (limit,))
+            cur.execute(TOP_SPOTTED_QUERY, params)
             
             result['top_spotted'] = [dict(spotted) for spotted in cur.fetchall()]
         
         cur.close()
-        conn.close()
+        release_db_connection(conn)
         
+        result['window'] = window
+        result['exact'] = True
         result['timestamp'] = datetime.now().isoformat()
         return jsonify(result)
         
@@ -508,6 +2714,188 @@ def get_top_callsigns():
         logger.error(f"Error getting top callsigns: {e}")
         abort(500, description="Error retrieving top callsigns")
 
+# Maximum observed frequency over sliding windows, kept up to date from the
+# live spot feed by mof_tracker; the spots already in a window are read once
+MOF_SPOTS_QUERY = """
+    SELECT id, timestamp, frequency, band, dx_call, spotter_call, spotter_country
+    FROM dx_spots
+    WHERE id <= %(last_id)s
+      AND timestamp > NOW() - make_interval(secs => %(seconds)s)
+      AND frequency BETWEEN %(min_khz)s AND %(max_khz)s
+    ORDER BY timestamp, id
+"""
+
+def load_mof_spots(last_id, seconds):
+    """HF spots up to last_id of the last `seconds` seconds, oldest first, for mof_tracker"""
+    # Read from the primary: a replica may not have every spot up to last_id yet
+    conn = primary_pool.getconn(STATEMENT_TIMEOUTS[LIVE])
+    try:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(MOF_SPOTS_QUERY, {'last_id': last_id, 'seconds': seconds,
+                                          'min_khz': mof.MIN_KHZ, 'max_khz': mof.MAX_KHZ})
+            return [dict(spot) for spot in cur.fetchall()]
+    finally:
+        primary_pool.putconn(conn)
+
+mof_tracker = mof.MofTracker()
+
+def start_mof_tracker():
+    """Start mof_tracker (once per worker); False if the spots of its windows could not be read"""
+    try:
+        mof_tracker.start(spot_feed, load_mof_spots)
+        return True
+    except Exception as e:
+        logger.warning(f"Could not start the MOF tracker: {e}")
+        return False
+
+@app.route('/api/mof')
+def get_mof():
+    """Get the maximum observed frequency of a sliding window, overall, per band group or per spotter country"""
+    validate_parameters(request.args, {'window', 'by'})
+    window = request.args.get('window', '15m')
+    if window not in mof.WINDOWS:
+        abort(400, description=f"Invalid window. Use {', '.join(mof.WINDOWS)}")
+    by = request.args.get('by', 'all')
+    if by not in mof.GROUPINGS:
+        abort(400, description=f"Invalid by. Use {', '.join(mof.GROUPINGS)}")
+    
+    if not start_mof_tracker():
+        abort(503, description="The recent spots could not be read; try again shortly")
+    
+    return jsonify({
+        'mof': [{'group': group, 'mof_mhz': round(float(frequency) / 1000, 4), 'spot': spot}
+                for group, frequency, spot in mof_tracker.mof(window, by)],
+        'window': window,
+        'by': by,
+        'frequency_range': {'min': mof.MIN_KHZ, 'max': mof.MAX_KHZ},
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/callsigns/resolve')
+def resolve_callsigns():
+    """Resolve callsigns to country and coordinates by longest matching prefix"""
+    validate_parameters(request.args, {'callsigns'})
+    
+    callsigns = [c.strip().upper() for c in request.args.get('callsigns', '').split(',') if c.strip()]
+    if not callsigns:
+        abort(400, description="Parameter 'callsigns' is required (comma-separated list)")
+    if len(callsigns) > 100:
+        abort(400, description="At most 100 callsigns can be resolved per request")
+    
+    conn = get_db_connection(ANALYTICS)
+    if not conn:
+        abort(500, description="Database connection failed")
+    
+    try:
+        cur = conn.cursor(cursor_factory=RealDictCursor)
+        
+        cur.execute("""
+            SELECT 
+                c.callsign,
+                r.prefix,
+                r.country,
+                r.latitude as lat,
+                r.longitude as lon
+            FROM unnest(%s::text[]) WITH ORDINALITY AS c(callsign, pos)
+            LEFT JOIN LATERAL resolve_callsign_prefix(c.callsign) r ON true
+            ORDER BY c.pos
+        """, (callsigns,))
+        
+        resolved = cur.fetchall()
+        
+        cur.close()
+        release_db_connection(conn)
+        
+        return jsonify({
+            'callsigns': [dict(row) for row in resolved],
+            'count': len(resolved),
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error resolving callsigns: {e}")
+        abort(500, description="Error resolving callsigns")
+
+# Threads are started on first use, so each gunicorn worker gets its own
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='batch')
+
+def batch_queries(body):
+    """
+    Validate the body of a batch request.
+
+    Returns:
+        list of {'id', 'path', 'params'} with params as a MultiDict
+    """
+    if not isinstance(body, dict) or not isinstance(body.get('queries'), list):
+        abort(400, description="Request body must be a JSON object with a 'queries' list")
+    invalid_keys = set(body) - {'queries', 'snapshot'}
+    if invalid_keys:
+        abort(400, description=f"Invalid keys: {', '.join(invalid_keys)}")
+    if not 1 <= len(body['queries']) <= BATCH_MAX_QUERIES:
+        abort(400, description=f"A batch must have between 1 and {BATCH_MAX_QUERIES} queries")
+    
+    queries = []
+    for index, query in enumerate(body['queries']):
+        if not isinstance(query, dict) or query.get('path') not in BATCH_PATHS:
+            abort(400, description=f"Query {index}: 'path' must be one of {', '.join(sorted(BATCH_PATHS))}")
+        params = query.get('params', {})
+        if not isinstance(params, dict):
+            abort(400, description=f"Query {index}: 'params' must be an object")
+        values = MultiDict()
+        for name, value in params.items():
+            for item in (value if isinstance(value, list) else [value]):
+                if isinstance(item, (dict, list)) or item is None:
+                    abort(400, description=f"Query {index}: parameter '{name}' must be a string or number")
+                values.add(name, str(item).lower() if isinstance(item, bool) else str(item))
+        if values.get('format', 'json') != 'json':
+            abort(400, description=f"Query {index}: batched responses are JSON only")
+        queries.append({'id': str(query.get('id', index)), 'path': query['path'], 'params': values})
+    
+    if len({query['id'] for query in queries}) != len(queries):
+        abort(400, description="Query ids must be unique")
+    return queries
+
+def run_batch_query(query, snapshot, remote_addr, api_key):
+    """Dispatch one sub-query to its endpoint in a request context of its own"""
+    environ = EnvironBuilder(path=query['path'], query_string=query['params'],
+                             environ_overrides={'REMOTE_ADDR': remote_addr},
+                             headers={'X-API-Key': api_key} if api_key else None).get_environ()
+    with app.request_context(environ):
+        g.batch_snapshot = snapshot
+        try:
+            response = app.full_dispatch_request()
+        except Exception as e:
+            response = app.handle_exception(e)
+        body = response.get_json(silent=True)
+        # Closing records the sub-query's metrics
+        response.close()
+        return {'id': query['id'], 'path': query['path'], 'status': response.status_code, 'body': body}
+
+@app.route('/api/batch', methods=['POST'])
+def run_batch():
+    """Run several GET endpoints concurrently and return their responses together"""
+    validate_parameters(request.args, set())
+    body = request.get_json(silent=True)
+    queries = batch_queries(body)
+    
+    # Sub-queries on the primary import one snapshot, so they see the same spots
+    snapshot_conn, snapshot = export_snapshot() if body.get('snapshot', True) else (None, None)
+    try:
+        futures = [batch_executor.submit(run_batch_query, query, snapshot, request.remote_addr,
+                                         request.headers.get('X-API-Key'))
+                   for query in queries]
+        results = [future.result() for future in futures]
+    finally:
+        if snapshot_conn:
+            release_db_connection(snapshot_conn)
+    
+    return jsonify({
+        'results': results,
+        'count': len(results),
+        'snapshot': snapshot is not None,
+        'timestamp': datetime.now().isoformat()
+    })
+
 @app.route('/')
 def data_browser():
     """Serve the data browser HTML interface"""
@@ -519,12 +2907,26 @@ def api_info():
     endpoints = {
         'health': '/api/health - Health check',
         'stats': '/api/stats - Basic database statistics',
+        'band_stats': '/api/stats/bands - Per-band activity over the last N hours',
+        'top_dx': '/api/stats/top-dx - Most spotted DX stations over the last N hours',
+        'top_spotters': '/api/stats/top-spotters - Most active spotters over the last N hours',
+        'propagation_stats': '/api/stats/propagation - Propagation summary over the last N hours',
         'spots': '/api/spots - Get spots with filtering options',
         'recent_spots': '/api/spots/recent - Get recent spots',
+        'spots_near': '/api/spots/near - Spots within a radius of a grid square or point',
+        'spots_bbox': '/api/spots/bbox - Spots inside a latitude/longitude box',
+        'paths': '/api/paths - Spotter to DX great-circle paths with distance and bearing',
+        'export_spots': '/api/spots/export - Stream a time range of spots as NDJSON, CSV, Arrow or Parquet',
+        'stream_spots': '/api/spots/stream - Server-sent events for newly stored spots',
         'bands': '/api/bands - Get band information',
-        'frequency_histogram': '/api/frequency/histogram - Frequency distribution',
+        'frequency_histogram': '/api/frequency/histogram - Frequency distribution (bins, hours, band, edges=uniform|band)',
         'hourly_activity': '/api/activity/hourly - Hourly activity stats',
+        'activity_cube': '/api/activity/cube - Spots and distinct stations per day, hour and band (and mode)',
+        'daily_propagation': '/api/propagation/daily - Per-day propagation features',
         'top_callsigns': '/api/callsigns/top - Top active callsigns',
+        'resolve_callsigns': '/api/callsigns/resolve - Callsign to country/location lookup',
+        'mof': '/api/mof - Maximum observed frequency over the last 15 minutes to 1 hour',
+        'batch': '/api/batch - Run several GET endpoints in one request (POST)',
         'data_browser': '/ - Interactive data browser interface'
     }
     
@@ -641,9 +3043,11 @@ app.json_encoder = DateTimeEncoder
 
 if __name__ == '__main__':
     # Check database connection on startup
-    if not get_db_connection():
+    conn = get_db_connection()
+    if not conn:
         logger.error("Failed to connect to database on startup")
         sys.exit(1)
+    release_db_connection(conn)
     
     logger.info("Starting DX Cluster API server")
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,653 @@
+#!/usr/bin/env python3
+"""
+DX Cluster API - ASGI serving mode
+
+Under gunicorn's threaded workers every request holds a thread for as long as
+its query runs, so a handful of slow analytical requests (a full-table
+histogram, the top callsigns) can occupy every thread of a worker while cheap
+requests such as /api/spots/recent or /api/health queue behind them.
+
+This module serves the same API from an event loop. The read endpoints that
+query the database are implemented here as async handlers on psycopg 3
+connection pools: a request waiting on PostgreSQL costs a coroutine, not a
+thread, and analytical queries draw from their own small pool, so however many
+of them are running, live queries still get a connection at once. The SQL,
+parameter validation, response cache and JSON encoding are those of dx_api,
+so every route returns the same JSON as the Flask app.
+
+Every other route (/api/spots, exports, the live stream, documentation,
+/metrics) and the Arrow/Parquet formats are passed to the Flask app, which
+runs in a thread pool.
+
+Run: uvicorn api.dx_api_asgi:app --host 0.0.0.0 --port 8080 --workers 2
+"""
+
+import contextlib
+import contextvars
+import functools
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from a2wsgi import WSGIMiddleware
+from psycopg import AsyncClientCursor
+from psycopg.errors import QueryCanceled
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import Response
+from starlette.routing import Mount, Route
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import parse_etags
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import compression
+import dx_api
+import guardrails
+import heavy_hitters
+import hyperloglog
+import request_metrics
+from db_pool import pool_in_use, pool_open, pool_size, pool_timeouts, pool_wait_seconds, pool_waiting
+from dx_api import ANALYTICS, LIVE, STATEMENT_TIMEOUTS, response_cache
+from response_cache import cache_requests
+
+logger = logging.getLogger(__name__)
+
+# Connections for analytical queries; at most this many run at once per
+# worker, the rest wait for a connection without holding a thread
+ANALYTICS_POOL_SIZE = int(os.getenv('PGPOOL_ANALYTICS_SIZE', '4'))
+
+# Threads running requests passed to the Flask app
+WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', '8'))
+
+# How long a replica health check is trusted before the next one
+REPLICA_CHECK_INTERVAL = 5.0
+
+# psycopg 3 takes libpq keywords: 'dbname' rather than 'database'
+CONNECT_KWARGS = {('dbname' if name == 'database' else name): value
+                  for name, value in dx_api.DB_CONFIG.items() if value is not None}
+
+ERROR_TITLES = {
+    400: 'Bad request',
+    404: 'Not found',
+    413: 'Request too large',
+    429: 'Too many requests',
+    500: 'Internal server error',
+    503: 'Service unavailable'
+}
+
+# Route of the request being handled, for its statement_timeout
+_route = contextvars.ContextVar('dx_api_asgi_route', default=None)
+
+
+def connection_pool(name, size, query_class, conninfo=''):
+    """
+    Async pool whose connections run with the query class's statement_timeout.
+
+    Client-side parameter binding keeps the psycopg2-style SQL of dx_api
+    (including parameters inside literals, e.g. INTERVAL '%s hours') valid.
+    """
+    return AsyncConnectionPool(
+        conninfo, min_size=1, max_size=size, timeout=dx_api.POOL_TIMEOUT, name=name, open=False,
+        kwargs={**({} if conninfo else CONNECT_KWARGS),
+                'options': f'-c statement_timeout={STATEMENT_TIMEOUTS[query_class]}',
+                'cursor_factory': AsyncClientCursor, 'row_factory': dict_row, 'autocommit': True})
+
+
+live_pool = connection_pool('live', dx_api.POOL_SIZE, LIVE)
+analytics_pool = connection_pool('analytics', ANALYTICS_POOL_SIZE, ANALYTICS)
+replica_pool = (connection_pool('replica', ANALYTICS_POOL_SIZE, ANALYTICS, dx_api.REPLICA_DSN)
+                if dx_api.REPLICA_DSN else None)
+
+# (usable, checked at) of the last replica health check
+_replica_state = (False, float('-inf'))
+# Last ingest watermark and when it was read (time.monotonic())
+_watermark = (None, 0.0)
+
+flask_app = WSGIMiddleware(dx_api.app, workers=WSGI_THREADS)
+
+
+def pool_stats(pool):
+    """Pool occupancy in the shape of the Flask app's health endpoint"""
+    stats = pool.get_stats()
+    return {'size': stats['pool_max'], 'open': stats['pool_size'],
+            'in_use': stats['pool_size'] - stats['pool_available'], 'idle': stats['pool_available'],
+            'waiting': stats['requests_waiting']}
+
+
+def update_pool_gauges(pool):
+    """Export an async pool's occupancy under the Flask pools' metrics (pool label asgi-<name>)"""
+    stats, label = pool.get_stats(), f'asgi-{pool.name}'
+    pool_size.labels(label).set(stats['pool_max'])
+    pool_open.labels(label).set(stats['pool_size'])
+    pool_in_use.labels(label).set(stats['pool_size'] - stats['pool_available'])
+    pool_waiting.labels(label).set(stats['requests_waiting'])
+
+
+async def fetch_all(conn, query, params=None):
+    start = time.perf_counter()
+    cur = await conn.execute(query, params)
+    rows = await cur.fetchall()
+    request_metrics.record('db', time.perf_counter() - start, len(rows))
+    return rows
+
+
+async def fetch_one(conn, query, params=None):
+    start = time.perf_counter()
+    cur = await conn.execute(query, params)
+    row = await cur.fetchone()
+    request_metrics.record('db', time.perf_counter() - start, 0 if row is None else 1)
+    return row
+
+
+async def replica_usable():
+    """Whether analytical queries should use the replica (rechecked every few seconds)"""
+    global _replica_state
+    usable, checked_at = _replica_state
+    if time.monotonic() - checked_at < REPLICA_CHECK_INTERVAL:
+        return usable
+    try:
+        async with replica_pool.connection(timeout=3) as conn:
+            row = await fetch_one(conn, dx_api.REPLICA_LAG_QUERY)
+        lag = float(next(iter(row.values())))
+        usable = lag <= dx_api.REPLICA_MAX_LAG
+        if not usable:
+            logger.warning(f"Replica is {lag:.0f}s behind, using primary")
+    except Exception as e:
+        logger.warning(f"Replica check failed, using primary: {e}")
+        usable = False
+    _replica_state = (usable, time.monotonic())
+    return usable
+
+
+@contextlib.asynccontextmanager
+async def connection(query_class=LIVE):
+    """
+    Pooled connection for a query class.
+
+    Analytical queries use the replica while it is within REPLICA_MAX_LAG of
+    the primary, otherwise the analytics pool; live queries use the live pool.
+    Endpoints with a statement_timeout of their own set it for the checkout.
+    """
+    if query_class == ANALYTICS:
+        pool = replica_pool if replica_pool and await replica_usable() else analytics_pool
+    else:
+        pool = live_pool
+    start = time.perf_counter()
+    try:
+        async with pool.connection() as conn:
+            pool_wait_seconds.labels(f'asgi-{pool.name}').observe(time.perf_counter() - start)
+            update_pool_gauges(pool)
+            timeout = dx_api.ENDPOINT_STATEMENT_TIMEOUTS.get(_route.get())
+            if timeout is None:
+                yield conn
+            else:
+                await conn.execute(f"SET statement_timeout = {int(timeout)}")
+                try:
+                    yield conn
+                finally:
+                    # Back to the pool's default (set as a connection option)
+                    await conn.execute("RESET statement_timeout")
+    except PoolTimeout:
+        pool_timeouts.labels(f'asgi-{pool.name}').inc()
+        raise
+    finally:
+        update_pool_gauges(pool)
+
+
+async def ingest_watermark():
+    """(lowest, highest) spot id on the primary, or None if it cannot be read"""
+    global _watermark
+    value, read_at = _watermark
+    if value is not None and time.monotonic() - read_at < dx_api.WATERMARK_INTERVAL:
+        return value
+    try:
+        async with live_pool.connection() as conn:
+            row = await fetch_one(conn, dx_api.INGEST_WATERMARK_QUERY)
+    except Exception as e:
+        logger.warning(f"Could not read ingest watermark, not caching: {e}")
+        return None
+    value = tuple(row.values())
+    _watermark = (value, time.monotonic())
+    return value
+
+
+def json_response(payload, status_code=200):
+    """JSON response encoded exactly as the Flask app's jsonify()"""
+    return Response(dx_api.app.json.response(payload).get_data(), status_code=status_code,
+                    media_type='application/json', headers={'Access-Control-Allow-Origin': '*'})
+
+
+def error_response(code, description, headers=()):
+    """Error body of the Flask app's error handlers"""
+    if code == 404:
+        description = 'Endpoint not found'
+    elif code == 500:
+        description = 'Database or server error'
+    response = json_response({'error': ERROR_TITLES.get(code, 'Error'), 'message': str(description)}, code)
+    for name, value in headers:
+        if name == 'Retry-After':
+            response.headers[name] = value
+    return response
+
+
+def compress_response(request, response):
+    """Compress a JSON response as the Flask app does (see dx_api.compress_response)"""
+    response.headers['Vary'] = 'Accept-Encoding'
+    encoding = compression.negotiate(request.headers.get('accept-encoding'))
+    if encoding is None:
+        return response
+    etag = response.headers.get('etag')
+    if etag and not etag.startswith('W/'):
+        response.headers['ETag'] = f'W/{etag}'
+    if response.status_code in (204, 304) or len(response.body) < compression.MIN_SIZE:
+        return response
+    start = time.perf_counter()
+    response.body = compression.compress(response.body, encoding)
+    request_metrics.record('compress', time.perf_counter() - start)
+    response.headers['Content-Length'] = str(len(response.body))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def api_route(handler):
+    """
+    Apply the client's rate limit, turn abort() and unexpected errors into the
+    Flask app's JSON error responses, compress the response for the client
+    and record its metrics
+    """
+    @functools.wraps(handler)
+    async def wrapper(request):
+        route = request.url.path
+        timing = request_metrics.begin(route)
+        _route.set(route)
+        try:
+            dx_api.check_rate_limit(route, dx_api.client_key(request.headers.get('x-api-key'),
+                                                             request.client.host if request.client else None))
+            response = await handler(request)
+        except HTTPException as e:
+            response = error_response(e.code, e.description, e.get_headers())
+        except QueryCanceled:
+            guardrails.guardrail_events.labels(route, 'statement_timeout').inc()
+            response = error_response(503, dx_api.STATEMENT_TIMEOUT_MESSAGE)
+        except Exception as e:
+            logger.error(f"Error handling {request.url.path}: {e}")
+            response = error_response(500, None)
+        # Responses of the Flask app are compressed and measured there
+        if isinstance(response, Response):
+            response = compress_response(request, response)
+            timing.bytes = len(response.body)
+            timing.finish(request.method, response.status_code)
+        return response
+    return wrapper
+
+
+def cached_response(handler):
+    """
+    Serve an aggregate endpoint from the shared response cache (see dx_api.cached_response).
+
+    Keys, ETags and Cache-Control are those of the Flask app, so both serve
+    the same cache entries and validators.
+    """
+    @functools.wraps(handler)
+    async def wrapper(request):
+        watermark = await ingest_watermark()
+        if watermark is None:
+            cache_requests.labels(request.url.path, 'bypass').inc()
+            return await handler(request)
+
+        key = (request.url.path, tuple(sorted(request.query_params.multi_items())))
+        entry = response_cache.get(key, watermark)
+        if entry:
+            cache_requests.labels(request.url.path, 'hit').inc()
+        else:
+            cache_requests.labels(request.url.path, 'miss').inc()
+            response = await handler(request)
+            # Responses of the Flask app (columnar formats) are cached there
+            if not isinstance(response, Response) or response.status_code != 200:
+                return response
+            entry = response_cache.put(key, watermark, response.body, response.media_type)
+
+        headers = {**entry.headers, 'ETag': f'"{entry.etag}"', 'Access-Control-Allow-Origin': '*',
+                   'Cache-Control': (f'public, max-age={dx_api.CACHE_MAX_AGE}' if dx_api.CACHE_MAX_AGE
+                                     else 'public, no-cache')}
+        if parse_etags(request.headers.get('if-none-match')).contains_weak(entry.etag):
+            return Response(status_code=304, headers=headers)
+        return Response(entry.body, media_type=entry.content_type, headers=headers)
+    return wrapper
+
+
+def columnar_requested(params):
+    """Whether an aggregate request asks for Arrow or Parquet, which the Flask app encodes"""
+    return dx_api.response_format(params) != 'json'
+
+
+@api_route
+async def health_check(request):
+    """Health check endpoint"""
+    try:
+        async with live_pool.connection(timeout=5) as conn:
+            await conn.execute('SELECT 1')
+    except Exception as e:
+        logger.error(f"Database health check failed: {e}")
+        return json_response({'status': 'unhealthy', 'database': 'disconnected',
+                              'pool': pool_stats(live_pool)}, 500)
+    return json_response({'status': 'healthy', 'database': 'connected', 'server': 'asgi',
+                          'pool': pool_stats(live_pool), 'analytics_pool': pool_stats(analytics_pool),
+                          'replica': await replica_status(), 'cache': response_cache.stats(),
+                          'spot_feed': dx_api.spot_feed.stats(),
+                          'callsign_sketches': dx_api.callsign_sketches.stats(),
+                          'mof': dx_api.mof_tracker.stats(),
+                          'recent_spots': dx_api.recent_buffer.stats()})
+
+
+async def replica_status():
+    """Replica state reported by the health check"""
+    if not replica_pool:
+        return {'status': 'not configured'}
+    try:
+        async with replica_pool.connection(timeout=3) as conn:
+            row = await fetch_one(conn, dx_api.REPLICA_LAG_QUERY)
+    except Exception:
+        return {'status': 'disconnected', 'pool': pool_stats(replica_pool)}
+    lag = float(next(iter(row.values())))
+    return {
+        'status': 'lagging' if lag > dx_api.REPLICA_MAX_LAG else 'connected',
+        'lag_seconds': None if lag == float('inf') else round(lag, 1),
+        'pool': pool_stats(replica_pool)
+    }
+
+
+@api_route
+@cached_response
+async def get_stats(request):
+    """Get basic statistics about the database"""
+    if not dx_api.exact_counts(request.query_params):
+        async with connection(ANALYTICS) as conn:
+            range_stats = await fetch_one(conn, dx_api.STATS_RANGE_QUERY)
+            total_sketch = today_sketch = None
+            if range_stats['earliest_spot'] is not None:
+                total_sketch = await fetch_one(conn, dx_api.SKETCH_TOTALS_QUERY,
+                                               {'since': range_stats['earliest_spot']})
+                today_sketch = await fetch_one(conn, dx_api.SKETCH_TOTALS_QUERY, {'since': range_stats['today']})
+            recent_stats = await fetch_one(conn, dx_api.STATS_RECENT_QUERY)
+
+        return json_response({
+            **dx_api.approximate_stats(range_stats, total_sketch, today_sketch, recent_stats),
+            'exact': False,
+            'relative_error': round(hyperloglog.RELATIVE_ERROR, 4),
+            'timestamp': datetime.now().isoformat()
+        })
+
+    async with connection(ANALYTICS) as conn:
+        basic_stats = await fetch_one(conn, dx_api.STATS_TOTAL_QUERY)
+        today_stats = await fetch_one(conn, dx_api.STATS_TODAY_QUERY)
+        recent_stats = await fetch_one(conn, dx_api.STATS_RECENT_QUERY)
+
+    return json_response({
+        'total': basic_stats,
+        'today': today_stats,
+        'recent': recent_stats,
+        'exact': True,
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+@api_route
+@cached_response
+async def get_band_stats(request):
+    """Get per-band activity over the last `hours` hours"""
+    hours = dx_api.stats_window(request.query_params, {'hours', 'format'})
+    if columnar_requested(request.query_params):
+        return flask_app
+
+    async with connection(ANALYTICS) as conn:
+        bands = await fetch_all(conn, dx_api.WINDOW_BAND_STATS_QUERY, (hours,))
+
+    return json_response({
+        'bands': bands,
+        'total_spots': sum(band['spot_count'] for band in bands),
+        'hours': hours,
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+@api_route
+@cached_response
+async def get_top_dx_stats(request):
+    """Get the most spotted DX stations over the last `hours` hours, with their latest spot"""
+    hours = dx_api.stats_window(request.query_params, {'hours', 'limit', 'band'})
+    limit = dx_api.stats_limit(request.query_params)
+    band = request.query_params.get('band')
+
+    async with connection(ANALYTICS) as conn:
+        stations = await fetch_all(conn, dx_api.WINDOW_TOP_DX_QUERY,
+                                   {'hours': hours, 'limit': limit, 'band': band})
+
+    return json_response({
+        'stations': stations,
+        'count': len(stations),
+        'hours': hours,
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+@api_route
+@cached_response
+async def get_top_spotter_stats(request):
+    """Get the most active spotters over the last `hours` hours"""
+    hours = dx_api.stats_window(request.query_params, {'hours', 'limit', 'band'})
+    limit = dx_api.stats_limit(request.query_params)
+    band = request.query_params.get('band')
+
+    async with connection(ANALYTICS) as conn:
+        spotters = await fetch_all(conn, dx_api.WINDOW_TOP_SPOTTERS_QUERY,
+                                   {'hours': hours, 'limit': limit, 'band': band})
+
+    return json_response({
+        'spotters': spotters,
+        'count': len(spotters),
+        'hours': hours,
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+@api_route
+@cached_response
+async def get_propagation_stats(request):
+    """Get a propagation summary (overall, per band and per hour) for the last `hours` hours"""
+    hours = dx_api.stats_window(request.query_params, {'hours'})
+
+    async with connection(ANALYTICS) as conn:
+        summary = await fetch_one(conn, dx_api.WINDOW_SUMMARY_QUERY, (hours,))
+        bands = await fetch_all(conn, dx_api.WINDOW_BAND_PROPAGATION_QUERY, (hours,))
+        hourly = await fetch_all(conn, dx_api.WINDOW_HOURLY_BANDS_QUERY, (hours,))
+
+    return json_response({
+        **dx_api.propagation_summary(summary, bands, hourly, hours),
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+@api_route
+async def get_recent_spots(request):
+    """Get recent spots (last N hours)"""
+    hours = min(int(request.query_params.get('hours', 24)), 168)  # Max 7 days
+    limit = min(int(request.query_params.get('limit', 50)), 500)
+    shape = dx_api.response_shape(request.query_params)
+
+    spots = dx_api.buffered_recent_spots(hours, limit)
+    if spots is None:
+        async with connection() as conn:
+            spots = await fetch_all(conn, dx_api.RECENT_SPOTS_QUERY, (hours, limit))
+
+    return json_response({
+        **dx_api.spot_list(spots, shape),
+        'hours': hours,
+        'count': len(spots),
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+@api_route
+@cached_response
+async def get_bands(request):
+    """Get list of active bands with spot counts"""
+    if columnar_requested(request.query_params):
+        return flask_app
+
+    if not dx_api.exact_counts(request.query_params):
+        async with connection(ANALYTICS) as conn:
+            range_stats = await fetch_one(conn, dx_api.STATS_RANGE_QUERY)
+            sketches = []
+            if range_stats['earliest_spot'] is not None:
+                sketches = await fetch_all(conn, dx_api.BAND_SKETCHES_QUERY,
+                                           {'since': range_stats['earliest_spot']})
+
+        return json_response({
+            'bands': dx_api.approximate_bands(sketches),
+            'exact': False,
+            'relative_error': round(hyperloglog.RELATIVE_ERROR, 4),
+            'timestamp': datetime.now().isoformat()
+        })
+
+    async with connection(ANALYTICS) as conn:
+        bands = await fetch_all(conn, dx_api.BANDS_QUERY)
+
+    return json_response({
+        'bands': bands,
+        'exact': True,
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+@api_route
+@cached_response
+async def get_frequency_histogram(request):
+    """Get frequency distribution histogram, optionally of the last N hours and with band edges"""
+    bins, hours, band, edges = dx_api.histogram_request(request.query_params)
+    if columnar_requested(request.query_params):
+        return flask_app
+
+    query, query_params, precomputed = dx_api.histogram_query(bins, hours, band, edges)
+    async with connection(ANALYTICS) as conn:
+        rows = await fetch_all(conn, query, query_params)
+
+    histogram = await run_in_threadpool(dx_api.frequency_histogram, rows, bins)
+    return json_response({
+        **dx_api.histogram_fields(histogram, bins, hours, band, edges, precomputed),
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+@api_route
+@cached_response
+async def get_hourly_activity(request):
+    """Get hourly activity statistics"""
+    hours = min(int(request.query_params.get('hours', 24)), 168)  # Max 7 days
+    if columnar_requested(request.query_params):
+        return flask_app
+
+    if not dx_api.exact_counts(request.query_params):
+        since = datetime.now(timezone.utc) - timedelta(hours=hours)
+        async with connection() as conn:
+            sketches = await fetch_all(conn, dx_api.HOURLY_SKETCHES_QUERY, {'since': since})
+
+        return json_response({
+            'activity': dx_api.approximate_hourly_activity(sketches),
+            'hours': hours,
+            'exact': False,
+            'relative_error': round(hyperloglog.RELATIVE_ERROR, 4),
+            'timestamp': datetime.now().isoformat()
+        })
+
+    async with connection() as conn:
+        activity = await fetch_all(conn, dx_api.HOURLY_ACTIVITY_QUERY, (hours,))
+
+    return json_response({
+        'activity': activity,
+        'hours': hours,
+        'exact': True,
+        'timestamp': datetime.now().isoformat()
+    })
+
+
+@api_route
+@cached_response
+async def get_activity_cube(request):
+    """Get spot counts and distinct stations per UTC day, hour and band (and mode) over a date range"""
+    since, day_count, by_mode, encoding = dx_api.cube_request(request.query_params)
+
+    async with connection(ANALYTICS) as conn:
+        rows = await fetch_all(conn, dx_api.ACTIVITY_CUBE_QUERY, dx_api.cube_query_params(since, day_count, by_mode))
+
+    cube = await run_in_threadpool(dx_api.activity_cube, rows, since, day_count, by_mode, encoding)
+    return json_response({**cube, 'timestamp': datetime.now().isoformat()})
+
+
+@api_route
+@cached_response
+async def get_top_callsigns(request):
+    """Get top active callsigns (spotters and spotted) over a window"""
+    limit, category, window, exact = dx_api.top_callsigns_request(request.query_params)
+
+    if not exact:
+        # Merging the summaries' buckets is CPU work: keep it off the event loop
+        result = await run_in_threadpool(dx_api.sketch_top_callsigns, category, window, limit)
+        if result is not None:
+            return json_response({**result, 'window': window, 'exact': False,
+                                  'timestamp': datetime.now().isoformat()})
+
+    # Exact counts, or the summaries are still loading
+    result = {}
+    params = {'hours': heavy_hitters.window_hours(window), 'limit': limit}
+    async with connection(ANALYTICS) as conn:
+        if category in ['spotters', 'both']:
+            result['top_spotters'] = await fetch_all(conn, dx_api.TOP_SPOTTERS_QUERY, params)
+        if category in ['spotted', 'both']:
+            result['top_spotted'] = await fetch_all(conn, dx_api.TOP_SPOTTED_QUERY, params)
+
+    result['window'] = window
+    result['exact'] = True
+    result['timestamp'] = datetime.now().isoformat()
+    return json_response(result)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    pools = [pool for pool in (live_pool, analytics_pool, replica_pool) if pool]
+    for pool in pools:
+        # Connections are opened in the background; startup does not wait for the database
+        await pool.open()
+    # Native handlers bypass the Flask app's before_request: warm the recent spots here
+    dx_api.start_recent_spots()
+    try:
+        yield
+    finally:
+        for pool in pools:
+            await pool.close()
+
+
+app = Starlette(
+    routes=[
+        Route('/api/health', health_check),
+        Route('/api/stats', get_stats),
+        Route('/api/stats/bands', get_band_stats),
+        Route('/api/stats/top-dx', get_top_dx_stats),
+        Route('/api/stats/top-spotters', get_top_spotter_stats),
+        Route('/api/stats/propagation', get_propagation_stats),
+        Route('/api/spots/recent', get_recent_spots),
+        Route('/api/bands', get_bands),
+        Route('/api/frequency/histogram', get_frequency_histogram),
+        Route('/api/activity/hourly', get_hourly_activity),
+        Route('/api/activity/cube', get_activity_cube),
+        Route('/api/callsigns/top', get_top_callsigns),
+        # Everything else, including CORS preflight requests, is served by the Flask app
+        Mount('/', app=flask_app)
+    ],
+    lifespan=lifespan
+)
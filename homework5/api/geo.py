@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Location helpers for the spatial spot queries of the DX Cluster API.
+
+Spots are indexed by the 4-character Maidenhead square (2 degrees of
+longitude by 1 degree of latitude) of their stored coordinates; see
+db_migrations/012_spots_location_index.sql. A radius or bounding-box query
+lists the squares its area overlaps, so the database reads only the index
+entries of those squares, and the exact distance or box test is applied to
+the rows found.
+
+Square names are computed exactly as latlon_to_maidenhead(lat, lon, 4) in the
+database, so they match the index keys.
+
+great_circle_paths computes the spotter to DX paths of many spots at once
+with NumPy array operations (no per-spot Python loop).
+"""
+
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Squares per axis of the 4-character grid (18 fields of 10 squares)
+SQUARES = 180
+
+# Above this many squares a query scans its time window instead (e.g. a
+# whole-world map view), which is cheaper than thousands of index probes
+MAX_SQUARES = 2000
+
+
+def is_grid(grid):
+    """Whether text is a valid 4, 6 or 8 character Maidenhead locator"""
+    if not grid or len(grid) not in (4, 6, 8):
+        return False
+    grid = grid.upper()
+    return ('A' <= grid[0] <= 'R' and 'A' <= grid[1] <= 'R' and grid[2:4].isdigit()
+            and (len(grid) < 6 or ('A' <= grid[4] <= 'X' and 'A' <= grid[5] <= 'X'))
+            and (len(grid) < 8 or grid[6:8].isdigit()))
+
+
+def grid_center(grid):
+    """(lat, lon) of the center of a valid 4, 6 or 8 character locator"""
+    grid = grid.upper()
+    lon = (ord(grid[0]) - 65) * 20 + int(grid[2]) * 2
+    lat = (ord(grid[1]) - 65) * 10 + int(grid[3])
+    lon_size, lat_size = 2.0, 1.0
+    if len(grid) >= 6:
+        lon_size, lat_size = 2 / 24, 1 / 24
+        lon += (ord(grid[4]) - 65) * lon_size
+        lat += (ord(grid[5]) - 65) * lat_size
+    if len(grid) == 8:
+        lon_size, lat_size = lon_size / 10, lat_size / 10
+        lon += int(grid[6]) * lon_size
+        lat += int(grid[7]) * lat_size
+    return lat - 90 + lat_size / 2, lon - 180 + lon_size / 2
+
+
+def _square_name(x, y):
+    return f"{chr(65 + x // 10)}{chr(65 + y // 10)}{x % 10}{y % 10}"
+
+
+def _square_index(degrees, size, offset):
+    return min(max(math.floor((degrees + offset) / size), 0), SQUARES - 1)
+
+
+def squares_in_box(min_lat, min_lon, max_lat, max_lon):
+    """
+    4-character squares overlapping a box, or None if there are more than MAX_SQUARES.
+
+    A box with min_lon > max_lon crosses the antimeridian.
+    """
+    y0, y1 = _square_index(min_lat, 1, 90), _square_index(max_lat, 1, 90)
+    x0, x1 = _square_index(min_lon, 2, 180), _square_index(max_lon, 2, 180)
+    columns = list(range(x0, x1 + 1)) if x0 <= x1 else list(range(x0, SQUARES)) + list(range(0, x1 + 1))
+    if len(columns) * (y1 - y0 + 1) > MAX_SQUARES:
+        return None
+    return [_square_name(x, y) for x in columns for y in range(y0, y1 + 1)]
+
+
+def radius_box(lat, lon, radius_km):
+    """
+    Box (min_lat, min_lon, max_lat, max_lon) containing a circle.
+
+    Longitudes span the whole world when the circle reaches a pole; a box
+    crossing the antimeridian has min_lon > max_lon.
+    """
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90), -180, min(max_lat, 90), 180
+    # Widest longitude extent of the circle (at the latitude of its tangent points)
+    dlon = math.degrees(math.asin(min(1.0, math.sin(radius_km / EARTH_RADIUS_KM) /
+                                      math.cos(math.radians(lat)))))
+    if dlon >= 180:
+        return min_lat, -180, max_lat, 180
+    return min_lat, wrap_lon(lon - dlon), max_lat, wrap_lon(lon + dlon)
+
+
+def wrap_lon(lon):
+    """Longitude in [-180, 180)"""
+    return (lon + 180) % 360 - 180
+
+
+def great_circle_paths(lat1, lon1, lat2, lon2, points):
+    """
+    Distance, initial bearing and a densified polyline of each great-circle path.
+
+    Args:
+        lat1, lon1, lat2, lon2: Arrays (degrees) of the path ends, one element per path
+        points: Vertices per polyline, both ends included (at least 2)
+
+    Returns:
+        tuple: (distance_km, bearing_deg, lats, lons); lats and lons have one
+               row of `points` vertices per path. Longitudes are unwrapped
+               along each path (they may pass 180 or -180) so that lines
+               crossing the antimeridian are drawn without a jump.
+    """
+    phi1, lam1, phi2, lam2 = (np.radians(np.asarray(a, dtype=float)) for a in (lat1, lon1, lat2, lon2))
+    dlam = lam2 - lam1
+
+    # Haversine central angle, and the initial bearing from the first end
+    h = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlam / 2) ** 2
+    angle = 2 * np.arcsin(np.sqrt(np.clip(h, 0, 1)))
+    bearing = np.degrees(np.arctan2(np.sin(dlam) * np.cos(phi2),
+                                    np.cos(phi1) * np.sin(phi2) - np.sin(phi1) * np.cos(phi2) * np.cos(dlam))) % 360
+
+    # Spherical interpolation between the ends' unit vectors; coincident ends
+    # (sin(angle) ~ 0) fall back to linear weights. Antipodal ends have no
+    # single great circle and give a degenerate line.
+    ends = [np.stack([np.cos(phi) * np.cos(lam), np.cos(phi) * np.sin(lam), np.sin(phi)])
+            for phi, lam in ((phi1, lam1), (phi2, lam2))]
+    fraction = np.linspace(0, 1, points)[:, np.newaxis]
+    sin_angle = np.sin(angle)
+    degenerate = sin_angle < 1e-9
+    safe_sin = np.where(degenerate, 1, sin_angle)
+    weight1 = np.where(degenerate, 1 - fraction, np.sin((1 - fraction) * angle) / safe_sin)
+    weight2 = np.where(degenerate, fraction, np.sin(fraction * angle) / safe_sin)
+    x, y, z = (weight1 * ends[0][axis] + weight2 * ends[1][axis] for axis in range(3))
+
+    lats = np.degrees(np.arctan2(z, np.hypot(x, y))).T
+    lons = np.degrees(np.unwrap(np.arctan2(y, x), axis=0)).T
+    return angle * EARTH_RADIUS_KM, bearing, lats, lons
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Guardrails that keep single clients and single queries from pinning the
+database behind the DX Cluster API.
+
+- Rate limiting: every client (API key, or IP address) has a token bucket
+  refilled at a steady rate; a request takes one token, and a client with
+  an empty bucket is told when to retry (429).
+- Query cost: the planner's estimate of a query (EXPLAIN, no execution) is
+  compared with a budget before the query is run, so an expensive query is
+  rejected (413) or replaced by a cheaper form instead of running for
+  seconds.
+
+Statement timeouts per endpoint are applied by the API when it checks out a
+connection (see dx_api.statement_timeout).
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from prometheus_client import Counter, Histogram
+
+guardrail_events = Counter('dx_api_guardrail_events_total',
+                           'Requests stopped or downgraded by a guardrail (rate_limited, cost_rejected, '
+                           'count_downgraded, statement_timeout)', ['route', 'action'])
+query_cost = Histogram('dx_api_query_cost', 'Planner cost estimates of budgeted queries', ['route'],
+                       buckets=[100, 1000, 10000, 50000, 100000, 250000, 500000, 1000000, 10000000])
+
+
+class RateLimiter:
+    """Token buckets per client: `rate` requests per second, bursts of up to `burst`"""
+
+    def __init__(self, rate, burst, max_clients=10000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # client -> (tokens, time.monotonic() of the last update)
+        self._lock = threading.Lock()
+
+    def acquire(self, client):
+        """
+        Take a token for one request.
+
+        Returns:
+            0 if the request may proceed, otherwise the seconds until the
+            client's next token
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(client, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[client] = (tokens, now)
+            # Clients seen least recently are forgotten first (a full bucket again)
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+def explain(cur, query, params=None):
+    """Top plan node of a query's EXPLAIN (FORMAT JSON), without running it"""
+    cur.execute(f"EXPLAIN (FORMAT JSON) {query}", params)
+    row = cur.fetchone()
+    plan = next(iter(row.values())) if isinstance(row, dict) else row[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]['Plan']
+
+
+def parse_limits(value):
+    """Per-route limits from a "route=number,route=number" setting"""
+    limits = {}
+    for item in (value or '').split(','):
+        if '=' in item:
+            route, limit = item.rsplit('=', 1)
+            limits[route.strip()] = float(limit)
+    return limits
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Streaming top-N callsigns for the DX Cluster API.
+
+/api/callsigns/top answers from in-memory Space-Saving summaries (Metwally,
+Agrawal and El Abbadi, 2005) instead of grouping dx_spots. A summary keeps at
+most `capacity` counters; a callsign without a counter takes over the
+smallest one, so every count is an overestimate by at most the count it took
+over, and no callsign with more than N / capacity spots (N spots counted) can
+be missing from the top.
+
+Sliding windows (1h, 24h, 7d) keep one summary per time bucket and merge the
+buckets inside the window when asked; buckets that leave the window are
+dropped, so each window's edge is rounded to its bucket width. The 'all'
+window is a single summary.
+
+The summaries are loaded from exact per-bucket counts once per worker, then
+fed every new spot by the live spot feed (spot_feed.SpotFeed.listen); spots
+arriving while they load are replayed afterwards.
+"""
+
+import heapq
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Window name -> (window seconds, bucket seconds); None is all spots
+WINDOWS = {
+    '1h': (3600, 300),
+    '24h': (86400, 3600),
+    '7d': (604800, 21600),
+    'all': (None, None)
+}
+
+# Category -> spot field counted
+CATEGORIES = {'spotters': 'spotter_call', 'spotted': 'dx_call'}
+
+# Seconds between attempts to load the summaries after a failure
+RETRY_INTERVAL = 30
+
+
+class SpaceSaving:
+    """Space-Saving summary: approximate counts of the most frequent keys in `capacity` counters"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counters = {}  # key -> [count, error, last seen]
+        # Highest count of a key left out when loading exact counts
+        self.floor = 0
+        # (count, key) of every counter, plus stale entries for counts since raised
+        self._heap = []
+
+    def add(self, key, weight=1, seen=None):
+        counter = self.counters.get(key)
+        if counter is None:
+            if len(self.counters) < self.capacity:
+                counter = self.counters[key] = [self.floor, self.floor, seen]
+            else:
+                # The new key takes over the smallest counter, whose count bounds its error
+                minimum, evicted = self._pop_minimum()
+                del self.counters[evicted]
+                counter = self.counters[key] = [minimum, minimum, seen]
+        counter[0] += weight
+        if seen is not None and (counter[2] is None or seen > counter[2]):
+            counter[2] = seen
+        heapq.heappush(self._heap, (counter[0], key))
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    def load(self, counts):
+        """Start from exact (key, count, last seen) counts, highest first; the top `capacity` are kept"""
+        for key, count, seen in counts:
+            if len(self.counters) < self.capacity:
+                self.counters[key] = [count, 0, seen]
+            else:
+                self.floor = max(self.floor, count)
+        self._rebuild_heap()
+
+    def minimum(self):
+        """Highest possible count of a key without a counter"""
+        if len(self.counters) < self.capacity:
+            return self.floor
+        count, key = self._heap[0]
+        while self.counters.get(key, (None,))[0] != count:
+            heapq.heappop(self._heap)
+            count, key = self._heap[0]
+        return count
+
+    def _pop_minimum(self):
+        while True:
+            count, key = heapq.heappop(self._heap)
+            if self.counters.get(key, (None,))[0] == count:
+                return count, key
+
+    def _rebuild_heap(self):
+        self._heap = [(counter[0], key) for key, counter in self.counters.items()]
+        heapq.heapify(self._heap)
+
+
+class SlidingTopK:
+    """Space-Saving summaries of a sliding window, one per bucket (or one for all time)"""
+
+    def __init__(self, capacity, window_seconds=None, bucket_seconds=None):
+        self.capacity = capacity
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.buckets = {}  # bucket number -> SpaceSaving
+
+    def bucket(self, epoch):
+        return 0 if self.window_seconds is None else int(epoch // self.bucket_seconds)
+
+    def first_bucket(self, now):
+        """Oldest bucket inside the window at `now` (epoch seconds)"""
+        return 0 if self.window_seconds is None else self.bucket(now - self.window_seconds)
+
+    def add(self, key, epoch, seen=None):
+        number = self.bucket(epoch)
+        if number >= self.first_bucket(time.time()):
+            self._summary(number).add(key, 1, seen)
+
+    def load(self, number, counts):
+        self._summary(number).load(counts)
+
+    def top(self, n, now):
+        """
+        The `n` keys with the highest counts in the window.
+
+        Returns:
+            list of (key, count, error, last seen): the true count is between
+            count - error and count
+        """
+        first = self.first_bucket(now)
+        for number in [number for number in self.buckets if number < first]:
+            del self.buckets[number]
+
+        # A key without a counter in a bucket may still have up to that
+        # bucket's minimum there, which is added to its count and error
+        minimums = {number: summary.minimum() for number, summary in self.buckets.items()}
+        missing = sum(minimums.values())
+        totals = {}  # key -> [count, error, last seen]
+        for number, summary in self.buckets.items():
+            for key, (count, error, seen) in summary.counters.items():
+                total = totals.get(key)
+                if total is None:
+                    total = totals[key] = [missing, missing, seen]
+                total[0] += count - minimums[number]
+                total[1] += error - minimums[number]
+                if seen is not None and (total[2] is None or seen > total[2]):
+                    total[2] = seen
+        best = heapq.nlargest(n, totals.items(), key=lambda item: item[1][0])
+        return [(key, count, error, seen) for key, (count, error, seen) in best]
+
+    def counters(self):
+        return sum(len(summary.counters) for summary in self.buckets.values())
+
+    def _summary(self, number):
+        summary = self.buckets.get(number)
+        if summary is None:
+            summary = self.buckets[number] = SpaceSaving(self.capacity)
+        return summary
+
+
+class CallsignSketches:
+    """Top spotters and top spotted DX stations for each window, fed by the live spot feed"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.sketches = {(category, window): SlidingTopK(capacity, *WINDOWS[window])
+                         for category in CATEGORIES for window in WINDOWS}
+        self.ready = False
+        self.last_error = None
+        self._pending = []
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def start(self, feed, load):
+        """
+        Subscribe to the feed and load the summaries in the background (once per process).
+
+        Args:
+            feed: SpotFeed whose new spots are counted
+            load: load(last_id) returning {(category, window): {bucket: [(callsign,
+                  count, last seen), ...] highest first}} for the spots up to
+                  last_id (None: no spots yet)
+        """
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            last_id = feed.listen(self.add_spots)
+            self._thread = threading.Thread(target=self._load, args=(load, last_id),
+                                            name='callsign-sketches', daemon=True)
+            self._thread.start()
+
+    def add_spots(self, spots):
+        """Count new spots (called by the feed thread)"""
+        with self._lock:
+            if not self.ready:
+                self._pending.extend(spots)
+                return
+            self._add(spots)
+
+    def top(self, category, window, n):
+        """
+        Top `n` callsigns of a category in a window, or None while the summaries load.
+
+        Returns:
+            list of (callsign, count, error, last seen)
+        """
+        with self._lock:
+            if not self.ready:
+                return None
+            return self.sketches[(category, window)].top(n, time.time())
+
+    def stats(self):
+        """Summary state for the health endpoint"""
+        with self._lock:
+            return {'ready': self.ready, 'capacity': self.capacity, 'pending': len(self._pending),
+                    'counters': sum(sketch.counters() for sketch in self.sketches.values()),
+                    'last_error': self.last_error}
+
+    def _add(self, spots):
+        for spot in spots:
+            epoch = spot['timestamp'].timestamp()
+            for (category, _), sketch in self.sketches.items():
+                callsign = spot.get(CATEGORIES[category])
+                if callsign:
+                    sketch.add(callsign, epoch, spot['timestamp'])
+
+    def _load(self, load, last_id):
+        while True:
+            try:
+                counts = load(last_id) if last_id is not None else {}
+                break
+            except Exception as e:
+                logger.warning(f"Could not load callsign counts, retrying in {RETRY_INTERVAL}s: {e}")
+                self.last_error = str(e)
+                time.sleep(RETRY_INTERVAL)
+        with self._lock:
+            for key, buckets in counts.items():
+                for number, bucket_counts in buckets.items():
+                    self.sketches[key].load(number, bucket_counts)
+            self._add(self._pending)
+            self._pending = []
+            self.ready = True
+            self.last_error = None
+        logger.info("Callsign summaries loaded")
+
+
+def window_hours(window):
+    """Length of a window in hours, None for 'all'"""
+    seconds = WINDOWS[window][0]
+    return None if seconds is None else seconds // 3600
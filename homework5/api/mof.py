@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Sliding-window Maximum Observed Frequency (MOF) for the DX Cluster API.
+
+The MOF is the highest HF frequency spotted in the last few minutes, a rough
+indicator of how high the ionosphere currently supports propagation. Instead
+of scanning dx_spots for every dashboard refresh, each worker keeps the MOF of
+every window up to date from the live spot feed (spot_feed.SpotFeed.listen).
+
+Each window and group (all spots, a band group or the spotter's country) is a
+monotonic deque (WindowMax): spots in arrival order whose frequencies decrease
+from front to back. A new spot removes the spots at the back it is at least as
+high as, since they can no longer be the maximum before it leaves the window,
+and spots leave from the front as they age out; the front is the MOF. Each
+spot is added and removed once, so keeping every window costs O(1) per spot,
+and reading the MOF is O(1).
+"""
+
+import math
+import threading
+import time
+from collections import deque
+
+from prometheus_client import Gauge
+
+# Window name -> seconds
+WINDOWS = {'15m': 900, '30m': 1800, '1h': 3600}
+
+# HF range of the MOF (kHz): 40m up to the top of 10m
+MIN_KHZ = 7000
+MAX_KHZ = 29700
+
+# Band group -> frequency range (kHz)
+BAND_GROUPS = {
+    'low': (7000, 10150),    # 40m, 30m
+    'mid': (14000, 18168),   # 20m, 17m
+    'high': (21000, 29700)   # 15m, 12m, 10m
+}
+
+# Groupings of the MOF: one for all spots, per band group, per spotter country
+GROUPINGS = ('all', 'band_group', 'country')
+
+# Spot fields reported with the spot that set the MOF
+SPOT_FIELDS = ('id', 'timestamp', 'frequency', 'band', 'dx_call', 'spotter_call', 'spotter_country')
+
+mof_gauge = Gauge('dx_api_mof_mhz', 'Maximum observed frequency (MHz) of the spots in a sliding window '
+                  '(NaN: no spots)', ['window', 'band_group'])
+
+
+def band_group(frequency):
+    """Band group of a frequency (kHz), None outside every group"""
+    for name, (low, high) in BAND_GROUPS.items():
+        if low <= frequency <= high:
+            return name
+    return None
+
+
+class WindowMax:
+    """Maximum of the values added in the last `seconds` seconds (monotonic deque)"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self._deque = deque()  # (time, value, item), values decreasing from front to back
+
+    def add(self, epoch, value, item=None):
+        if self._deque:
+            # The feed delivers spots in id order, which is nearly but not exactly
+            # time order: an older spot is kept as if it came with the last one
+            epoch = max(epoch, self._deque[-1][0])
+        while self._deque and self._deque[-1][1] <= value:
+            self._deque.pop()
+        self._deque.append((epoch, value, item))
+
+    def maximum(self, now):
+        """(value, item) of the highest value in the window ending at `now`, or None"""
+        while self._deque and self._deque[0][0] <= now - self.seconds:
+            self._deque.popleft()
+        if not self._deque:
+            return None
+        _, value, item = self._deque[0]
+        return value, item
+
+    def __len__(self):
+        return len(self._deque)
+
+
+class MofTracker:
+    """MOF of every window and group, fed by the live spot feed"""
+
+    def __init__(self):
+        # (window, grouping) -> group -> WindowMax
+        self.maxima = {(window, grouping): {} for window in WINDOWS for grouping in GROUPINGS}
+        self.ready = False
+        self._last_id = None
+        self._listening = False
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+
+    def start(self, feed, load):
+        """
+        Subscribe to the feed and load the spots of the longest window (once per process).
+
+        Args:
+            feed: SpotFeed whose new spots are added
+            load: load(last_id, seconds) returning the HF spots up to last_id of
+                  the last `seconds` seconds, oldest first
+
+        Raises:
+            Exception: the spots could not be loaded; the next call retries
+        """
+        with self._start_lock:
+            if self.ready:
+                return
+            if not self._listening:
+                self._last_id = feed.listen(self.add_spots)
+                self._listening = True
+            spots = load(self._last_id, max(WINDOWS.values())) if self._last_id is not None else []
+            with self._lock:
+                self._add(spots)
+                self._add(self._pending)
+                self._pending.clear()
+                self.ready = True
+
+    def add_spots(self, spots):
+        """Add new spots (called by the feed thread)"""
+        with self._lock:
+            if not self.ready:
+                # Keep only what the longest window can still use until the load succeeds
+                self._pending.extend(spots)
+                oldest = time.time() - max(WINDOWS.values())
+                while self._pending and self._pending[0]['timestamp'].timestamp() <= oldest:
+                    self._pending.popleft()
+                return
+            self._add(spots)
+
+    def mof(self, window, grouping):
+        """
+        MOF of each group in a window, highest first.
+
+        Returns:
+            list of (group, frequency in kHz, spot fields of the spot that set it)
+        """
+        now = time.time()
+        result = []
+        with self._lock:
+            groups = self.maxima[(window, grouping)]
+            for group, maximum in list(groups.items()):
+                top = maximum.maximum(now)
+                if top is None:
+                    # Countries come and go: drop the empty ones
+                    del groups[group]
+                    continue
+                result.append((group, *top))
+        return sorted(result, key=lambda entry: entry[1], reverse=True)
+
+    def update_gauges(self):
+        """Set dx_api_mof_mhz for every window, overall and per band group"""
+        for window in WINDOWS:
+            values = {group: frequency for group, frequency, _ in self.mof(window, 'band_group')}
+            overall = self.mof(window, 'all')
+            values['all'] = overall[0][1] if overall else None
+            for group in ['all', *BAND_GROUPS]:
+                frequency = values.get(group)
+                mof_gauge.labels(window, group).set(math.nan if frequency is None else frequency / 1000)
+
+    def stats(self):
+        """Tracker state for the health endpoint"""
+        with self._lock:
+            return {'ready': self.ready, 'pending': len(self._pending),
+                    'spots': sum(len(maximum) for groups in self.maxima.values() for maximum in groups.values())}
+
+    def _add(self, spots):
+        now = time.time()
+        for spot in spots:
+            if spot.get('frequency') is None:
+                continue
+            frequency = float(spot['frequency'])
+            if not MIN_KHZ <= frequency <= MAX_KHZ:
+                continue
+            epoch = spot['timestamp'].timestamp()
+            item = {field: spot.get(field) for field in SPOT_FIELDS}
+            groups = {'all': 'all', 'band_group': band_group(frequency), 'country': spot.get('spotter_country')}
+            for window, seconds in WINDOWS.items():
+                if epoch <= now - seconds:
+                    continue
+                for grouping, group in groups.items():
+                    if group is None:
+                        continue
+                    maxima = self.maxima[(window, grouping)]
+                    maximum = maxima.get(group)
+                    if maximum is None:
+                        maximum = maxima[group] = WindowMax(seconds)
+                    maximum.add(epoch, frequency, item)
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+In-process buffer of the most recent spots for the DX Cluster API.
+
+Every dashboard page asks for /api/spots/recent or for /api/spots since a few
+minutes ago, which are spots stored moments before. Each worker keeps the
+spots of the last `hours` hours in memory, in (timestamp, id) order, and
+answers those requests by filtering the buffer; requests reaching further
+back, or made before the buffer has loaded, are answered by PostgreSQL.
+
+The buffer is loaded once per worker from dx_spots, then fed every new spot
+by the live spot feed (spot_feed.SpotFeed.listen), which polls dx_spots by
+id; spots arriving while it loads are replayed afterwards. It lags the
+database by at most the feed's poll interval, and is not used while the
+feed's polls fail. At most `max_spots` spots are
+kept: after a burst the oldest are dropped, and the buffer then answers only
+for the time after them.
+"""
+
+import bisect
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+from prometheus_client import Counter
+
+from spot_feed import row_matches
+
+logger = logging.getLogger(__name__)
+
+# Seconds between attempts to load the buffer after a failure
+RETRY_INTERVAL = 30
+
+recent_spot_requests = Counter('dx_api_recent_spots_requests_total',
+                               'Spot requests by where they were answered (buffer: in-process recent '
+                               'spots, database: not covered by the buffer)', ['route', 'source'])
+
+
+def buffer_filters(filters):
+    """
+    Whether spot filters can be applied to the buffer.
+
+    The SQL applies 'contains' filters with ILIKE, where % and _ are
+    wildcards; values holding them are left to the database.
+    """
+    return all(op != 'contains' or not ('%' in value or '_' in value)
+               for _, op, value in filters)
+
+
+class RecentSpots:
+    """Spots of the last `hours` hours, oldest first, fed by the live spot feed"""
+
+    def __init__(self, hours, max_spots):
+        self.seconds = hours * 3600
+        self.max_spots = max_spots
+        self.ready = False
+        self.last_error = None
+        self._spots = []
+        self._keys = []  # (timestamp, id) of each spot
+        # Every spot after this time is in the buffer (once ready)
+        self._horizon = None
+        self._pending = []
+        self._feed = None
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def start(self, feed, load):
+        """
+        Subscribe to the feed and load the buffer in the background (once per process).
+
+        Args:
+            feed: SpotFeed whose new spots are added
+            load: load(last_id, seconds) returning the spots up to last_id of
+                  the last `seconds` seconds in (timestamp, id) order
+        """
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            self._feed = feed
+            self._thread = threading.Thread(target=self._load, args=(feed, load),
+                                            name='recent-spots', daemon=True)
+            self._thread.start()
+
+    def add_spots(self, spots):
+        """Add new spots (called by the feed thread)"""
+        with self._lock:
+            if not self.ready:
+                self._pending.extend(spots)
+                del self._pending[:-self.max_spots]
+                return
+            self._add(spots)
+
+    def covers(self, since):
+        """Whether the buffer holds every spot from `since` (an aware datetime) on"""
+        # While the feed cannot poll, the buffer falls behind the database
+        if not self.ready or since.tzinfo is None or self._feed.last_error is not None:
+            return False
+        with self._lock:
+            return since > self._horizon
+
+    def select(self, since, until=None, filters=()):
+        """
+        Spots from `since` to `until` (inclusive) that pass (column, op, value)
+        filters, oldest first, or None if the buffer does not cover them.
+        """
+        if not self.covers(since) or (until is not None and until.tzinfo is None):
+            return None
+        with self._lock:
+            start = bisect.bisect_left(self._keys, (since,))
+            end = len(self._keys) if until is None else bisect.bisect_right(self._keys, (until, math.inf))
+            return [spot for spot in self._spots[start:end] if row_matches(spot, filters)]
+
+    def newest(self, since, limit):
+        """The newest `limit` spots from `since` on, newest first, or None if the buffer does not cover them"""
+        if not self.covers(since):
+            return None
+        with self._lock:
+            start = max(bisect.bisect_left(self._keys, (since,)), len(self._keys) - limit)
+            return self._spots[start:][::-1]
+
+    def stats(self):
+        """Buffer state for the health endpoint"""
+        with self._lock:
+            return {'ready': self.ready, 'spots': len(self._spots), 'pending': len(self._pending),
+                    'oldest': self._keys[0][0].isoformat() if self._keys else None,
+                    'last_error': self.last_error}
+
+    def _load(self, feed, load):
+        last_id, listening = None, False
+        while True:
+            try:
+                if not listening:
+                    last_id = feed.listen(self.add_spots)
+                    listening = True
+                spots = load(last_id, self.seconds) if last_id is not None else []
+                break
+            except Exception as e:
+                logger.warning(f"Could not load the recent spots, retrying in {RETRY_INTERVAL}s: {e}")
+                self.last_error = str(e)
+                time.sleep(RETRY_INTERVAL)
+        with self._lock:
+            self._add(spots)
+            self._add(self._pending)
+            self._pending = []
+            self.ready = True
+            self.last_error = None
+        logger.info(f"Recent spots loaded ({len(spots)} spots)")
+
+    def _add(self, spots):
+        horizon = datetime.fromtimestamp(time.time() - self.seconds, timezone.utc)
+        if self._horizon is not None:
+            horizon = max(horizon, self._horizon)
+        for spot in spots:
+            if spot['timestamp'] <= horizon:
+                continue
+            key = (spot['timestamp'], spot['id'])
+            if not self._keys or key > self._keys[-1]:
+                self._keys.append(key)
+                self._spots.append(spot)
+            else:
+                # The feed delivers spots in id order, which is nearly but not exactly time order
+                index = bisect.bisect(self._keys, key)
+                self._keys.insert(index, key)
+                self._spots.insert(index, spot)
+
+        # Drop the spots that left the window, then the oldest beyond max_spots.
+        # Spots are only dropped here, so between two batches the buffer also
+        # holds the spots that have since aged out of the window.
+        expired = bisect.bisect_right(self._keys, (horizon, math.inf))
+        excess = max(len(self._keys) - expired - self.max_spots, 0)
+        if excess:
+            horizon = self._keys[expired + excess - 1][0]
+        if expired + excess:
+            del self._keys[:expired + excess]
+            del self._spots[:expired + excess]
+        self._horizon = horizon
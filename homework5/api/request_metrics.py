@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Per-route Prometheus metrics for the DX Cluster API.
+
+Each request's time is split into stages: database time (executing queries
+and fetching rows, measured by the cursors), serialization time (JSON
+encoding) and compression time. With the total latency, the rows fetched and
+the bytes sent, these show whether a slow endpoint is waiting on PostgreSQL
+or on Python.
+
+The request being measured is held in a context variable, so the cursors and
+the JSON encoder find it without it being passed around; code running
+outside a request (background threads, startup) is not measured.
+"""
+
+import contextvars
+import functools
+import time
+from collections import defaultdict
+
+import psycopg2.extensions
+from prometheus_client import Counter, Histogram
+
+STAGES = ('db', 'serialize', 'compress')
+
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+
+requests_total = Counter('dx_api_requests_total', 'API requests by route, method and status',
+                         ['route', 'method', 'status'])
+request_seconds = Histogram('dx_api_request_duration_seconds',
+                            'API request latency, until the last byte of the response is sent',
+                            ['route', 'method'], buckets=LATENCY_BUCKETS)
+stage_seconds = Histogram('dx_api_request_stage_seconds',
+                          'Time per request spent in database queries (db), JSON encoding (serialize) '
+                          'and compression (compress)', ['route', 'stage'], buckets=LATENCY_BUCKETS)
+response_rows = Histogram('dx_api_response_rows', 'Database rows fetched per request', ['route'],
+                          buckets=[0, 1, 10, 100, 1000, 10000, 100000, 1000000])
+response_bytes = Histogram('dx_api_response_bytes', 'Response body bytes sent per request, after compression',
+                           ['route'], buckets=[256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304,
+                                               16777216, 67108864])
+
+# Route label of requests that matched no route, so unknown paths add no series
+UNMATCHED = 'unmatched'
+
+_current = contextvars.ContextVar('dx_api_request_timing', default=None)
+
+
+class RequestTiming:
+    """Time, rows and bytes accumulated by one request"""
+
+    def __init__(self, route):
+        self.route = route or UNMATCHED
+        self.start = time.perf_counter()
+        self.stages = defaultdict(float)
+        self.rows = 0
+        self.bytes = 0
+
+    def finish(self, method, status):
+        """Record the request's metrics (once it has been sent)"""
+        requests_total.labels(self.route, method, status).inc()
+        request_seconds.labels(self.route, method).observe(time.perf_counter() - self.start)
+        for stage in STAGES:
+            stage_seconds.labels(self.route, stage).observe(self.stages[stage])
+        response_rows.labels(self.route).observe(self.rows)
+        response_bytes.labels(self.route).observe(self.bytes)
+
+
+def begin(route):
+    """Start measuring a request in the current context"""
+    timing = RequestTiming(route)
+    _current.set(timing)
+    return timing
+
+
+def current():
+    """The request being measured in this context, or None"""
+    return _current.get()
+
+
+def record(stage, seconds, rows=0):
+    """Add time (and fetched rows) to the current request, if any"""
+    timing = _current.get()
+    if timing is not None:
+        timing.stages[stage] += seconds
+        timing.rows += rows
+
+
+def count_bytes(chunks, timing):
+    """Count the bytes of a streamed body as they are sent, closing the source at the end"""
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            timing.bytes += len(chunk)
+            yield chunk
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close:
+            close()
+
+
+class TimedCursorMixin:
+    """Adds the time spent executing and fetching, and the rows fetched, to the current request"""
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            record('db', time.perf_counter() - start)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        record('db', time.perf_counter() - start, 0 if row is None else 1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        start = time.perf_counter()
+        rows = super().fetchmany(*args, **kwargs)
+        record('db', time.perf_counter() - start, len(rows))
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        record('db', time.perf_counter() - start, len(rows))
+        return rows
+
+    def __iter__(self):
+        rows = super().__iter__()
+        while True:
+            start = time.perf_counter()
+            try:
+                row = next(rows)
+            except StopIteration:
+                record('db', time.perf_counter() - start)
+                return
+            record('db', time.perf_counter() - start, 1)
+            yield row
+
+
+@functools.lru_cache(maxsize=None)
+def timed_cursor_class(cursor_class):
+    """Subclass of a cursor class that reports to the current request"""
+    return type(f'Timed{cursor_class.__name__}', (TimedCursorMixin, cursor_class), {})
+
+
+class TimedConnection(psycopg2.extensions.connection):
+    """
+    psycopg2 connection whose cursors, of whatever cursor_factory, report their
+    query time and rows to the current request (pass as connection_factory)
+    """
+
+    def cursor(self, *args, **kwargs):
+        cursor_class = kwargs.get('cursor_factory') or self.cursor_factory or psycopg2.extensions.cursor
+        kwargs['cursor_factory'] = timed_cursor_class(cursor_class)
+        return super().cursor(*args, **kwargs)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+In-process cache of aggregate API responses.
+
+The aggregate endpoints scan the whole spots table, but their result only
+changes when the scraper commits new spots (or the archiver removes old
+ones). Each cached response is stored with the ingest watermark it was
+computed at and is served until the watermark moves, the entry is older than
+the cache TTL (for queries relative to NOW()) or it is evicted as the least
+recently used entry.
+
+Entries carry a strong ETag, a hash of the exact response body, so clients
+can revalidate with If-None-Match and receive 304 Not Modified.
+
+Each gunicorn worker keeps its own cache.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from prometheus_client import Counter
+
+cache_requests = Counter('dx_api_response_cache_requests_total',
+                         'Cacheable API requests by route and cache result (hit, miss, bypass)',
+                         ['route', 'result'])
+
+CachedResponse = namedtuple('CachedResponse', ['body', 'content_type', 'headers', 'etag', 'watermark', 'created'])
+
+
+class ResponseCache:
+    """Thread-safe LRU cache of response bodies, invalidated by a watermark"""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, watermark):
+        """The entry for key if it was computed at this watermark and is within the TTL"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.watermark != watermark or time.monotonic() - entry.created > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, watermark, body, content_type, headers=None):
+        """Store a response body, evicting the least recently used entries beyond the size"""
+        entry = CachedResponse(body, content_type, dict(headers or {}),
+                               hashlib.blake2b(body, digest_size=16).hexdigest(),
+                               watermark, time.monotonic())
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Cache occupancy for the health endpoint"""
+        with self._lock:
+            return {'size': self.size, 'entries': len(self._entries), 'ttl_seconds': self.ttl}
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Cold-tier Parquet archive for old DX cluster data.
+
+Closed days of dx_spots and the related tables are exported by
+archive_old_data.py to compressed Parquet files, one file per table per UTC
+day, and then deleted from PostgreSQL. This module owns the on-disk layout and
+the reader the API uses when a query reaches back into archived days.
+
+Layout:
+    {ARCHIVE_DIR}/{table}/date=YYYY-MM-DD/{table}-YYYY-MM-DD.parquet
+
+Reads are pruned on the file paths: only the partitions whose date falls in
+the requested since/until range are opened.
+"""
+
+import os
+from datetime import date, datetime, timedelta, timezone
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', '/var/lib/dxcluster/archive')
+
+PARQUET_COMPRESSION = 'zstd'
+
+# Column every archived table is partitioned on
+TIME_COLUMN = 'timestamp'
+
+
+def partition_path(table, day, archive_dir=ARCHIVE_DIR):
+    """Path of the Parquet file holding one UTC day of a table"""
+    return os.path.join(archive_dir, table, f"date={day.isoformat()}",
+                        f"{table}-{day.isoformat()}.parquet")
+
+
+def archived_days(table, archive_dir=ARCHIVE_DIR):
+    """Sorted list of the days archived for a table, read from the directory names"""
+    table_dir = os.path.join(archive_dir, table)
+    try:
+        entries = os.listdir(table_dir)
+    except OSError:
+        return []
+    days = []
+    for entry in entries:
+        if not entry.startswith('date='):
+            continue
+        try:
+            day = date.fromisoformat(entry[len('date='):])
+        except ValueError:
+            continue
+        if os.path.exists(partition_path(table, day, archive_dir)):
+            days.append(day)
+    return sorted(days)
+
+
+def archive_horizon(table, archive_dir=ARCHIVE_DIR):
+    """
+    Start (UTC) of the first day that is not archived, or None if nothing is.
+
+    Everything older than the horizon lives only in the archive.
+    """
+    days = archived_days(table, archive_dir)
+    if not days:
+        return None
+    return _day_start(days[-1] + timedelta(days=1))
+
+
+def reaches_archive(table, since, archive_dir=ARCHIVE_DIR):
+    """Whether a range starting at since includes archived days"""
+    horizon = archive_horizon(table, archive_dir)
+    return horizon is not None and _utc(since) < horizon
+
+
+def prune_partitions(table, since=None, until=None, archive_dir=ARCHIVE_DIR):
+    """Partition files whose day overlaps the since/until range"""
+    first = _utc(since).date() if since else None
+    last = _utc(until).date() if until else None
+    return [partition_path(table, day, archive_dir)
+            for day in archived_days(table, archive_dir)
+            if (first is None or day >= first) and (last is None or day <= last)]
+
+
+def write_partition(table, day, data, key='id', archive_dir=ARCHIVE_DIR):
+    """
+    Write one day of a table, merging with rows already archived for that day.
+
+    Rows are de-duplicated on key so re-running the archiver after an
+    interrupted run is safe. The file is replaced atomically.
+
+    Returns:
+        int: number of rows in the partition
+    """
+    path = partition_path(table, day, archive_dir)
+    if os.path.exists(path):
+        existing = pq.read_table(path)
+        data = pa.concat_tables([existing, data], promote_options='default')
+        # Keep the last copy of each key (the freshly exported row)
+        positions = pa.array(range(data.num_rows))
+        latest = (pa.table({'key': data[key], 'pos': positions})
+                  .group_by('key').aggregate([('pos', 'max')]))
+        keep = latest['pos_max']
+        data = data.take(pc.take(keep, pc.sort_indices(keep)))
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(data, tmp_path, compression=PARQUET_COMPRESSION)
+    os.replace(tmp_path, path)
+    return data.num_rows
+
+
+def read_archive(table, since=None, until=None, filters=None, columns=None,
+                 archive_dir=ARCHIVE_DIR, expression=None):
+    """
+    Read archived rows of a table as an Arrow table.
+
+    Args:
+        table: archived table name
+        since, until: inclusive datetime range (None for open-ended)
+        filters: list of (column, op, value) with op one of
+                 '=', '>=', '<=', 'contains' (case-insensitive substring)
+        columns: columns to return (missing columns are dropped)
+        expression: additional Arrow filter expression
+
+    Returns:
+        pyarrow.Table (empty table if no partition matches)
+    """
+    paths = prune_partitions(table, since, until, archive_dir)
+    return _read_partitions(paths, since, until, filters, columns, expression)
+
+
+def iter_archive(table, since=None, until=None, filters=None, columns=None,
+                 archive_dir=ARCHIVE_DIR, key='id', batch_size=10000):
+    """
+    Yield archived rows as dicts, oldest first, one day partition at a time.
+
+    Rows are ordered on (TIME_COLUMN, key). Only one day of the table is in
+    memory at once, so arbitrarily long ranges can be streamed.
+    """
+    # The sort columns are read even when they are not returned
+    read_columns = None if columns is None else list(dict.fromkeys([*columns, TIME_COLUMN, key]))
+    for path in prune_partitions(table, since, until, archive_dir):
+        data = _read_partitions([path], since, until, filters, read_columns)
+        sort_keys = [(name, 'ascending') for name in (TIME_COLUMN, key) if name in data.column_names]
+        if sort_keys:
+            data = data.sort_by(sort_keys)
+        if columns is not None:
+            data = data.select([name for name in columns if name in data.column_names])
+        for batch in data.to_batches(max_chunksize=batch_size):
+            yield from batch.to_pylist()
+
+
+def query_archive(table, since=None, until=None, filters=None, columns=None,
+                  order_by=TIME_COLUMN, descending=True, limit=None,
+                  archive_dir=ARCHIVE_DIR, after=None, key='id'):
+    """
+    Filter, sort and limit archived rows.
+
+    Rows are sorted on order_by with key as the tie-breaker, the same order
+    as "ORDER BY order_by, key" in SQL.
+
+    Args:
+        after: (order_by value, key value) of a row; only rows that come
+               after it in the sort order are returned (keyset pagination)
+
+    Returns:
+        tuple: (rows as a list of dicts, number of rows matching the filters)
+    """
+    expression = None
+    if after is not None:
+        value, key_value = after
+        field, key_field = ds.field(order_by), ds.field(key)
+        if descending:
+            expression = (field < value) | ((field == value) & (key_field < key_value))
+        else:
+            expression = (field > value) | ((field == value) & (key_field > key_value))
+
+    data = read_archive(table, since, until, filters, columns, archive_dir, expression)
+    total = data.num_rows
+    if total == 0:
+        return [], 0
+    direction = 'descending' if descending else 'ascending'
+    sort_keys = [(name, direction) for name in (order_by, key) if name in data.column_names]
+    if sort_keys:
+        data = data.sort_by(sort_keys)
+    if limit is not None:
+        data = data.slice(0, limit)
+    return data.to_pylist(), total
+
+
+def count_archive(table, since=None, until=None, filters=None, archive_dir=ARCHIVE_DIR):
+    """Number of archived rows matching the filters"""
+    return read_archive(table, since, until, filters, [TIME_COLUMN], archive_dir).num_rows
+
+
+def estimate_archive_rows(table, since=None, until=None, archive_dir=ARCHIVE_DIR):
+    """
+    Upper-bound row count from Parquet metadata, without reading any data.
+
+    Counts every row of the partitions overlapping since/until, ignoring
+    other filters.
+    """
+    return sum(pq.ParquetFile(path).metadata.num_rows
+               for path in prune_partitions(table, since, until, archive_dir))
+
+
+def _read_partitions(paths, since, until, filters, columns, expression=None):
+    """Read and filter a list of partition files (see read_archive)"""
+    if not paths:
+        return pa.table({})
+
+    # Tables gain columns over time; read every partition with the union schema
+    schema = pa.unify_schemas([pq.read_schema(p) for p in paths],
+                              promote_options='permissive')
+    dataset = ds.dataset(paths, schema=schema, format='parquet')
+
+    conditions = list(filters or [])
+    if since:
+        conditions.append((TIME_COLUMN, '>=', _utc(since)))
+    if until:
+        conditions.append((TIME_COLUMN, '<=', _utc(until)))
+    for condition in conditions:
+        term = _filter_expression(*condition)
+        expression = term if expression is None else expression & term
+
+    if columns is not None:
+        columns = [c for c in columns if c in schema.names]
+    return dataset.to_table(columns=columns, filter=expression)
+
+
+def _filter_expression(column, op, value):
+    """Arrow dataset expression for one (column, op, value) filter"""
+    field = ds.field(column)
+    if op == '=':
+        return field == value
+    if op == '>=':
+        return field >= value
+    if op == '<=':
+        return field <= value
+    if op == 'contains':
+        return pc.match_substring(field, value, ignore_case=True)
+    raise ValueError(f"Unsupported archive filter operator: {op}")
+
+
+def _utc(value):
+    """Treat naive datetimes as UTC"""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _day_start(day):
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
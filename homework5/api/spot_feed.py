@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Live feed of newly stored spots for the DX Cluster API.
+
+One background thread per worker tails dx_spots by id (a primary key lookup
+every poll interval) and hands each new spot to the subscribed clients of
+/api/spots/stream. However many clients are connected, the database sees one
+poll per worker, and no client holds a database connection.
+
+The feed keeps the most recent spots so a client that reconnects with the id
+of the last spot it received (Last-Event-ID) gets the ones it missed. Each
+subscription buffers at most `buffer_size` undelivered spots; a client that
+falls further behind is marked as overflowed and disconnected, so one slow
+reader cannot grow the server's memory.
+
+In-process consumers (e.g. the callsign summaries) register a listener that
+is called with every batch of new spots.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+from prometheus_client import Counter, Gauge
+
+logger = logging.getLogger(__name__)
+
+feed_spots = Counter('dx_api_spot_feed_spots_total', 'Spots read by the live spot feed')
+feed_subscriptions = Gauge('dx_api_spot_feed_subscriptions', 'Connected live spot stream clients')
+feed_overflows = Counter('dx_api_spot_feed_overflows_total',
+                         'Live spot stream clients disconnected for falling behind')
+
+
+def row_matches(row, filters):
+    """
+    Whether a spot passes (column, op, value) filters.
+
+    Same operators as the archive filters: '=', '>=', '<=' and 'contains'
+    (case-insensitive substring). A missing value never matches.
+    """
+    for column, op, value in filters:
+        field = row.get(column)
+        if field is None:
+            return False
+        if op == '=':
+            matched = field == value
+        elif op == '>=':
+            matched = field >= value
+        elif op == '<=':
+            matched = field <= value
+        elif op == 'contains':
+            matched = value.lower() in str(field).lower()
+        else:
+            raise ValueError(f"Unsupported filter operator: {op}")
+        if not matched:
+            return False
+    return True
+
+
+class Subscription:
+    """Spots for one stream client: those after `after_id` that pass its filters"""
+
+    def __init__(self, filters, buffer_size, after_id=None):
+        self.filters = filters
+        self.buffer_size = buffer_size
+        self.after_id = after_id
+        self.overflowed = False
+        # The resume id was older than the feed's history: spots may be missing
+        self.gap = False
+        self._pending = deque()
+        self._ready = threading.Condition()
+
+    def push(self, spots):
+        """Queue the matching spots (called by the feed thread)"""
+        matched = [spot for spot in spots
+                   if (self.after_id is None or spot['id'] > self.after_id) and row_matches(spot, self.filters)]
+        if not matched:
+            return
+        with self._ready:
+            if self.overflowed:
+                return
+            if len(self._pending) + len(matched) > self.buffer_size:
+                self.overflowed = True
+                feed_overflows.inc()
+            else:
+                self._pending.extend(matched)
+            self._ready.notify()
+
+    def get(self, timeout):
+        """
+        Spots queued since the last call, waiting up to `timeout` seconds for one.
+
+        Returns:
+            list of spots (empty on timeout), or None once the subscription has
+            overflowed and every spot queued before that has been returned
+        """
+        with self._ready:
+            if not self._pending and not self.overflowed:
+                self._ready.wait(timeout)
+            if self._pending:
+                spots = list(self._pending)
+                self._pending.clear()
+                return spots
+            return None if self.overflowed else []
+
+
+class SpotFeed:
+    """Polls for new spots in one background thread and fans them out to subscriptions"""
+
+    def __init__(self, fetch, poll_interval=0.5, history_size=1000, batch_size=1000, max_subscriptions=None):
+        """
+        Args:
+            fetch: fetch(after_id, limit) returning spot dicts with an id above
+                   after_id in id order, or the newest `limit` spots (also in
+                   id order) when after_id is None
+            poll_interval: seconds between polls when no new spots were found
+            history_size: most recent spots kept for resuming clients
+            batch_size: most spots read per poll
+            max_subscriptions: most concurrent subscriptions (None: unlimited)
+        """
+        self._fetch = fetch
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_subscriptions = max_subscriptions
+        self.last_id = None
+        self.last_error = None
+        self._history = deque(maxlen=history_size)
+        self._subscriptions = set()
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """
+        Load the recent history and start polling (once per process).
+
+        Raises:
+            Exception: the history could not be read; the feed is not started
+        """
+        with self._start_lock:
+            if self._thread is not None:
+                return
+            spots = self._fetch(None, self._history.maxlen)
+            with self._lock:
+                self._history.extend(spots)
+                if spots:
+                    self.last_id = spots[-1]['id']
+            # Started lazily in each worker, since threads do not survive gunicorn's fork
+            self._thread = threading.Thread(target=self._run, name='spot-feed', daemon=True)
+            self._thread.start()
+
+    def subscribe(self, filters=(), after_id=None, buffer_size=1000):
+        """
+        Register a client, queueing the spots it missed after `after_id`.
+
+        Returns:
+            Subscription, or None when max_subscriptions clients are connected
+        """
+        self.start()
+        subscription = Subscription(filters, buffer_size, after_id)
+        with self._lock:
+            if self.max_subscriptions is not None and len(self._subscriptions) >= self.max_subscriptions:
+                return None
+            if after_id is None:
+                subscription.after_id = self.last_id
+            else:
+                subscription.gap = bool(self._history) and after_id < self._history[0]['id']
+                subscription.push(list(self._history))
+                if subscription.overflowed:
+                    # More missed spots than the buffer holds: start from now instead
+                    subscription = Subscription(filters, buffer_size, self.last_id)
+                    subscription.gap = True
+            self._subscriptions.add(subscription)
+            feed_subscriptions.set(len(self._subscriptions))
+        return subscription
+
+    def listen(self, callback):
+        """
+        Call callback(spots) from the feed thread with every batch of spots stored from now on.
+
+        Returns:
+            the id of the newest spot already read (None if there are none):
+            the callback gets exactly the spots after it
+        """
+        self.start()
+        with self._lock:
+            self._listeners.append(callback)
+            return self.last_id
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+            feed_subscriptions.set(len(self._subscriptions))
+
+    def stats(self):
+        """Feed state for the health endpoint"""
+        with self._lock:
+            return {'running': self._thread is not None, 'last_id': self.last_id,
+                    'subscriptions': len(self._subscriptions), 'history': len(self._history),
+                    'last_error': self.last_error}
+
+    def _run(self):
+        while True:
+            try:
+                spots = self._fetch(self.last_id, self.batch_size)
+                self.last_error = None
+            except Exception as e:
+                if self.last_error is None:
+                    logger.warning(f"Spot feed poll failed: {e}")
+                self.last_error = str(e)
+                spots = []
+            if spots:
+                self._publish(spots)
+            # A full batch means more are waiting: poll again at once
+            if len(spots) < self.batch_size:
+                time.sleep(self.poll_interval)
+
+    def _publish(self, spots):
+        feed_spots.inc(len(spots))
+        with self._lock:
+            self._history.extend(spots)
+            self.last_id = spots[-1]['id']
+            subscriptions = list(self._subscriptions)
+            listeners = list(self._listeners)
+        for subscription in subscriptions:
+            subscription.push(spots)
+        for listener in listeners:
+            try:
+                listener(spots)
+            except Exception as e:
+                logger.error(f"Spot feed listener failed: {e}")
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Move old DX cluster data from PostgreSQL to the Parquet archive.
+
+Exports every closed UTC day older than the retention window from dx_spots,
+spot_grid_squares, wwv_announcements and the RBN tables to compressed,
+date-partitioned Parquet files (see api/spot_archive.py for the layout), then
+deletes the exported rows. Each day is exported and deleted in one
+REPEATABLE READ transaction, after its files have been written, so rows are
+never removed without being archived. Re-running after an interruption is safe.
+When daily_propagation_summary exists, each day is summarized before its spots
+are deleted.
+
+Usage:
+    python archive_old_data.py [--older-than-days N] [--max-days N] [--dry-run]
+
+Suggested crontab entry (nightly):
+    30 3 * * * cd /home/steve/homework5 && python3 archive_old_data.py
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import psycopg2
+import pyarrow as pa
+from dotenv import load_dotenv
+
+# spot_archive lives with the API, which reads the same archive
+sys.path.insert(0, str(Path(__file__).parent / 'api'))
+
+from spot_archive import ARCHIVE_DIR, TIME_COLUMN, write_partition
+
+# Load environment variables
+load_dotenv()
+
+DEFAULT_RETENTION_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '90'))
+
+# Tables archived by day: (table, SELECT for one day, DELETE for one day).
+# Children come before their parents so that foreign keys and ON DELETE
+# CASCADE never remove rows that have not been exported.
+ARCHIVE_TABLES = [
+    ('spot_grid_squares',
+     """SELECT g.*, s.timestamp FROM spot_grid_squares g
+        JOIN dx_spots s ON s.id = g.dx_spot_id
+        WHERE s.timestamp >= %(start)s AND s.timestamp < %(end)s""",
+     """DELETE FROM spot_grid_squares g USING dx_spots s
+        WHERE s.id = g.dx_spot_id AND s.timestamp >= %(start)s AND s.timestamp < %(end)s"""),
+    ('dx_spots',
+     """SELECT *, maidenhead_to_lat(grid_square) AS grid_lat,
+               maidenhead_to_lon(grid_square) AS grid_lon
+        FROM dx_spots WHERE timestamp >= %(start)s AND timestamp < %(end)s""",
+     "DELETE FROM dx_spots WHERE timestamp >= %(start)s AND timestamp < %(end)s"),
+    ('wwv_announcements',
+     "SELECT * FROM wwv_announcements WHERE timestamp >= %(start)s AND timestamp < %(end)s",
+     "DELETE FROM wwv_announcements WHERE timestamp >= %(start)s AND timestamp < %(end)s"),
+    ('rbn_cw_beacons',
+     "SELECT * FROM rbn_cw_beacons WHERE timestamp >= %(start)s AND timestamp < %(end)s",
+     "DELETE FROM rbn_cw_beacons WHERE timestamp >= %(start)s AND timestamp < %(end)s"),
+    # Raw decodes still referenced by a newer beacon stay until that beacon is archived
+    ('raw_rbn_decodes',
+     """SELECT * FROM raw_rbn_decodes r
+        WHERE timestamp >= %(start)s AND timestamp < %(end)s
+          AND NOT EXISTS (SELECT 1 FROM rbn_cw_beacons b WHERE b.raw_decode_id = r.id)""",
+     """DELETE FROM raw_rbn_decodes r
+        WHERE timestamp >= %(start)s AND timestamp < %(end)s
+          AND NOT EXISTS (SELECT 1 FROM rbn_cw_beacons b WHERE b.raw_decode_id = r.id)"""),
+]
+
+# PostgreSQL type OIDs mapped to Arrow types; anything else is stored as text
+ARROW_TYPES = {
+    16: pa.bool_(),
+    20: pa.int64(),
+    21: pa.int16(),
+    23: pa.int32(),
+    700: pa.float32(),
+    701: pa.float64(),
+    1082: pa.date32(),
+    1114: pa.timestamp('us'),
+    1184: pa.timestamp('us', tz='UTC'),
+}
+NUMERIC_OID = 1700
+
+
+def get_db_connection():
+    """Connect with the same PG* environment variables as the API"""
+    return psycopg2.connect(
+        host=os.getenv('PGHOST', 'localhost'),
+        database=os.getenv('PGDATABASE', 'dx_analysis'),
+        user=os.getenv('PGUSER', 'steve'),
+        password=os.getenv('PGPASSWORD'),
+        port=os.getenv('PGPORT', '5432')
+    )
+
+
+def arrow_schema(description):
+    """
+    Arrow schema for a cursor result.
+
+    NUMERIC columns keep their declared precision and scale so archived values
+    come back as the same Decimals the database returns.
+    """
+    fields = []
+    for column in description:
+        if column.type_code == NUMERIC_OID:
+            if column.precision and column.precision <= 38:
+                arrow_type = pa.decimal128(column.precision, column.scale or 0)
+            else:
+                arrow_type = pa.float64()
+        else:
+            arrow_type = ARROW_TYPES.get(column.type_code, pa.string())
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+def rows_to_table(cursor):
+    """Fetch a cursor's rows into an Arrow table"""
+    schema = arrow_schema(cursor.description)
+    rows = cursor.fetchall()
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    arrays = []
+    for field, values in zip(schema, columns):
+        if field.type == pa.string():
+            values = [None if v is None else str(v) for v in values]
+        elif pa.types.is_floating(field.type):
+            values = [None if v is None else float(v) for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def existing_tables(conn):
+    """Archivable tables present in this database"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT table_name FROM information_schema.tables WHERE table_schema = 'public'")
+        present = {row[0] for row in cur.fetchall()}
+    return [spec for spec in ARCHIVE_TABLES if spec[0] in present]
+
+
+def first_day(conn, tables):
+    """Oldest UTC day with data in any of the tables"""
+    with conn.cursor() as cur:
+        oldest = None
+        for table, _, _ in tables:
+            if table == 'spot_grid_squares':
+                continue  # Archived with the dx_spots rows it belongs to
+            cur.execute(f"SELECT MIN({TIME_COLUMN}) FROM {table}")
+            value = cur.fetchone()[0]
+            if value is not None and (oldest is None or value < oldest):
+                oldest = value
+    return oldest.astimezone(timezone.utc).date() if oldest else None
+
+
+def has_daily_summary(conn):
+    """Whether the daily propagation summary (migration 009) is installed"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('daily_propagation_summary') IS NOT NULL")
+        return cur.fetchone()[0]
+
+
+def archive_day(conn, tables, day, archive_dir, dry_run=False, summarize=False):
+    """
+    Export and delete one UTC day of every table in a single transaction.
+
+    Returns:
+        dict: table -> number of rows archived
+    """
+    bounds = {
+        'start': datetime(day.year, day.month, day.day, tzinfo=timezone.utc),
+        'end': datetime(day.year, day.month, day.day, tzinfo=timezone.utc) + timedelta(days=1),
+    }
+    counts = {}
+    try:
+        with conn.cursor() as cur:
+            # Make sure the day is in the propagation summary before its spots leave
+            if summarize:
+                cur.execute("SELECT refresh_daily_propagation_summary(%s, %s)", (day, day))
+            for table, select_sql, delete_sql in tables:
+                cur.execute(select_sql, bounds)
+                data = rows_to_table(cur)
+                if data.num_rows == 0:
+                    continue
+                counts[table] = data.num_rows
+                if dry_run:
+                    continue
+                write_partition(table, day, data, archive_dir=archive_dir)
+                cur.execute(delete_sql, bounds)
+                if cur.rowcount != data.num_rows:
+                    raise RuntimeError(f"{table} {day}: exported {data.num_rows} rows "
+                                       f"but would delete {cur.rowcount}")
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive old DX cluster data to Parquet')
+    parser.add_argument('--older-than-days', type=int, default=DEFAULT_RETENTION_DAYS,
+                        help=f'Archive whole UTC days older than this (default: {DEFAULT_RETENTION_DAYS})')
+    parser.add_argument('--archive-dir', default=ARCHIVE_DIR,
+                        help=f'Archive root directory (default: {ARCHIVE_DIR})')
+    parser.add_argument('--max-days', type=int, default=None,
+                        help='Archive at most this many days in one run')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Report what would be archived without writing or deleting')
+    args = parser.parse_args()
+
+    cutoff = datetime.now(timezone.utc).date() - timedelta(days=args.older_than_days)
+    print(f"DX data archiver - archiving days before {cutoff} to {args.archive_dir}")
+
+    try:
+        conn = get_db_connection()
+    except psycopg2.OperationalError as e:
+        print(f"Error connecting to database: {e}")
+        sys.exit(1)
+    # SELECT and DELETE must see the same rows
+    conn.set_session(isolation_level=psycopg2.extensions.ISOLATION_LEVEL_REPEATABLE_READ)
+
+    try:
+        tables = existing_tables(conn)
+        day = first_day(conn, tables)
+        summarize = has_daily_summary(conn)
+        conn.rollback()
+        if day is None or day >= cutoff:
+            print("Nothing to archive")
+            return
+
+        archived = 0
+        while day < cutoff and (args.max_days is None or archived < args.max_days):
+            counts = archive_day(conn, tables, day, args.archive_dir, args.dry_run, summarize)
+            if counts:
+                summary = ', '.join(f"{table}={n}" for table, n in counts.items())
+                print(f"{'Would archive' if args.dry_run else 'Archived'} {day}: {summary}")
+                archived += 1
+            day += timedelta(days=1)
+
+        print(f"✓ {archived} day(s) {'to archive' if args.dry_run else 'archived'}")
+    except (psycopg2.Error, OSError, RuntimeError) as e:
+        print(f"Error archiving data: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
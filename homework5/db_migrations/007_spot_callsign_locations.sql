@@ -0,0 +1,83 @@
+-- Resolve callsigns to country and coordinates at ingest time
+-- Migration: 007 - Longest-prefix callsign resolution
+--
+-- Requires 004_callsign_prefixes.sql.
+-- Run: psql -U steve -d dx_analysis -f 007_spot_callsign_locations.sql
+
+-- Location columns filled by the scraper for every new spot
+ALTER TABLE dx_spots ADD COLUMN IF NOT EXISTS dx_country VARCHAR(255);
+ALTER TABLE dx_spots ADD COLUMN IF NOT EXISTS dx_lat DECIMAL(9, 6);
+ALTER TABLE dx_spots ADD COLUMN IF NOT EXISTS dx_lon DECIMAL(10, 6);
+ALTER TABLE dx_spots ADD COLUMN IF NOT EXISTS spotter_country VARCHAR(255);
+ALTER TABLE dx_spots ADD COLUMN IF NOT EXISTS spotter_lat DECIMAL(9, 6);
+ALTER TABLE dx_spots ADD COLUMN IF NOT EXISTS spotter_lon DECIMAL(10, 6);
+
+CREATE INDEX IF NOT EXISTS idx_dx_spots_dx_country ON dx_spots(dx_country);
+
+COMMENT ON COLUMN dx_spots.dx_country IS 'Country of the DX station, resolved from the longest matching callsign prefix';
+COMMENT ON COLUMN dx_spots.spotter_country IS 'Country of the spotter, resolved from the longest matching callsign prefix';
+
+-- Reduce a raw callsign to the segment that identifies the country.
+-- Mirrors normalize_callsign() in dx-scraper/callsign_trie.py:
+--   OH0M-44 -> OH0M, DL1ABC/P -> DL1ABC, EA8/DL1ABC -> EA8
+CREATE OR REPLACE FUNCTION callsign_base(call TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE STRICT
+AS $$
+    SELECT COALESCE(
+        (SELECT seg
+         FROM unnest(string_to_array(split_part(upper(trim(call)), '-', 1), '/'))
+              WITH ORDINALITY AS s(seg, pos)
+         WHERE seg <> ''
+           AND seg NOT IN ('P', 'M', 'MM', 'AM', 'QRP', 'A', 'B', 'R')
+           AND seg !~ '^[0-9]+$'
+         ORDER BY length(seg), pos
+         LIMIT 1),
+        split_part(split_part(upper(trim(call)), '-', 1), '/', 1)
+    )
+$$;
+
+-- Longest-prefix lookup against callsign_prefixes.
+-- Probes the unique prefix index once per leading substring of the callsign,
+-- so the cost is O(length of callsign) regardless of table size.
+-- N, W and AA-AL calls fall back to the generic 'K' (United States) entry.
+CREATE OR REPLACE FUNCTION resolve_callsign_prefix(call TEXT)
+RETURNS TABLE (prefix VARCHAR, country VARCHAR, latitude DECIMAL, longitude DECIMAL)
+LANGUAGE sql STABLE STRICT
+AS $$
+    WITH base AS (
+        SELECT callsign_base(call) AS c
+    ), candidates AS (
+        SELECT left(c, n) AS candidate
+        FROM base, generate_series(1, LEAST(length(c), 10)) AS n
+        UNION ALL
+        SELECT 'K' FROM base WHERE c ~ '^([NW]|A[A-L])'
+    )
+    SELECT p.prefix, p.country, p.latitude, p.longitude
+    FROM callsign_prefixes p
+    WHERE p.prefix IN (SELECT candidate FROM candidates)
+    ORDER BY length(p.prefix) DESC
+    LIMIT 1
+$$;
+
+COMMENT ON FUNCTION resolve_callsign_prefix(TEXT) IS 'Resolve a callsign to country and approximate coordinates by longest matching prefix';
+
+-- Backfill existing spots, resolving each distinct callsign once
+UPDATE dx_spots s
+SET dx_country = r.country, dx_lat = r.latitude, dx_lon = r.longitude
+FROM (SELECT DISTINCT dx_call FROM dx_spots WHERE dx_country IS NULL) d
+CROSS JOIN LATERAL resolve_callsign_prefix(d.dx_call) r
+WHERE s.dx_call = d.dx_call AND s.dx_country IS NULL;
+
+UPDATE dx_spots s
+SET spotter_country = r.country, spotter_lat = r.latitude, spotter_lon = r.longitude
+FROM (SELECT DISTINCT spotter_call FROM dx_spots WHERE spotter_country IS NULL) d
+CROSS JOIN LATERAL resolve_callsign_prefix(d.spotter_call) r
+WHERE s.spotter_call = d.spotter_call AND s.spotter_country IS NULL;
+
+GRANT EXECUTE ON FUNCTION callsign_base(TEXT) TO PUBLIC;
+GRANT EXECUTE ON FUNCTION resolve_callsign_prefix(TEXT) TO PUBLIC;
+
+SELECT 'Resolved locations for ' || COUNT(*) || ' spots' AS status
+FROM dx_spots
+WHERE dx_country IS NOT NULL;
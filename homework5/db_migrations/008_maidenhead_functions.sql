@@ -0,0 +1,103 @@
+-- Compute Maidenhead grid square coordinates in the database
+-- Migration: 008 - Maidenhead grid square functions
+--
+-- Same functions as homework3/database/migrations/004_maidenhead_functions.sql.
+-- Locators of 2, 4, 6 or 8 characters are supported; invalid locators return NULL.
+-- Run: psql -U steve -d dx_analysis -f 008_maidenhead_functions.sql
+
+-- Characters are converted with integer arithmetic in units of 1/480 degree of
+-- latitude (1/240 degree of longitude), the half-size of the smallest square;
+-- "& 223" upper-cases letters. Every body is a single expression without FROM,
+-- so the planner inlines the functions into the calling query.
+
+-- Whether text is a valid 2, 4, 6 or 8 character locator (case-insensitive)
+CREATE OR REPLACE FUNCTION is_maidenhead(grid TEXT)
+RETURNS BOOLEAN
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT length(grid) IN (2, 4, 6, 8)
+        AND (ascii(substr(grid, 1, 1)) & 223) BETWEEN 65 AND 82
+        AND (ascii(substr(grid, 2, 1)) & 223) BETWEEN 65 AND 82
+        AND (length(grid) < 4 OR (ascii(substr(grid, 3, 1)) BETWEEN 48 AND 57
+                                  AND ascii(substr(grid, 4, 1)) BETWEEN 48 AND 57))
+        AND (length(grid) < 6 OR ((ascii(substr(grid, 5, 1)) & 223) BETWEEN 65 AND 88
+                                  AND (ascii(substr(grid, 6, 1)) & 223) BETWEEN 65 AND 88))
+        AND (length(grid) < 8 OR (ascii(substr(grid, 7, 1)) BETWEEN 48 AND 57
+                                  AND ascii(substr(grid, 8, 1)) BETWEEN 48 AND 57))
+$$;
+
+-- Latitude of the center of a grid square
+CREATE OR REPLACE FUNCTION maidenhead_to_lat(grid TEXT)
+RETURNS DOUBLE PRECISION
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT CASE WHEN is_maidenhead(grid) THEN
+        (((ascii(substr(grid, 2, 1)) & 223) - 65) * 4800
+         + CASE WHEN length(grid) >= 4 THEN (ascii(substr(grid, 4, 1)) - 48) * 480 ELSE 0 END
+         + CASE WHEN length(grid) >= 6 THEN ((ascii(substr(grid, 6, 1)) & 223) - 65) * 20 ELSE 0 END
+         + CASE WHEN length(grid) >= 8 THEN (ascii(substr(grid, 8, 1)) - 48) * 2 ELSE 0 END
+         + CASE length(grid) WHEN 2 THEN 2400 WHEN 4 THEN 240 WHEN 6 THEN 10 ELSE 1 END
+        ) / 480.0::float8 - 90
+    END
+$$;
+
+-- Longitude of the center of a grid square
+CREATE OR REPLACE FUNCTION maidenhead_to_lon(grid TEXT)
+RETURNS DOUBLE PRECISION
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT CASE WHEN is_maidenhead(grid) THEN
+        (((ascii(substr(grid, 1, 1)) & 223) - 65) * 4800
+         + CASE WHEN length(grid) >= 4 THEN (ascii(substr(grid, 3, 1)) - 48) * 480 ELSE 0 END
+         + CASE WHEN length(grid) >= 6 THEN ((ascii(substr(grid, 5, 1)) & 223) - 65) * 20 ELSE 0 END
+         + CASE WHEN length(grid) >= 8 THEN (ascii(substr(grid, 7, 1)) - 48) * 2 ELSE 0 END
+         + CASE length(grid) WHEN 2 THEN 2400 WHEN 4 THEN 240 WHEN 6 THEN 10 ELSE 1 END
+        ) / 240.0::float8 - 180
+    END
+$$;
+
+-- Column (x) and row (y) of a point in units of the smallest supported square
+-- (1/120 degree of longitude, 1/240 degree of latitude) from the south-west
+-- corner of the world, clamped to the grid
+CREATE OR REPLACE FUNCTION maidenhead_x(lon DOUBLE PRECISION)
+RETURNS INTEGER
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT LEAST(GREATEST(floor((lon + 180) * 120), 0), 43199)::int
+$$;
+
+CREATE OR REPLACE FUNCTION maidenhead_y(lat DOUBLE PRECISION)
+RETURNS INTEGER
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT LEAST(GREATEST(floor((lat + 90) * 240), 0), 43199)::int
+$$;
+
+-- Grid square containing a point, at the given precision (2, 4, 6 or 8 characters)
+CREATE OR REPLACE FUNCTION latlon_to_maidenhead(lat DOUBLE PRECISION, lon DOUBLE PRECISION,
+                                                chars INTEGER DEFAULT 6)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT CASE WHEN chars IN (2, 4, 6, 8) THEN left(
+        chr(65 + maidenhead_x(lon) / 2400) || chr(65 + maidenhead_y(lat) / 2400)
+        || (maidenhead_x(lon) / 240 % 10)::text || (maidenhead_y(lat) / 240 % 10)::text
+        || chr(97 + maidenhead_x(lon) / 10 % 24) || chr(97 + maidenhead_y(lat) / 10 % 24)
+        || (maidenhead_x(lon) % 10)::text || (maidenhead_y(lat) % 10)::text,
+        chars)
+    END
+$$;
+
+COMMENT ON FUNCTION is_maidenhead(TEXT) IS 'Whether text is a valid Maidenhead grid square';
+COMMENT ON FUNCTION maidenhead_to_lat(TEXT) IS 'Latitude of the center of a Maidenhead grid square';
+COMMENT ON FUNCTION maidenhead_to_lon(TEXT) IS 'Longitude of the center of a Maidenhead grid square';
+COMMENT ON FUNCTION maidenhead_x(DOUBLE PRECISION) IS 'Maidenhead grid column of a longitude, in 1/120 degree units';
+COMMENT ON FUNCTION maidenhead_y(DOUBLE PRECISION) IS 'Maidenhead grid row of a latitude, in 1/240 degree units';
+COMMENT ON FUNCTION latlon_to_maidenhead(DOUBLE PRECISION, DOUBLE PRECISION, INTEGER) IS 'Maidenhead grid square containing a point';
+
+GRANT EXECUTE ON FUNCTION is_maidenhead(TEXT) TO PUBLIC;
+GRANT EXECUTE ON FUNCTION maidenhead_to_lat(TEXT) TO PUBLIC;
+GRANT EXECUTE ON FUNCTION maidenhead_to_lon(TEXT) TO PUBLIC;
+GRANT EXECUTE ON FUNCTION maidenhead_x(DOUBLE PRECISION) TO PUBLIC;
+GRANT EXECUTE ON FUNCTION maidenhead_y(DOUBLE PRECISION) TO PUBLIC;
+GRANT EXECUTE ON FUNCTION latlon_to_maidenhead(DOUBLE PRECISION, DOUBLE PRECISION, INTEGER) TO PUBLIC;
@@ -0,0 +1,102 @@
+-- Per-day propagation summary, computed once per completed UTC day
+-- Migration: 009 - Materialized daily propagation features
+--
+-- Holds the daily features used by homework4/feature-engineer/daily_extractor.py
+-- so training data for any date range is a single small query instead of
+-- downloading every spot. Rows are written by refresh_daily_propagation_summary(),
+-- run nightly by refresh_daily_summary.py and by archive_old_data.py before a
+-- day is moved to the archive.
+
+CREATE TABLE IF NOT EXISTS daily_propagation_summary (
+    day DATE PRIMARY KEY,
+    total_spots INTEGER NOT NULL,
+    avg_frequency DOUBLE PRECISION,
+    num_bands_active SMALLINT NOT NULL,
+    avg_signal_quality DOUBLE PRECISION,
+    signal_quality_std DOUBLE PRECISION,
+    cw_percentage DOUBLE PRECISION NOT NULL,
+    ssb_percentage DOUBLE PRECISION NOT NULL,
+    activity_hours SMALLINT NOT NULL,
+    peak_hour SMALLINT,
+    band_40m_percentage DOUBLE PRECISION NOT NULL,
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE daily_propagation_summary IS 'Daily propagation features per completed UTC day, refreshed from dx_spots';
+COMMENT ON COLUMN daily_propagation_summary.avg_frequency IS 'Mean frequency (kHz) of spots with a positive frequency';
+COMMENT ON COLUMN daily_propagation_summary.avg_signal_quality IS 'Mean of the first two characters of signal_report, where numeric';
+COMMENT ON COLUMN daily_propagation_summary.signal_quality_std IS 'Population standard deviation of the signal quality values';
+COMMENT ON COLUMN daily_propagation_summary.cw_percentage IS 'Percentage of spots with a mode that are CW';
+COMMENT ON COLUMN daily_propagation_summary.ssb_percentage IS 'Percentage of spots with a mode that are SSB';
+COMMENT ON COLUMN daily_propagation_summary.activity_hours IS 'Number of UTC hours with at least one spot';
+COMMENT ON COLUMN daily_propagation_summary.peak_hour IS 'UTC hour with the most spots (latest hour on ties)';
+COMMENT ON COLUMN daily_propagation_summary.band_40m_percentage IS 'Percentage of spots with a band that are on 40m';
+
+-- Summarize every completed UTC day from first_day to last_day (inclusive).
+-- Days are recomputed and upserted; today is never summarized because it is
+-- still receiving spots. Days without spots (e.g. already archived) are left
+-- as they are. Returns the number of days written.
+CREATE OR REPLACE FUNCTION refresh_daily_propagation_summary(first_day DATE, last_day DATE)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH spots AS (
+        SELECT
+            (timestamp AT TIME ZONE 'UTC')::date AS day,
+            EXTRACT(HOUR FROM timestamp AT TIME ZONE 'UTC')::smallint AS hour,
+            frequency,
+            NULLIF(mode, '') AS mode,
+            NULLIF(band, '') AS band,
+            CASE WHEN left(signal_report, 2) ~ '^\s*[+-]?([0-9]+\.?|\.[0-9])\s*$'
+                 THEN left(signal_report, 2)::double precision
+            END AS signal_quality
+        FROM dx_spots
+        WHERE timestamp >= first_day::timestamp AT TIME ZONE 'UTC'
+          AND timestamp < LEAST(last_day + 1, (now() AT TIME ZONE 'UTC')::date)::timestamp AT TIME ZONE 'UTC'
+    ), written AS (
+        INSERT INTO daily_propagation_summary (
+            day, total_spots, avg_frequency, num_bands_active,
+            avg_signal_quality, signal_quality_std, cw_percentage, ssb_percentage,
+            activity_hours, peak_hour, band_40m_percentage, refreshed_at
+        )
+        SELECT
+            day,
+            COUNT(*),
+            AVG(frequency) FILTER (WHERE frequency > 0),
+            COUNT(DISTINCT band),
+            AVG(signal_quality),
+            STDDEV_POP(signal_quality),
+            COALESCE(100.0 * COUNT(*) FILTER (WHERE mode = 'CW') / NULLIF(COUNT(mode), 0), 0),
+            COALESCE(100.0 * COUNT(*) FILTER (WHERE mode = 'SSB') / NULLIF(COUNT(mode), 0), 0),
+            COUNT(DISTINCT hour),
+            MODE() WITHIN GROUP (ORDER BY hour DESC),
+            COALESCE(100.0 * COUNT(*) FILTER (WHERE band = '40m') / NULLIF(COUNT(band), 0), 0),
+            CURRENT_TIMESTAMP
+        FROM spots
+        GROUP BY day
+        ON CONFLICT (day) DO UPDATE SET
+            total_spots = EXCLUDED.total_spots,
+            avg_frequency = EXCLUDED.avg_frequency,
+            num_bands_active = EXCLUDED.num_bands_active,
+            avg_signal_quality = EXCLUDED.avg_signal_quality,
+            signal_quality_std = EXCLUDED.signal_quality_std,
+            cw_percentage = EXCLUDED.cw_percentage,
+            ssb_percentage = EXCLUDED.ssb_percentage,
+            activity_hours = EXCLUDED.activity_hours,
+            peak_hour = EXCLUDED.peak_hour,
+            band_40m_percentage = EXCLUDED.band_40m_percentage,
+            refreshed_at = EXCLUDED.refreshed_at
+        RETURNING 1
+    )
+    SELECT COUNT(*)::integer FROM written
+$$;
+
+COMMENT ON FUNCTION refresh_daily_propagation_summary(DATE, DATE) IS 'Recompute daily_propagation_summary for the completed UTC days in a range';
+
+GRANT SELECT ON daily_propagation_summary TO PUBLIC;
+
+-- Backfill every completed day already in dx_spots
+SELECT 'Summarized ' || refresh_daily_propagation_summary(
+    (SELECT (MIN(timestamp) AT TIME ZONE 'UTC')::date FROM dx_spots),
+    (now() AT TIME ZONE 'UTC')::date - 1
+) || ' days' AS status;
@@ -0,0 +1,19 @@
+-- Index for keyset pagination of /api/spots
+-- Migration: 010 - (timestamp, id) index on dx_spots
+--
+-- /api/spots orders by (timestamp, id) and pages with
+-- WHERE (timestamp, id) < (cursor timestamp, cursor id). With this index each
+-- page is a short index range scan, however deep into the results it is,
+-- instead of reading and discarding OFFSET rows.
+--
+-- The index replaces idx_dx_spots_timestamp, which is a prefix of it.
+-- CONCURRENTLY avoids blocking the scraper's inserts; run outside a transaction.
+-- Run: psql -U steve -d dx_analysis -f 010_spots_keyset_index.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_dx_spots_timestamp_id ON dx_spots (timestamp, id);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_dx_spots_timestamp;
+
+SELECT 'Created ' || indexname AS status
+FROM pg_indexes
+WHERE tablename = 'dx_spots' AND indexname = 'idx_dx_spots_timestamp_id';
@@ -0,0 +1,26 @@
+-- Covering index for the windowed statistics endpoints
+-- Migration: 011 - (timestamp, id) index on dx_spots including the aggregated columns
+--
+-- /api/stats/bands, /api/stats/top-dx, /api/stats/top-spotters and
+-- /api/stats/propagation aggregate the spots of the last N hours. With the
+-- columns they group and count stored in the index, each of them reads only
+-- the index range for the window (an index-only scan) instead of visiting the
+-- table page of every spot.
+--
+-- The index has the same key as idx_dx_spots_timestamp_id (migration 010),
+-- which it replaces; keyset pagination of /api/spots uses it the same way.
+-- CONCURRENTLY avoids blocking the scraper's inserts; run outside a transaction.
+-- Run: psql -U steve -d dx_analysis -f 011_spots_window_covering_index.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_dx_spots_timestamp_covering ON dx_spots (timestamp, id)
+    INCLUDE (band, mode, frequency, dx_call, spotter_call);
+
+DROP INDEX CONCURRENTLY IF EXISTS idx_dx_spots_timestamp_id;
+
+-- Index-only scans skip the table only for pages marked all-visible; autovacuum
+-- keeps the map current for new spots afterwards
+VACUUM (ANALYZE) dx_spots;
+
+SELECT 'Created ' || indexname AS status
+FROM pg_indexes
+WHERE tablename = 'dx_spots' AND indexname = 'idx_dx_spots_timestamp_covering';
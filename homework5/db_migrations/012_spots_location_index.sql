@@ -0,0 +1,28 @@
+-- Location indexes for the map queries
+-- Migration: 012 - (grid square, timestamp) indexes on the dx and spotter coordinates of dx_spots
+--
+-- /api/spots/near and /api/spots/bbox find spots by the coordinates stored in
+-- dx_lat/dx_lon or spotter_lat/spotter_lon (migration 007). Each index keys
+-- the spots by the 4-character Maidenhead square of those coordinates
+-- (latlon_to_maidenhead, migration 008) and then by time, so a query lists
+-- the squares its radius or box overlaps and reads only the index entries of
+-- those squares within its time window, instead of every spot of the window.
+-- The exact distance or box test is applied to the rows found.
+--
+-- Queries must use the same expression as the index to match it:
+--     latlon_to_maidenhead(dx_lat::float8, dx_lon::float8, 4)
+-- CONCURRENTLY avoids blocking the scraper's inserts; run outside a transaction.
+-- Run: psql -U steve -d dx_analysis -f 012_spots_location_index.sql
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_dx_spots_dx_square ON dx_spots
+    (latlon_to_maidenhead(dx_lat::float8, dx_lon::float8, 4), timestamp);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_dx_spots_spotter_square ON dx_spots
+    (latlon_to_maidenhead(spotter_lat::float8, spotter_lon::float8, 4), timestamp);
+
+-- Statistics on the indexed expressions let the planner estimate squares
+ANALYZE dx_spots;
+
+SELECT 'Created ' || indexname AS status
+FROM pg_indexes
+WHERE tablename = 'dx_spots' AND indexname IN ('idx_dx_spots_dx_square', 'idx_dx_spots_spotter_square');
@@ -0,0 +1,329 @@
+-- HyperLogLog sketches of the distinct stations per UTC hour, day, month and band
+-- Migration: 013 - Mergeable distinct counts for the statistics endpoints
+--
+-- COUNT(DISTINCT dx_call) and COUNT(DISTINCT spotter_call) over days or weeks
+-- of spots are the most expensive aggregates the API runs, and distinct counts
+-- of two ranges cannot be added up. HyperLogLog sketches can be merged: a
+-- sketch has 2048 registers per callsign field, and the sketch of any set of
+-- hours and bands is the register-wise maximum of its rows. Estimates have a
+-- relative standard error of 1.04 / sqrt(2048), about 2.3%.
+--
+-- Sketches are stored bit-sliced: level k (1-32) is a bitmap of the 2048
+-- registers whose value is at least k, and the sketch is the 32 levels one
+-- after the other in a BIT(65536). The register-wise maximum of sketches is
+-- then the bitwise OR of their levels, which the built-in bit_or() aggregate
+-- computes in microseconds per row. For counts=approximate on /api/stats,
+-- /api/bands and /api/activity/hourly the API merges the sketches of each
+-- group in the query and reads back only the number of registers at each
+-- level (hll_level_counts), which is all the estimate needs
+-- (api/hyperloglog.py). Ranks above 32 are stored as 32; with 2048 registers
+-- this changes no count below billions of callsigns.
+--
+-- hourly_band_sketches holds one row per completed UTC hour and band, and
+-- band_sketch_rollups the merged sketches of every completed UTC day and
+-- month, so a window of months reads one row per month and band, then one per
+-- day and one per hour for its ends. Both are written by
+-- refresh_hourly_band_sketches() and refresh_band_sketch_rollups(), run hourly
+-- by refresh_hourly_sketches.py; band_sketches() returns the sketches covering
+-- a window at the coarsest granularity available, sketching the spots after
+-- the last refreshed hour from dx_spots.
+
+-- Start of the UTC day or month after the one that holds a time. Intervals of
+-- days and months follow the session time zone, so whole hours are added.
+CREATE OR REPLACE FUNCTION next_utc_period(period TEXT, value TIMESTAMPTZ)
+RETURNS TIMESTAMPTZ
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT date_trunc(period, date_trunc(period, value, 'UTC')
+                              + CASE period WHEN 'day' THEN INTERVAL '25 hours' ELSE INTERVAL '745 hours' END,
+                      'UTC')
+$$;
+
+-- First UTC day or month start at or after a time
+CREATE OR REPLACE FUNCTION ceil_utc_period(period TEXT, value TIMESTAMPTZ)
+RETURNS TIMESTAMPTZ
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT CASE WHEN date_trunc(period, value, 'UTC') = value THEN value ELSE next_utc_period(period, value) END
+$$;
+
+-- Register (first 11 bits of the value's 64-bit hash) and rank (position of
+-- the first 1 bit in the other 53 bits, 54 if there is none) of a callsign.
+-- PRECISION in api/hyperloglog.py must match the 11 bits used here.
+CREATE OR REPLACE FUNCTION hll_register(value TEXT)
+RETURNS INTEGER
+LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+AS $$
+    SELECT substring(hashtextextended(value, 0)::bit(64) FROM 1 FOR 11)::integer
+$$;
+
+CREATE OR REPLACE FUNCTION hll_rank(value TEXT)
+RETURNS INTEGER
+LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+AS $$
+    SELECT COALESCE(NULLIF(position(B'1' IN substring(hashtextextended(value, 0)::bit(64) FROM 12)), 0), 54)
+$$;
+
+-- The 32 levels of a sketch from the register and rank of each value.
+-- LEVELS in api/hyperloglog.py must match the 32 levels used here.
+CREATE OR REPLACE FUNCTION hll_levels(registers INTEGER[], ranks INTEGER[])
+RETURNS BIT(65536)
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+    SELECT COALESCE(bit_or(set_bit(B'0'::bit(65536), (level - 1) * 2048 + seen.register, 1)),
+                    B'0'::bit(65536))
+    FROM (
+        SELECT register, LEAST(MAX(rank), 32) AS rank
+        FROM unnest(registers, ranks) AS value(register, rank)
+        GROUP BY register
+    ) seen
+    CROSS JOIN generate_series(1, seen.rank) AS level
+$$;
+
+-- Number of registers at each level (at least 1, 2, ... 32) of a sketch.
+-- bit_count() needs PostgreSQL 14; older servers count the 1s of the text,
+-- about 20 times slower.
+DO $do$
+BEGIN
+    IF current_setting('server_version_num')::integer >= 140000 THEN
+        CREATE OR REPLACE FUNCTION hll_level_counts(levels BIT)
+        RETURNS INTEGER[]
+        LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+        AS $$
+            SELECT array_agg(bit_count(substring(levels FROM (level - 1) * 2048 + 1 FOR 2048))::integer
+                             ORDER BY level)
+            FROM generate_series(1, 32) AS level
+        $$;
+    ELSE
+        CREATE OR REPLACE FUNCTION hll_level_counts(levels BIT)
+        RETURNS INTEGER[]
+        LANGUAGE sql IMMUTABLE STRICT PARALLEL SAFE
+        AS $$
+            SELECT array_agg(length(replace(substring(levels FROM (level - 1) * 2048 + 1 FOR 2048)::text, '0', ''))
+                             ORDER BY level)
+            FROM generate_series(1, 32) AS level
+        $$;
+    END IF;
+END
+$do$;
+
+CREATE TABLE IF NOT EXISTS hourly_band_sketches (
+    hour TIMESTAMPTZ NOT NULL,
+    band TEXT NOT NULL,
+    spot_count INTEGER NOT NULL,
+    min_frequency NUMERIC,
+    max_frequency NUMERIC,
+    latest_spot TIMESTAMPTZ NOT NULL,
+    dx_levels BIT(65536) NOT NULL,
+    spotter_levels BIT(65536) NOT NULL,
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (hour, band)
+);
+
+COMMENT ON TABLE hourly_band_sketches IS 'Spot counts and HyperLogLog sketches of the distinct stations per completed UTC hour and band';
+COMMENT ON COLUMN hourly_band_sketches.band IS 'Band of the spots, empty for spots without a band';
+COMMENT ON COLUMN hourly_band_sketches.dx_levels IS 'HyperLogLog sketch of dx_call, bit-sliced (see hll_levels)';
+COMMENT ON COLUMN hourly_band_sketches.spotter_levels IS 'HyperLogLog sketch of spotter_call, bit-sliced (see hll_levels)';
+
+-- Sketch the spots from first_hour up to (not including) end_time, one row
+-- per UTC hour and band. Used by the refresh below and by band_sketches() for
+-- the hours that have not been refreshed yet.
+CREATE OR REPLACE FUNCTION spot_sketches(first_hour TIMESTAMPTZ, end_time TIMESTAMPTZ)
+RETURNS TABLE (
+    hour TIMESTAMPTZ,
+    band TEXT,
+    spot_count INTEGER,
+    min_frequency NUMERIC,
+    max_frequency NUMERIC,
+    latest_spot TIMESTAMPTZ,
+    dx_levels BIT(65536),
+    spotter_levels BIT(65536)
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT
+        date_trunc('hour', spot.timestamp, 'UTC'),
+        COALESCE(spot.band, ''),
+        COUNT(*)::integer,
+        MIN(spot.frequency),
+        MAX(spot.frequency),
+        MAX(spot.timestamp),
+        hll_levels(array_agg(hll_register(spot.dx_call)) FILTER (WHERE spot.dx_call IS NOT NULL),
+                   array_agg(hll_rank(spot.dx_call)) FILTER (WHERE spot.dx_call IS NOT NULL)),
+        hll_levels(array_agg(hll_register(spot.spotter_call)) FILTER (WHERE spot.spotter_call IS NOT NULL),
+                   array_agg(hll_rank(spot.spotter_call)) FILTER (WHERE spot.spotter_call IS NOT NULL))
+    FROM dx_spots spot
+    WHERE spot.timestamp >= first_hour
+      AND spot.timestamp < end_time
+    GROUP BY 1, 2
+$$;
+
+COMMENT ON FUNCTION spot_sketches(TIMESTAMPTZ, TIMESTAMPTZ) IS 'Spot counts and distinct-station sketches per UTC hour and band of a time range';
+
+-- Sketch every completed UTC hour from first_hour to last_hour (inclusive).
+-- Hours are recomputed and upserted; the current hour is never sketched
+-- because it is still receiving spots. Hours without spots (e.g. already
+-- archived) are left as they are. Returns the number of rows written.
+CREATE OR REPLACE FUNCTION refresh_hourly_band_sketches(first_hour TIMESTAMPTZ, last_hour TIMESTAMPTZ)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH written AS (
+        INSERT INTO hourly_band_sketches (
+            hour, band, spot_count, min_frequency, max_frequency, latest_spot,
+            dx_levels, spotter_levels, refreshed_at
+        )
+        SELECT sketch.*, CURRENT_TIMESTAMP
+        FROM spot_sketches(
+            date_trunc('hour', first_hour, 'UTC'),
+            LEAST(date_trunc('hour', last_hour, 'UTC') + INTERVAL '1 hour', date_trunc('hour', now(), 'UTC'))
+        ) sketch
+        ON CONFLICT (hour, band) DO UPDATE SET
+            spot_count = EXCLUDED.spot_count,
+            min_frequency = EXCLUDED.min_frequency,
+            max_frequency = EXCLUDED.max_frequency,
+            latest_spot = EXCLUDED.latest_spot,
+            dx_levels = EXCLUDED.dx_levels,
+            spotter_levels = EXCLUDED.spotter_levels,
+            refreshed_at = EXCLUDED.refreshed_at
+        RETURNING 1
+    )
+    SELECT COUNT(*)::integer FROM written
+$$;
+
+COMMENT ON FUNCTION refresh_hourly_band_sketches(TIMESTAMPTZ, TIMESTAMPTZ) IS 'Recompute hourly_band_sketches for the completed UTC hours in a range';
+
+CREATE TABLE IF NOT EXISTS band_sketch_rollups (
+    period TEXT NOT NULL CHECK (period IN ('day', 'month')),
+    start_time TIMESTAMPTZ NOT NULL,
+    band TEXT NOT NULL,
+    spot_count INTEGER NOT NULL,
+    min_frequency NUMERIC,
+    max_frequency NUMERIC,
+    latest_spot TIMESTAMPTZ NOT NULL,
+    dx_levels BIT(65536) NOT NULL,
+    spotter_levels BIT(65536) NOT NULL,
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (period, start_time, band)
+);
+
+COMMENT ON TABLE band_sketch_rollups IS 'hourly_band_sketches merged per completed UTC day and month and band';
+
+-- Merge the hourly sketches of every completed UTC day and month that holds an
+-- hour from first_hour to last_hour. Returns the number of rows written.
+CREATE OR REPLACE FUNCTION refresh_band_sketch_rollups(first_hour TIMESTAMPTZ, last_hour TIMESTAMPTZ)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH RECURSIVE periods AS (
+        SELECT period, date_trunc(period, first_hour, 'UTC') AS start_time
+        FROM (VALUES ('day'), ('month')) AS p(period)
+        UNION ALL
+        SELECT period, next_utc_period(period, start_time)
+        FROM periods
+        WHERE next_utc_period(period, start_time) <= last_hour
+    ),
+    written AS (
+        INSERT INTO band_sketch_rollups (
+            period, start_time, band, spot_count, min_frequency, max_frequency, latest_spot,
+            dx_levels, spotter_levels, refreshed_at
+        )
+        SELECT periods.period, periods.start_time, sketch.band, SUM(sketch.spot_count),
+               MIN(sketch.min_frequency), MAX(sketch.max_frequency), MAX(sketch.latest_spot),
+               bit_or(sketch.dx_levels), bit_or(sketch.spotter_levels), CURRENT_TIMESTAMP
+        FROM periods
+        JOIN hourly_band_sketches sketch
+          ON sketch.hour >= periods.start_time
+         AND sketch.hour < next_utc_period(periods.period, periods.start_time)
+        WHERE next_utc_period(periods.period, periods.start_time) <= date_trunc('hour', now(), 'UTC')
+        GROUP BY periods.period, periods.start_time, sketch.band
+        ON CONFLICT (period, start_time, band) DO UPDATE SET
+            spot_count = EXCLUDED.spot_count,
+            min_frequency = EXCLUDED.min_frequency,
+            max_frequency = EXCLUDED.max_frequency,
+            latest_spot = EXCLUDED.latest_spot,
+            dx_levels = EXCLUDED.dx_levels,
+            spotter_levels = EXCLUDED.spotter_levels,
+            refreshed_at = EXCLUDED.refreshed_at
+        RETURNING 1
+    )
+    SELECT COUNT(*)::integer FROM written
+$$;
+
+COMMENT ON FUNCTION refresh_band_sketch_rollups(TIMESTAMPTZ, TIMESTAMPTZ) IS 'Recompute band_sketch_rollups for the completed UTC days and months of a range of hours';
+
+-- The sketches of every hour and band from since on: whole months and days
+-- from band_sketch_rollups (unless rollups is false), the other hours up to
+-- the last refresh from hourly_band_sketches and the hours after it from
+-- dx_spots. Rollups are used only up to the last refreshed hour, day and
+-- month, so a late or partial refresh never counts an hour twice.
+CREATE OR REPLACE FUNCTION band_sketches(since TIMESTAMPTZ, rollups BOOLEAN DEFAULT true)
+RETURNS TABLE (
+    start_time TIMESTAMPTZ,
+    band TEXT,
+    spot_count INTEGER,
+    min_frequency NUMERIC,
+    max_frequency NUMERIC,
+    latest_spot TIMESTAMPTZ,
+    dx_levels BIT(65536),
+    spotter_levels BIT(65536)
+)
+LANGUAGE sql STABLE
+AS $$
+    WITH refreshed AS (
+        SELECT
+            date_trunc('hour', since, 'UTC') AS since,
+            COALESCE((SELECT MAX(hour) + INTERVAL '1 hour' FROM hourly_band_sketches),
+                     date_trunc('hour', since, 'UTC')) AS hours,
+            COALESCE((SELECT MAX(next_utc_period('day', start_time)) FROM band_sketch_rollups
+                      WHERE period = 'day' AND rollups), '-infinity') AS days,
+            COALESCE((SELECT MAX(next_utc_period('month', start_time)) FROM band_sketch_rollups
+                      WHERE period = 'month' AND rollups), '-infinity') AS months
+    ),
+    bounds AS (
+        SELECT refreshed.*,
+               ceil_utc_period('day', since) AS day_start,
+               GREATEST(ceil_utc_period('day', since),
+                        date_trunc('day', LEAST(refreshed.days, refreshed.hours), 'UTC')) AS day_end,
+               ceil_utc_period('month', since) AS month_start,
+               GREATEST(ceil_utc_period('month', since),
+                        date_trunc('month', LEAST(refreshed.months, refreshed.hours), 'UTC')) AS month_end
+        FROM refreshed
+    )
+    SELECT rollup.start_time, rollup.band, rollup.spot_count, rollup.min_frequency, rollup.max_frequency,
+           rollup.latest_spot, rollup.dx_levels, rollup.spotter_levels
+    FROM bounds, band_sketch_rollups rollup
+    WHERE (rollup.period = 'month' AND rollup.start_time >= bounds.month_start
+           AND rollup.start_time < bounds.month_end)
+       OR (rollup.period = 'day' AND rollup.start_time >= bounds.day_start
+           AND rollup.start_time < bounds.day_end
+           AND NOT (rollup.start_time >= bounds.month_start AND rollup.start_time < bounds.month_end))
+    UNION ALL
+    SELECT sketch.hour, sketch.band, sketch.spot_count, sketch.min_frequency, sketch.max_frequency,
+           sketch.latest_spot, sketch.dx_levels, sketch.spotter_levels
+    FROM bounds, hourly_band_sketches sketch
+    WHERE sketch.hour >= bounds.since
+      AND sketch.hour < bounds.hours
+      AND NOT (sketch.hour >= bounds.day_start AND sketch.hour < bounds.day_end)
+      AND NOT (sketch.hour >= bounds.month_start AND sketch.hour < bounds.month_end)
+    UNION ALL
+    SELECT sketch.*
+    FROM bounds, spot_sketches(GREATEST(bounds.since, bounds.hours), 'infinity') sketch
+$$;
+
+COMMENT ON FUNCTION band_sketches(TIMESTAMPTZ, BOOLEAN) IS 'Sketches per hour, day or month and band covering the time from since on';
+
+GRANT SELECT ON hourly_band_sketches TO PUBLIC;
+GRANT SELECT ON band_sketch_rollups TO PUBLIC;
+
+-- Backfill every completed hour already in dx_spots
+SELECT 'Sketched ' || refresh_hourly_band_sketches(
+    (SELECT MIN(timestamp) FROM dx_spots),
+    now()
+) || ' hours and bands' AS status;
+
+-- Then every completed day and month of them
+SELECT 'Rolled up ' || refresh_band_sketch_rollups(
+    (SELECT MIN(hour) FROM hourly_band_sketches),
+    now()
+) || ' days, months and bands' AS status;
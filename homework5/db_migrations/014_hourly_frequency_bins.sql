@@ -0,0 +1,122 @@
+-- Band plan and per-hour frequency bins for the frequency histogram
+-- Migration: 014 - Band-aware histograms of recent windows without scanning spots
+--
+-- /api/frequency/histogram bins the spots of each band between the band's own
+-- edges, so the HF bands are not crushed into a few bins of a histogram that
+-- spans 136 kHz to 148 MHz. frequency_bands holds the band plan the scraper
+-- uses to assign dx_spots.band (determine_band() in dx_cluster_live_pg.py).
+--
+-- hourly_frequency_bins holds the spot counts of every completed UTC hour and
+-- band in 100 equal bins between the band edges. A histogram of the last N
+-- hours with a bin count that divides 100 adds up these arrays (and merges
+-- neighbouring bins) instead of reading every spot of the window; the partial
+-- first hour and the hours after the last refresh are binned from dx_spots.
+--
+-- Rows are written for completed UTC hours by refresh_hourly_frequency_bins(),
+-- run hourly by refresh_hourly_sketches.py with the distinct-station sketches
+-- of migration 013.
+
+CREATE TABLE IF NOT EXISTS frequency_bands (
+    band TEXT PRIMARY KEY,
+    low_khz NUMERIC NOT NULL,
+    high_khz NUMERIC NOT NULL,
+    CHECK (low_khz < high_khz)
+);
+
+COMMENT ON TABLE frequency_bands IS 'Amateur band edges (kHz) used to assign dx_spots.band, inclusive at both ends';
+
+INSERT INTO frequency_bands (band, low_khz, high_khz) VALUES
+    ('2200m', 135.7, 137.8),
+    ('630m', 472, 479),
+    ('160m', 1800, 2000),
+    ('80m', 3500, 4000),
+    ('60m', 5351.5, 5366.5),
+    ('40m', 7000, 7300),
+    ('30m', 10100, 10150),
+    ('20m', 14000, 14350),
+    ('17m', 18068, 18168),
+    ('15m', 21000, 21450),
+    ('12m', 24890, 24990),
+    ('10m', 28000, 29700),
+    ('6m', 50000, 54000),
+    ('2m', 144000, 148000)
+ON CONFLICT (band) DO UPDATE SET
+    low_khz = EXCLUDED.low_khz,
+    high_khz = EXCLUDED.high_khz;
+
+CREATE TABLE IF NOT EXISTS hourly_frequency_bins (
+    hour TIMESTAMPTZ NOT NULL,
+    band TEXT NOT NULL,
+    bin_counts INTEGER[] NOT NULL,
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (hour, band)
+);
+
+COMMENT ON TABLE hourly_frequency_bins IS 'Spot counts per completed UTC hour and band in 100 equal frequency bins';
+COMMENT ON COLUMN hourly_frequency_bins.bin_counts IS 'Spots per bin; bin i (1-based) spans low_khz + (i - 1) * width to low_khz + i * width of the band in frequency_bands';
+
+-- Bin the spots from start_time up to (not including) end_time, one row per
+-- UTC hour and band with spots. The top edge of a band falls in its last bin.
+-- FREQUENCY_FINE_BINS in api/dx_api.py must match the 100 bins used here.
+CREATE OR REPLACE FUNCTION spot_frequency_bins(start_time TIMESTAMPTZ, end_time TIMESTAMPTZ)
+RETURNS TABLE (
+    hour TIMESTAMPTZ,
+    band TEXT,
+    bin_counts INTEGER[]
+)
+LANGUAGE sql STABLE
+AS $$
+    WITH binned AS (
+        SELECT
+            date_trunc('hour', spot.timestamp, 'UTC') AS hour,
+            spot.band,
+            LEAST(width_bucket(spot.frequency, edges.low_khz, edges.high_khz, 100), 100) AS bin,
+            COUNT(*)::integer AS spots
+        FROM dx_spots spot
+        JOIN frequency_bands edges ON edges.band = spot.band
+        WHERE spot.timestamp >= start_time
+          AND spot.timestamp < end_time
+          AND spot.frequency BETWEEN edges.low_khz AND edges.high_khz
+        GROUP BY 1, 2, 3
+    )
+    SELECT hours.hour, hours.band, array_agg(COALESCE(binned.spots, 0) ORDER BY bin.number)
+    FROM (SELECT DISTINCT binned.hour, binned.band FROM binned) hours
+    CROSS JOIN generate_series(1, 100) AS bin(number)
+    LEFT JOIN binned ON binned.hour = hours.hour AND binned.band = hours.band AND binned.bin = bin.number
+    GROUP BY hours.hour, hours.band
+$$;
+
+COMMENT ON FUNCTION spot_frequency_bins(TIMESTAMPTZ, TIMESTAMPTZ) IS 'Spot counts in 100 frequency bins per UTC hour and band of a time range';
+
+-- Bin every completed UTC hour from first_hour to last_hour (inclusive).
+-- Hours are recomputed and upserted; the current hour is never binned because
+-- it is still receiving spots. Returns the number of rows written.
+CREATE OR REPLACE FUNCTION refresh_hourly_frequency_bins(first_hour TIMESTAMPTZ, last_hour TIMESTAMPTZ)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH written AS (
+        INSERT INTO hourly_frequency_bins (hour, band, bin_counts, refreshed_at)
+        SELECT binned.*, CURRENT_TIMESTAMP
+        FROM spot_frequency_bins(
+            date_trunc('hour', first_hour, 'UTC'),
+            LEAST(date_trunc('hour', last_hour, 'UTC') + INTERVAL '1 hour', date_trunc('hour', now(), 'UTC'))
+        ) binned
+        ON CONFLICT (hour, band) DO UPDATE SET
+            bin_counts = EXCLUDED.bin_counts,
+            refreshed_at = EXCLUDED.refreshed_at
+        RETURNING 1
+    )
+    SELECT COUNT(*)::integer FROM written
+$$;
+
+COMMENT ON FUNCTION refresh_hourly_frequency_bins(TIMESTAMPTZ, TIMESTAMPTZ) IS 'Recompute hourly_frequency_bins for the completed UTC hours in a range';
+
+GRANT SELECT ON frequency_bands TO PUBLIC;
+GRANT SELECT ON hourly_frequency_bins TO PUBLIC;
+
+-- Backfill every completed hour already in dx_spots
+SELECT 'Binned ' || refresh_hourly_frequency_bins(
+    (SELECT MIN(timestamp) FROM dx_spots),
+    now()
+) || ' hours and bands' AS status;
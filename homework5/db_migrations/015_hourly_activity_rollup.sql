@@ -0,0 +1,100 @@
+-- Spot and distinct-station counts per UTC hour, band and mode
+-- Migration: 015 - Activity cube (day x hour x band [x mode]) from a rollup
+--
+-- Heatmaps of activity by hour of day and band (the analysis scripts, the
+-- dashboards) were rebuilt from raw spots for every chart. /api/activity/cube
+-- returns a dense (day, hour, band[, mode]) array of spot counts and distinct
+-- stations for a date range; its cells are the rows of hourly_activity_rollup,
+-- so a heatmap over months reads one row per hour and band instead of every
+-- spot.
+--
+-- Distinct counts cannot be added up across modes, so every hour and band has
+-- a row over all its spots (mode '*') besides its rows per mode ('' for spots
+-- without a mode). The distinct counts of each row are exact.
+--
+-- Rows are written for completed UTC hours by refresh_hourly_activity(), run
+-- hourly by refresh_hourly_sketches.py with the rollups of migrations 013 and
+-- 014; the API counts the hours after the last refresh from dx_spots.
+
+CREATE TABLE IF NOT EXISTS hourly_activity_rollup (
+    hour TIMESTAMPTZ NOT NULL,
+    band TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    spot_count INTEGER NOT NULL,
+    unique_dx INTEGER NOT NULL,
+    unique_spotters INTEGER NOT NULL,
+    refreshed_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (hour, band, mode)
+);
+
+COMMENT ON TABLE hourly_activity_rollup IS 'Spot counts and exact distinct stations per completed UTC hour, band and mode';
+COMMENT ON COLUMN hourly_activity_rollup.band IS 'Band of the spots, empty for spots without a band';
+COMMENT ON COLUMN hourly_activity_rollup.mode IS 'Mode of the spots, empty for spots without a mode, * for all spots of the hour and band';
+
+-- Count the spots from start_time up to (not including) end_time, one row per
+-- UTC hour, band and mode plus one per UTC hour and band over all modes. Used
+-- by the refresh below and by the API for the hours not refreshed yet.
+CREATE OR REPLACE FUNCTION spot_activity(start_time TIMESTAMPTZ, end_time TIMESTAMPTZ)
+RETURNS TABLE (
+    hour TIMESTAMPTZ,
+    band TEXT,
+    mode TEXT,
+    spot_count INTEGER,
+    unique_dx INTEGER,
+    unique_spotters INTEGER
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT
+        date_trunc('hour', spot.timestamp, 'UTC'),
+        COALESCE(spot.band, ''),
+        CASE WHEN GROUPING(COALESCE(spot.mode, '')) = 1 THEN '*' ELSE COALESCE(spot.mode, '') END,
+        COUNT(*)::integer,
+        COUNT(DISTINCT spot.dx_call)::integer,
+        COUNT(DISTINCT spot.spotter_call)::integer
+    FROM dx_spots spot
+    WHERE spot.timestamp >= start_time
+      AND spot.timestamp < end_time
+    GROUP BY GROUPING SETS (
+        (date_trunc('hour', spot.timestamp, 'UTC'), COALESCE(spot.band, '')),
+        (date_trunc('hour', spot.timestamp, 'UTC'), COALESCE(spot.band, ''), COALESCE(spot.mode, ''))
+    )
+$$;
+
+COMMENT ON FUNCTION spot_activity(TIMESTAMPTZ, TIMESTAMPTZ) IS 'Spot counts and distinct stations per UTC hour, band and mode of a time range';
+
+-- Count every completed UTC hour from first_hour to last_hour (inclusive).
+-- Hours are recomputed and upserted; the current hour is never counted
+-- because it is still receiving spots. Returns the number of rows written.
+CREATE OR REPLACE FUNCTION refresh_hourly_activity(first_hour TIMESTAMPTZ, last_hour TIMESTAMPTZ)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH written AS (
+        INSERT INTO hourly_activity_rollup (
+            hour, band, mode, spot_count, unique_dx, unique_spotters, refreshed_at
+        )
+        SELECT activity.*, CURRENT_TIMESTAMP
+        FROM spot_activity(
+            date_trunc('hour', first_hour, 'UTC'),
+            LEAST(date_trunc('hour', last_hour, 'UTC') + INTERVAL '1 hour', date_trunc('hour', now(), 'UTC'))
+        ) activity
+        ON CONFLICT (hour, band, mode) DO UPDATE SET
+            spot_count = EXCLUDED.spot_count,
+            unique_dx = EXCLUDED.unique_dx,
+            unique_spotters = EXCLUDED.unique_spotters,
+            refreshed_at = EXCLUDED.refreshed_at
+        RETURNING 1
+    )
+    SELECT COUNT(*)::integer FROM written
+$$;
+
+COMMENT ON FUNCTION refresh_hourly_activity(TIMESTAMPTZ, TIMESTAMPTZ) IS 'Recompute hourly_activity_rollup for the completed UTC hours in a range';
+
+GRANT SELECT ON hourly_activity_rollup TO PUBLIC;
+
+-- Backfill every completed hour already in dx_spots
+SELECT 'Counted ' || refresh_hourly_activity(
+    (SELECT MIN(timestamp) FROM dx_spots),
+    now()
+) || ' hour, band and mode rows' AS status;
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Longest-prefix callsign resolution.
+
+Compiles the callsign_prefixes table into a trie so that a callsign can be
+resolved to its country and approximate coordinates in O(length of callsign).
+The compiled trie is pickled to disk so the scraper does not have to rebuild
+it from the database on every start.
+
+Usage:
+    callsign_trie.py [OUTPUT_FILE]              Build the trie from the database and save it
+    callsign_trie.py --backfill [OUTPUT_FILE]   Also resolve stored spots that have no country yet
+"""
+
+import os
+import pickle
+import sys
+
+# Bump when the on-disk layout changes so stale cache files get rebuilt
+TRIE_FORMAT_VERSION = 1
+
+DEFAULT_TRIE_PATH = os.getenv('CALLSIGN_TRIE_PATH', '/var/lib/dxcluster/callsign_trie.pkl')
+
+# Portable/operating suffixes that never identify the country
+PORTABLE_SUFFIXES = {'P', 'M', 'MM', 'AM', 'QRP', 'A', 'B', 'R'}
+
+# US prefixes that are not listed individually in callsign_prefixes; they
+# resolve to the generic 'K' entry
+US_PREFIX_ALIASES = ['N', 'W'] + [f'A{c}' for c in 'ABCDEFGHIJKL']
+
+
+def normalize_callsign(callsign):
+    """
+    Reduce a raw callsign to the part that identifies the country.
+
+    Strips skimmer SSIDs (OH0M-44), portable suffixes (/P, /M, /QRP) and, for
+    calls operated from another country (EA8/DL1ABC, DL1ABC/EA8), keeps the
+    shorter prefix segment.
+    """
+    if not callsign:
+        return ''
+    call = callsign.strip().upper().split('-')[0]
+    if '/' not in call:
+        return call
+    segments = [s for s in call.split('/')
+                if s and s not in PORTABLE_SUFFIXES and not s.isdigit()]
+    if not segments:
+        return call.split('/')[0]
+    return min(segments, key=len)
+
+
+class CallsignTrie:
+    """Compiled longest-prefix trie over callsign prefixes"""
+
+    def __init__(self):
+        # Node 0 is the root; each node maps a character to a child node index
+        self._children = [{}]
+        # Entry index stored at each node that terminates a prefix (or None)
+        self._terminal = [None]
+        # (prefix, country, latitude, longitude)
+        self.entries = []
+        # (row count, last update) of the table the trie was built from
+        self.source_stamp = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def insert(self, prefix, country, latitude, longitude):
+        """Add a prefix; a later insert of the same prefix replaces the earlier one"""
+        node = 0
+        for char in prefix.upper():
+            child = self._children[node].get(char)
+            if child is None:
+                child = len(self._children)
+                self._children[node][char] = child
+                self._children.append({})
+                self._terminal.append(None)
+            node = child
+        self.entries.append((prefix.upper(), country, float(latitude), float(longitude)))
+        self._terminal[node] = len(self.entries) - 1
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Build a trie from (prefix, country, latitude, longitude) rows
+
+        US aliases (N, W, AA-AL) are added for the generic 'K' entry unless
+        the rows already contain a more specific entry for them.
+        """
+        trie = cls()
+        us_entry = None
+        known = set()
+        for prefix, country, latitude, longitude in rows:
+            trie.insert(prefix, country, latitude, longitude)
+            known.add(prefix.upper())
+            if prefix.upper() == 'K':
+                us_entry = (country, latitude, longitude)
+        if us_entry:
+            for alias in US_PREFIX_ALIASES:
+                if alias not in known:
+                    trie.insert(alias, *us_entry)
+        return trie
+
+    @classmethod
+    def from_database(cls, conn):
+        """Build a trie from the callsign_prefixes table"""
+        with conn.cursor() as cur:
+            cur.execute("SELECT prefix, country, latitude, longitude FROM callsign_prefixes")
+            trie = cls.from_rows(cur.fetchall())
+        trie.source_stamp = get_source_stamp(conn)
+        return trie
+
+    def lookup(self, callsign):
+        """Return the (prefix, country, lat, lon) entry for the longest matching prefix, or None"""
+        node = 0
+        match = None
+        for char in normalize_callsign(callsign):
+            node = self._children[node].get(char)
+            if node is None:
+                break
+            if self._terminal[node] is not None:
+                match = self._terminal[node]
+        return self.entries[match] if match is not None else None
+
+    def resolve(self, callsign):
+        """Resolve a callsign to a dict with prefix, country, lat and lon (None if unknown)"""
+        entry = self.lookup(callsign)
+        if entry is None:
+            return None
+        return {'prefix': entry[0], 'country': entry[1], 'lat': entry[2], 'lon': entry[3]}
+
+    def resolve_many(self, callsigns):
+        """
+        Resolve a sequence of callsigns at once.
+
+        Each distinct callsign is walked only once, which matters for batches
+        of spots where the same stations appear many times.
+
+        Returns:
+            tuple of lists: (countries, latitudes, longitudes), aligned with the input
+        """
+        cache = {}
+        countries, lats, lons = [], [], []
+        for callsign in callsigns:
+            if callsign not in cache:
+                cache[callsign] = self.lookup(callsign)
+            entry = cache[callsign]
+            countries.append(entry[1] if entry else None)
+            lats.append(entry[2] if entry else None)
+            lons.append(entry[3] if entry else None)
+        return countries, lats, lons
+
+    def save(self, path):
+        """Serialize the compiled trie to a file"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((TRIE_FORMAT_VERSION, self.source_stamp, self._children,
+                         self._terminal, self.entries),
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Load a trie saved with save(); returns None if missing or from an older format"""
+        try:
+            with open(path, 'rb') as f:
+                data = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, ValueError, EOFError):
+            return None
+        if data[0] != TRIE_FORMAT_VERSION:
+            return None
+        trie = cls()
+        _, trie.source_stamp, trie._children, trie._terminal, trie.entries = data
+        return trie
+
+
+def get_source_stamp(conn):
+    """Row count and last update time of callsign_prefixes, used to detect a stale trie file"""
+    with conn.cursor() as cur:
+        cur.execute("SELECT COUNT(*), MAX(updated_at) FROM callsign_prefixes")
+        count, updated_at = cur.fetchone()
+    return (count, updated_at.isoformat() if updated_at else None)
+
+
+def load_or_build(conn, path=DEFAULT_TRIE_PATH):
+    """
+    Load the serialized trie from path, building and saving it from the
+    database when no usable file exists or callsign_prefixes has changed
+    since the file was written.
+    """
+    trie = CallsignTrie.load(path)
+    if trie is not None and trie.source_stamp == get_source_stamp(conn):
+        return trie
+    trie = CallsignTrie.from_database(conn)
+    try:
+        trie.save(path)
+    except OSError:
+        # Read-only install location; the in-memory trie is still usable
+        pass
+    return trie
+
+
+def backfill_spots(conn, trie, batch_size=10000):
+    """
+    Resolve the stored spots that still have no DX or spotter country, e.g.
+    spots of prefixes added to callsign_prefixes after they were stored.
+    Spots are read in id order, one batch per transaction.
+
+    Returns:
+        number of spots updated
+    """
+    from psycopg2.extras import execute_values
+
+    updated = 0
+    last_id = 0
+    while True:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT id, dx_call, spotter_call
+                FROM dx_spots
+                WHERE (dx_country IS NULL OR spotter_country IS NULL) AND id > %s
+                ORDER BY id
+                LIMIT %s
+            """, (last_id, batch_size))
+            rows = cur.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            dx = trie.resolve_many([row[1] for row in rows])
+            spotter = trie.resolve_many([row[2] for row in rows])
+            values = [(row[0],) + tuple(column[i] for column in dx + spotter)
+                      for i, row in enumerate(rows)
+                      if dx[0][i] is not None or spotter[0][i] is not None]
+            if values:
+                # Only fill the columns that are still empty
+                execute_values(cur, """
+                    UPDATE dx_spots s SET
+                        dx_country = COALESCE(s.dx_country, v.dx_country),
+                        dx_lat = COALESCE(s.dx_lat, v.dx_lat),
+                        dx_lon = COALESCE(s.dx_lon, v.dx_lon),
+                        spotter_country = COALESCE(s.spotter_country, v.spotter_country),
+                        spotter_lat = COALESCE(s.spotter_lat, v.spotter_lat),
+                        spotter_lon = COALESCE(s.spotter_lon, v.spotter_lon)
+                    FROM (VALUES %s) AS v(id, dx_country, dx_lat, dx_lon,
+                                          spotter_country, spotter_lat, spotter_lon)
+                    WHERE s.id = v.id
+                """, values, template="(%s, %s::varchar, %s::numeric, %s::numeric, "
+                                      "%s::varchar, %s::numeric, %s::numeric)",
+                    page_size=batch_size)
+                updated += len(values)
+        conn.commit()
+    return updated
+
+
+def main():
+    """Build the trie from the database and write it to disk"""
+    import psycopg2
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    args = sys.argv[1:]
+    backfill = '--backfill' in args
+    if backfill:
+        args.remove('--backfill')
+    path = args[0] if args else DEFAULT_TRIE_PATH
+
+    conn = psycopg2.connect(
+        host=os.getenv('DB_HOST', 'localhost'),
+        port=os.getenv('DB_PORT', '5432'),
+        database=os.getenv('DB_NAME', 'dx_analysis'),
+        user=os.getenv('DB_USER', 'dx_scraper'),
+        password=os.getenv('DB_PASSWORD', '')
+    )
+    try:
+        trie = CallsignTrie.from_database(conn)
+        trie.save(path)
+        print(f"✓ Compiled {len(trie)} prefixes to {path}")
+        if backfill:
+            print(f"✓ Resolved {backfill_spots(conn, trie)} stored spot(s)")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,9 @@
 SELECT CASE WHEN COUNT(*) > 0 THEN 1 ELSE 0 END as value FROM dx_spots WHERE frequency BETWEEN 29600 AND 29700 AND timestamp >= DATE_TRUNC('day', CURRENT_TIMESTAMP AT TIME ZONE 'America/Los_Angeles') AT TIME ZONE 'America/Los_Angeles'
 
 -- Maximum Observed Frequency (15 min)
+-- The dashboard panel now reads the API's dx_api_mof_mhz gauge from Prometheus:
+--   max(dx_api_mof_mhz{window="15m", band_group="all"})
+-- This query gives the same value straight from the database
 SELECT 
     MAX(frequency) / 1000 as value
 FROM dx_spots
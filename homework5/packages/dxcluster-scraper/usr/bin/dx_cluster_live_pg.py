@@ -17,6 +17,7 @@ from dotenv import load_dotenv
 from prometheus_client import Counter, Gauge, Histogram, generate_latest, REGISTRY
 from prometheus_client import start_http_server
 import threading
+from callsign_trie import load_or_build as load_callsign_trie, DEFAULT_TRIE_PATH
 
 # Load environment variables from .env file
 load_dotenv()
@@ -44,6 +45,7 @@ METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() in ('true', '1',
 running = True
 connection = None
 cursor = None
+callsign_trie = None
 verbose = False
 debug = False
 
@@ -345,13 +347,21 @@ def store_spot(cursor, spot_data):
         ''', (spot_data['timestamp'], spot_data['raw_text']))
         raw_spot_id = cursor.fetchone()[0]
 
+        # Resolve country and coordinates from the longest matching callsign prefix
+        dx_location = callsign_trie.resolve(spot_data['dx_call']) if callsign_trie else None
+        spotter_location = callsign_trie.resolve(spot_data['spotter_call']) if callsign_trie else None
+        dx_location = dx_location or {}
+        spotter_location = spotter_location or {}
+
         # Insert parsed spot
         cursor.execute('''
             INSERT INTO dx_spots (
                 raw_spot_id, timestamp, dx_call, frequency,
                 spotter_call, comment, mode, signal_report,
-                grid_square, band
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                grid_square, band,
+                dx_country, dx_lat, dx_lon,
+                spotter_country, spotter_lat, spotter_lon
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
             RETURNING id
         ''', (
             raw_spot_id,
@@ -363,7 +373,13 @@ def store_spot(cursor, spot_data):
             spot_data['mode'],
             spot_data['signal_report'],
             spot_data['grid_square'],
-            spot_data['band']
+            spot_data['band'],
+            dx_location.get('country'),
+            dx_location.get('lat'),
+            dx_location.get('lon'),
+            spotter_location.get('country'),
+            spotter_location.get('lat'),
+            spotter_location.get('lon')
         ))
         dx_spot_id = cursor.fetchone()[0]
 
@@ -530,7 +546,7 @@ def print_usage():
     print("  dx_cluster_live_pg.py --debug N0CALL")
 
 def main():
-    global running, connection, cursor, verbose, debug
+    global running, connection, cursor, verbose, debug, callsign_trie
     
     # Set up signal handler for graceful shutdown
     signal.signal(signal.SIGINT, signal_handler)
@@ -598,6 +614,15 @@ def main():
         logger.error(f"Failed to connect to database: {e}")
         sys.exit(1)
 
+    # Load the compiled callsign prefix trie (rebuilt from callsign_prefixes if stale)
+    try:
+        callsign_trie = load_callsign_trie(connection, DEFAULT_TRIE_PATH)
+        connection.commit()
+        logger.info(f"Loaded callsign prefix trie ({len(callsign_trie)} prefixes)")
+    except psycopg2.Error as e:
+        connection.rollback()
+        logger.warning(f"Callsign prefix lookup unavailable, spots will be stored without locations: {e}")
+
     # Connect to DX cluster
     sock = connect_to_cluster(host, port, callsign)
     if not sock:
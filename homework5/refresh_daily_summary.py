@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Refresh the per-day propagation summary.
+
+Recomputes daily_propagation_summary (db_migrations/009) for recently
+completed UTC days. By default the last two days are refreshed so spots that
+arrive late are still counted; --backfill recomputes every day in dx_spots.
+
+Usage:
+    python refresh_daily_summary.py [--days N | --since YYYY-MM-DD | --backfill]
+
+Suggested crontab entry (nightly, before archive_old_data.py):
+    10 0 * * * cd /home/steve/homework5 && python3 refresh_daily_summary.py
+"""
+
+import argparse
+import os
+import sys
+from datetime import date, datetime, timedelta, timezone
+
+import psycopg2
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+
+def get_db_connection():
+    """Connect with the same PG* environment variables as the API"""
+    return psycopg2.connect(
+        host=os.getenv('PGHOST', 'localhost'),
+        database=os.getenv('PGDATABASE', 'dx_analysis'),
+        user=os.getenv('PGUSER', 'steve'),
+        password=os.getenv('PGPASSWORD'),
+        port=os.getenv('PGPORT', '5432')
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Refresh the daily propagation summary')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--days', type=int, default=2,
+                       help='Refresh the last N completed UTC days (default: 2)')
+    group.add_argument('--since', type=date.fromisoformat,
+                       help='Refresh every completed day from this date (YYYY-MM-DD)')
+    group.add_argument('--backfill', action='store_true',
+                       help='Refresh every day with spots in dx_spots')
+    args = parser.parse_args()
+
+    yesterday = datetime.now(timezone.utc).date() - timedelta(days=1)
+
+    try:
+        conn = get_db_connection()
+    except psycopg2.OperationalError as e:
+        print(f"Error connecting to database: {e}")
+        sys.exit(1)
+
+    try:
+        with conn.cursor() as cur:
+            if args.backfill:
+                cur.execute("SELECT (MIN(timestamp) AT TIME ZONE 'UTC')::date FROM dx_spots")
+                first_day = cur.fetchone()[0] or yesterday
+            elif args.since:
+                first_day = args.since
+            else:
+                first_day = yesterday - timedelta(days=args.days - 1)
+
+            cur.execute("SELECT refresh_daily_propagation_summary(%s, %s)",
+                        (first_day, yesterday))
+            written = cur.fetchone()[0]
+        conn.commit()
+        print(f"✓ Summarized {written} day(s) from {first_day} to {yesterday}")
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"Error refreshing daily summary: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Refresh the hourly distinct-station sketches, frequency bins and activity rollup.
+
+Recomputes hourly_band_sketches with their day and month rollups
+(db_migrations/013), hourly_frequency_bins (db_migrations/014) and
+hourly_activity_rollup (db_migrations/015) for recently completed UTC hours.
+By default the last two hours are refreshed so spots that arrive late are still
+counted; --backfill recomputes every hour in dx_spots. The API reads the hours
+after the last refresh from dx_spots on each approximate count, band histogram
+or activity cube request, so the less often this runs, the more each of those
+requests reads.
+
+Usage:
+    python refresh_hourly_sketches.py [--hours N | --since YYYY-MM-DDTHH | --backfill]
+
+Suggested crontab entry (hourly):
+    5 * * * * cd /home/steve/homework5 && python3 refresh_hourly_sketches.py
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import psycopg2
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+
+def get_db_connection():
+    """Connect with the same PG* environment variables as the API"""
+    return psycopg2.connect(
+        host=os.getenv('PGHOST', 'localhost'),
+        database=os.getenv('PGDATABASE', 'dx_analysis'),
+        user=os.getenv('PGUSER', 'steve'),
+        password=os.getenv('PGPASSWORD'),
+        port=os.getenv('PGPORT', '5432')
+    )
+
+
+def utc_hour(value):
+    """Parse a YYYY-MM-DD or YYYY-MM-DDTHH argument as a UTC hour"""
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Refresh the hourly distinct-station sketches, frequency bins and activity rollup')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--hours', type=int, default=2,
+                       help='Refresh the last N completed UTC hours (default: 2)')
+    group.add_argument('--since', type=utc_hour,
+                       help='Refresh every completed hour from this UTC hour (YYYY-MM-DDTHH)')
+    group.add_argument('--backfill', action='store_true',
+                       help='Refresh every hour with spots in dx_spots')
+    args = parser.parse_args()
+
+    last_hour = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0) - timedelta(hours=1)
+
+    try:
+        conn = get_db_connection()
+    except psycopg2.OperationalError as e:
+        print(f"Error connecting to database: {e}")
+        sys.exit(1)
+
+    try:
+        with conn.cursor() as cur:
+            if args.backfill:
+                cur.execute("SELECT MIN(timestamp) FROM dx_spots")
+                first_hour = cur.fetchone()[0] or last_hour
+            elif args.since:
+                first_hour = args.since
+            else:
+                first_hour = last_hour - timedelta(hours=args.hours - 1)
+
+            cur.execute("SELECT refresh_hourly_band_sketches(%s, %s)",
+                        (first_hour, last_hour))
+            written = cur.fetchone()[0]
+            cur.execute("SELECT refresh_band_sketch_rollups(%s, %s)",
+                        (first_hour, last_hour))
+            rolled_up = cur.fetchone()[0]
+            cur.execute("SELECT refresh_hourly_frequency_bins(%s, %s)",
+                        (first_hour, last_hour))
+            binned = cur.fetchone()[0]
+            cur.execute("SELECT refresh_hourly_activity(%s, %s)",
+                        (first_hour, last_hour))
+            counted = cur.fetchone()[0]
+        conn.commit()
+        print(f"✓ Sketched {written} and binned {binned} hour/band row(s), "
+              f"rolled up {rolled_up} day/month/band row(s), "
+              f"counted {counted} hour/band/mode row(s) "
+              f"from {first_hour:%Y-%m-%d %H}:00 to {last_hour:%Y-%m-%d %H}:00 UTC")
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f"Error refreshing hourly sketches: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -6,9 +6,14 @@ Handles communication with the API for fetching spot data and statistics
 import os
 import requests
 from typing import Optional, Dict, List, Any
+import pandas as pd
+import pyarrow as pa
 import streamlit as st
 from datetime import datetime, timedelta
 
+# Callsigns per /api/callsigns/resolve query (the API's limit)
+RESOLVE_MAX_CALLSIGNS = 100
+
 class DXApiClient:
     """Client for interacting with DX Cluster API"""
     
@@ -24,7 +29,7 @@ class DXApiClient:
         
     def _make_request(self, endpoint: str, params: Optional[Dict] = None) -> Dict[str, Any]:
         """
-        Make HTTP GET request to API (forcing IPv4)
+        Make HTTP GET request to API and decode the JSON response
         
         Args:
             endpoint: API endpoint (e.g., '/api/spots')
@@ -33,58 +38,90 @@ class DXApiClient:
         Returns:
             JSON response as dict
         """
-        url = f"{self.base_url}{endpoint}"
-        
         try:
-            # Create session with IPv4 preference
-            import socket
-            from requests.adapters import HTTPAdapter
-            from urllib3.util.connection import create_connection
-            
-            def create_ipv4_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None, socket_options=None):
-                """Force IPv4 connections"""
-                host, port = address
-                err = None
-                for res in socket.getaddrinfo(host, port, socket.AF_INET, socket.SOCK_STREAM):
-                    af, socktype, proto, canonname, sa = res
-                    sock = None
-                    try:
-                        sock = socket.socket(af, socktype, proto)
-                        if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
-                            sock.settimeout(timeout)
-                        if source_address:
-                            sock.bind(source_address)
-                        if socket_options:
-                            for opt in socket_options:
-                                sock.setsockopt(*opt)
-                        sock.connect(sa)
-                        return sock
-                    except socket.error as _:
-                        err = _
-                        if sock is not None:
-                            sock.close()
-                if err is not None:
-                    raise err
-                else:
-                    raise socket.error("getaddrinfo returns an empty list")
-            
-            # Monkey patch for this request
-            old_create_connection = create_connection
-            import urllib3.util.connection
-            urllib3.util.connection.create_connection = create_ipv4_connection
-            
-            try:
-                response = requests.get(url, params=params, timeout=self.timeout)
-                response.raise_for_status()
-                return response.json()
-            finally:
-                # Restore original function
-                urllib3.util.connection.create_connection = old_create_connection
-                
+            return self._get(endpoint, params).json()
         except requests.exceptions.RequestException as e:
             st.error(f"API request failed: {e}")
             return {}
     
+    def _get(self, endpoint: str, params: Optional[Dict] = None) -> requests.Response:
+        """
+        Make HTTP GET request to API (forcing IPv4)
+        
+        Args:
+            endpoint: API endpoint (e.g., '/api/spots')
+            params: Query parameters
+            
+        Returns:
+            Response with a successful status
+            
+        Raises:
+            requests.exceptions.RequestException: request failed
+        """
+        return self._send('GET', endpoint, params=params)
+    
+    def _send(self, method: str, endpoint: str, **kwargs) -> requests.Response:
+        """
+        Make HTTP request to API (forcing IPv4)
+        
+        Args:
+            method: HTTP method
+            endpoint: API endpoint (e.g., '/api/batch')
+            **kwargs: passed to requests.request (params, json)
+            
+        Returns:
+            Response with a successful status
+            
+        Raises:
+            requests.exceptions.RequestException: request failed
+        """
+        url = f"{self.base_url}{endpoint}"
+        
+        # Create session with IPv4 preference
+        import socket
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.connection import create_connection
+        
+        def create_ipv4_connection(address, timeout=socket._GLOBAL_DEFAULT_TIMEOUT, source_address=None, socket_options=None):
+            """Force IPv4 connections"""
+            host, port = address
+            err = None
+            for res in socket.getaddrinfo(host, port, socket.AF_INET, socket.SOCK_STREAM):
+                af, socktype, proto, canonname, sa = res
+                sock = None
+                try:
+                    sock = socket.socket(af, socktype, proto)
+                    if timeout is not socket._GLOBAL_DEFAULT_TIMEOUT:
+                        sock.settimeout(timeout)
+                    if source_address:
+                        sock.bind(source_address)
+                    if socket_options:
+                        for opt in socket_options:
+                            sock.setsockopt(*opt)
+                    sock.connect(sa)
+                    return sock
+                except socket.error as _:
+                    err = _
+                    if sock is not None:
+                        sock.close()
+            if err is not None:
+                raise err
+            else:
+                raise socket.error("getaddrinfo returns an empty list")
+        
+        # Monkey patch for this request
+        old_create_connection = create_connection
+        import urllib3.util.connection
+        urllib3.util.connection.create_connection = create_ipv4_connection
+        
+        try:
+            response = requests.request(method, url, timeout=self.timeout, **kwargs)
+            response.raise_for_status()
+            return response
+        finally:
+            # Restore original function
+            urllib3.util.connection.create_connection = old_create_connection
+    
     def get_spots(self, 
                   band: Optional[str] = None,
                   hours: int = 24,
@@ -127,6 +164,210 @@ class DXApiClient:
             
         result = self._make_request('/api/spots', params)
         return result.get('spots', [])
+
+    def get_spots_near(self,
+                       grid: Optional[str] = None,
+                       lat: Optional[float] = None,
+                       lon: Optional[float] = None,
+                       radius_km: float = 500,
+                       location: str = 'dx',
+                       band: Optional[str] = None,
+                       hours: int = 24,
+                       limit: int = 1000,
+                       order_by: str = 'timestamp') -> List[Dict[str, Any]]:
+        """
+        Fetch spots whose DX station (or spotter) is within a radius of a grid square or point
+
+        Args:
+            grid: Maidenhead locator of the center (or pass lat and lon)
+            lat: Latitude of the center
+            lon: Longitude of the center
+            radius_km: Search radius in kilometers (max 5000)
+            location: 'dx' to search DX station coordinates, 'spotter' for spotters
+            band: Filter by band (e.g., '10m', '20m')
+            hours: Time window in hours (max 168)
+            limit: Maximum number of spots to return (max 1000)
+            order_by: 'timestamp' (newest first) or 'distance' (nearest first)
+
+        Returns:
+            List of spot dictionaries, each with its distance_km from the center
+        """
+        params = {'radius_km': radius_km, 'location': location, 'hours': hours,
+                  'limit': limit, 'order_by': order_by}
+        if grid:
+            params['grid'] = grid
+        else:
+            params['lat'] = lat
+            params['lon'] = lon
+        if band:
+            params['band'] = band
+
+        result = self._make_request('/api/spots/near', params)
+        return result.get('spots', [])
+
+    def get_spots_in_box(self,
+                         min_lat: float,
+                         min_lon: float,
+                         max_lat: float,
+                         max_lon: float,
+                         location: str = 'dx',
+                         band: Optional[str] = None,
+                         hours: int = 24,
+                         limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Fetch spots whose DX station (or spotter) is inside a latitude/longitude box
+
+        Args:
+            min_lat, min_lon, max_lat, max_lon: Box corners (min_lon > max_lon crosses the antimeridian)
+            location: 'dx' to search DX station coordinates, 'spotter' for spotters
+            band: Filter by band (e.g., '10m', '20m')
+            hours: Time window in hours (max 168)
+            limit: Maximum number of spots to return (max 1000)
+
+        Returns:
+            List of spot dictionaries, newest first
+        """
+        params = {'min_lat': min_lat, 'min_lon': min_lon, 'max_lat': max_lat, 'max_lon': max_lon,
+                  'location': location, 'hours': hours, 'limit': limit}
+        if band:
+            params['band'] = band
+
+        result = self._make_request('/api/spots/bbox', params)
+        return result.get('spots', [])
+
+    def get_paths(self,
+                  band: Optional[str] = None,
+                  hours: int = 24,
+                  limit: int = 1000,
+                  points: int = 32,
+                  frequency_min: Optional[float] = None,
+                  frequency_max: Optional[float] = None,
+                  grid: Optional[str] = None,
+                  radius_km: Optional[float] = None,
+                  location: str = 'spotter') -> List[Dict[str, Any]]:
+        """
+        Fetch spotter to DX great-circle paths computed by the API
+
+        Args:
+            band: Filter by band (e.g., '10m', '20m')
+            hours: Time window in hours (max 168)
+            limit: Maximum number of paths to return (max 5000)
+            points: Vertices per path polyline (2-128)
+            frequency_min: Minimum frequency in kHz
+            frequency_max: Maximum frequency in kHz
+            grid: Only spots near this Maidenhead locator
+            radius_km: Radius around grid in kilometers
+            location: With grid, whose coordinates must be near it ('spotter' or 'dx')
+
+        Returns:
+            List of path dictionaries with distance_km, bearing and path ([lon, lat] vertices)
+        """
+        params = {'hours': hours, 'limit': limit, 'points': points}
+        if band:
+            params['band'] = band
+        if frequency_min is not None:
+            params['frequency_min'] = frequency_min
+        if frequency_max is not None:
+            params['frequency_max'] = frequency_max
+        if grid:
+            params['grid'] = grid
+            params['location'] = location
+            if radius_km:
+                params['radius_km'] = radius_km
+
+        result = self._make_request('/api/paths', params)
+        return result.get('paths', [])
+
+    def batch(self, queries: Dict[str, tuple]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch several endpoints in one request to /api/batch
+        
+        Args:
+            queries: name -> (endpoint, params), e.g. {'bands': ('/api/bands', {})}
+            
+        Returns:
+            name -> JSON response (empty dict for a query that failed)
+        """
+        body = {'queries': [{'id': name, 'path': endpoint, 'params': params or {}}
+                            for name, (endpoint, params) in queries.items()]}
+        try:
+            results = self._send('POST', '/api/batch', json=body).json()['results']
+        except requests.exceptions.RequestException as e:
+            st.error(f"API request failed: {e}")
+            return {name: {} for name in queries}
+        
+        responses = {}
+        for result in results:
+            if result['status'] != 200:
+                st.error(f"API request failed: {result['path']}: {(result['body'] or {}).get('message')}")
+            responses[result['id']] = result['body'] if result['status'] == 200 else {}
+        return responses
+    
+    def get_frame(self, endpoint: str, params: Optional[Dict] = None) -> pd.DataFrame:
+        """
+        Fetch an endpoint as an Arrow IPC stream and load it into pandas
+        
+        The Arrow buffers are read in place from the response body, with no
+        JSON decoding or per-row Python objects; numeric columns are handed to
+        pandas without copying. Timestamps arrive as UTC datetimes and band
+        and mode as categoricals.
+        
+        Args:
+            endpoint: Endpoint supporting format=arrow (e.g., '/api/spots/export')
+            params: Query parameters
+            
+        Returns:
+            DataFrame (empty if the request failed)
+        """
+        try:
+            response = self._get(endpoint, dict(params or {}, format='arrow'))
+        except requests.exceptions.RequestException as e:
+            st.error(f"API request failed: {e}")
+            return pd.DataFrame()
+        
+        table = pa.ipc.open_stream(pa.py_buffer(response.content)).read_all()
+        return table.to_pandas(split_blocks=True, self_destruct=True)
+    
+    def get_spots_frame(self,
+                        band: Optional[str] = None,
+                        hours: int = 24,
+                        dx_call: Optional[str] = None,
+                        spotter_call: Optional[str] = None,
+                        since: Optional[str] = None,
+                        until: Optional[str] = None,
+                        columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Fetch every DX spot in a time range as a DataFrame
+        
+        Uses the bulk export, so unlike get_spots() there is no row limit.
+        
+        Args:
+            band: Filter by band (e.g., '10m', '20m')
+            hours: Time window in hours (converted to since parameter)
+            dx_call: Filter by DX callsign
+            spotter_call: Filter by spotter callsign
+            since: ISO datetime string for minimum spot time (overrides hours if provided)
+            until: ISO datetime string for maximum spot time
+            columns: Spot fields to fetch (default: all)
+            
+        Returns:
+            DataFrame of spots, oldest first
+        """
+        params = {
+            'since': since or (datetime.now() - timedelta(hours=hours)).isoformat()
+        }
+        if until:
+            params['until'] = until
+        if band:
+            params['band'] = band
+        if dx_call:
+            params['dx_call'] = dx_call
+        if spotter_call:
+            params['spotter_call'] = spotter_call
+        if columns:
+            params['columns'] = ','.join(columns)
+            
+        return self.get_frame('/api/spots/export', params)
     
     def get_band_statistics(self, hours: int = 24) -> Dict[str, Any]:
         """
@@ -141,31 +382,37 @@ class DXApiClient:
         params = {'hours': hours}
         return self._make_request('/api/stats/bands', params)
     
-    def get_top_dx_stations(self, hours: int = 24, limit: int = 20) -> List[Dict[str, Any]]:
+    def get_top_dx_stations(self, hours: int = 24, limit: int = 20,
+                            band: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Get most active DX stations
         
         Args:
             hours: Time window in hours
             limit: Number of stations to return
+            band: Only count spots on this band
             
         Returns:
-            List of DX station statistics
+            List of DX station statistics, with each station's latest spot
         """
         params = {
             'hours': hours,
             'limit': limit
         }
+        if band:
+            params['band'] = band
         result = self._make_request('/api/stats/top-dx', params)
         return result.get('stations', [])
     
-    def get_top_spotters(self, hours: int = 24, limit: int = 20) -> List[Dict[str, Any]]:
+    def get_top_spotters(self, hours: int = 24, limit: int = 20,
+                         band: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Get most active spotters
         
         Args:
             hours: Time window in hours
             limit: Number of spotters to return
+            band: Only count spots on this band
             
         Returns:
             List of spotter statistics
@@ -174,6 +421,8 @@ class DXApiClient:
             'hours': hours,
             'limit': limit
         }
+        if band:
+            params['band'] = band
         result = self._make_request('/api/stats/top-spotters', params)
         return result.get('spotters', [])
     
@@ -190,6 +439,32 @@ class DXApiClient:
         params = {'hours': hours}
         return self._make_request('/api/stats/propagation', params)
     
+    def resolve_callsigns(self, callsigns: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Resolve callsigns to country and coordinates by longest matching prefix
+        
+        The API resolves up to RESOLVE_MAX_CALLSIGNS callsigns per query; longer
+        lists are split into several queries sent in one request to /api/batch.
+        
+        Args:
+            callsigns: Callsigns to resolve (duplicates are resolved once)
+            
+        Returns:
+            Upper-case callsign -> dict with prefix, country, lat and lon
+            (None for callsigns that match no prefix)
+        """
+        callsigns = list(dict.fromkeys(c.strip().upper() for c in callsigns if c and c.strip()))
+        chunks = [callsigns[i:i + RESOLVE_MAX_CALLSIGNS]
+                  for i in range(0, len(callsigns), RESOLVE_MAX_CALLSIGNS)]
+        if not chunks:
+            return {}
+        if len(chunks) == 1:
+            results = [self._make_request('/api/callsigns/resolve', {'callsigns': ','.join(chunks[0])})]
+        else:
+            results = self.batch({str(i): ('/api/callsigns/resolve', {'callsigns': ','.join(chunk)})
+                                  for i, chunk in enumerate(chunks)}).values()
+        return {row['callsign']: row for result in results for row in result.get('callsigns', [])}
+    
     def health_check(self) -> bool:
         """
         Check if API is reachable
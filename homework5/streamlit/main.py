@@ -55,11 +55,10 @@ Real-time propagation metrics and band condition analysis.
 # Fetch data for metrics
 with st.spinner("Loading current conditions..."):
     try:
-        # Get spots from last 30 minutes for MOF calculation
+        # Spots from last 30 minutes for band conditions
         thirty_min_ago = datetime.now() - timedelta(minutes=30)
-        recent_spots = api.get_spots(since=thirty_min_ago.isoformat(), limit=1000)
         
-        # Get today's 10m FM spots for band status (in user's timezone if logged in)
+        # Today's 10m FM spots for band status (in user's timezone if logged in)
         if st.session_state.get('logged_in') and st.session_state.get('user', {}).get('timezone'):
             user_tz = pytz.timezone(st.session_state.user.get('timezone', 'UTC'))
             user_now = datetime.now(user_tz)
@@ -68,20 +67,20 @@ with st.spinner("Loading current conditions..."):
         today = user_now.date()
         today_start = user_now.replace(hour=0, minute=0, second=0, microsecond=0)
         today_start_utc = today_start.astimezone(pytz.UTC).isoformat()
-        fm_spots = api.get_spots(since=today_start_utc, limit=1000)
         
-        # Calculate Maximum Observed Frequency (MOF)
-        if recent_spots:
-            frequencies = [float(spot['frequency']) for spot in recent_spots if spot.get('frequency')]
-            # Filter to HF range (7-29.7 MHz = 7000-29700 kHz)
-            hf_frequencies = [f for f in frequencies if 7000 <= f <= 29700]
-            if hf_frequencies:
-                max_freq = max(hf_frequencies)
-                mof_mhz = max_freq / 1000  # Convert kHz to MHz
-            else:
-                mof_mhz = None
-        else:
-            mof_mhz = None
+        # All in one request
+        spot_results = api.batch({
+            'recent': ('/api/spots', {'since': thirty_min_ago.isoformat(), 'limit': 1000}),
+            'today': ('/api/spots', {'since': today_start_utc, 'limit': 1000}),
+            'mof': ('/api/mof', {'window': '30m'})
+        })
+        recent_spots = spot_results['recent'].get('spots', [])
+        fm_spots = spot_results['today'].get('spots', [])
+        
+        # Maximum Observed Frequency (MOF): highest HF spot (7-29.7 MHz) of the
+        # last 30 minutes, kept up to date by the API
+        mof_groups = spot_results['mof'].get('mof', [])
+        mof_mhz = mof_groups[0]['mof_mhz'] if mof_groups else None
         
         # Calculate 10m FM Band Status
         if fm_spots:
@@ -2,7 +2,6 @@ import streamlit as st
 import pydeck as pdk
 import pandas as pd
 import os
-from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import sys
 
@@ -67,149 +66,47 @@ with col2:
 # Debug info
 st.caption(f"Current filters: Band={band}, Hours={hours}")
 
-# Load callsign country lookup table
-@st.cache_data
-def load_callsign_countries():
-    """Load callsign prefix to country/lat/lon mapping"""
-    import json
-    json_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'callsign_countries.json')
-    with open(json_path, 'r') as f:
-        data = json.load(f)
-    return data['prefixes']
-
-# Function to get coordinates from callsign prefix
-def get_coordinates_from_callsign(callsign, prefix_lookup):
-    """
-    Extract approximate coordinates from callsign using country prefix lookup.
-    Falls back to grid square conversion if available.
-    """
-    if not callsign:
-        return None, None
-    
-    callsign = callsign.upper().strip()
-    
-    # Try progressively longer prefixes (up to 4 characters for special prefixes like KH5K)
-    for length in [4, 3, 2, 1]:
-        if len(callsign) >= length:
-            prefix = callsign[:length]
-            if prefix in prefix_lookup:
-                return prefix_lookup[prefix]['lat'], prefix_lookup[prefix]['lon']
-    
-    # Handle special US callsigns (K/N/W/A + digit)
-    if len(callsign) >= 2:
-        first_char = callsign[0]
-        if first_char in ['K', 'N', 'W', 'A']:
-            # Find first digit
-            for i, char in enumerate(callsign):
-                if char.isdigit():
-                    # US callsign format: prefix + digit + suffix
-                    # Just use 'K' as generic US prefix
-                    if 'K' in prefix_lookup:
-                        return prefix_lookup['K']['lat'], prefix_lookup['K']['lon']
-                    break
-    
-    return None, None
-
-# Function to convert Maidenhead grid to lat/lon (fallback)
-def maidenhead_to_latlon(grid):
-    """Convert 6-character Maidenhead grid square to latitude/longitude"""
-    if not grid or len(grid) < 4:
-        return None, None
-    try:
-        # Pad grid to 6 characters if needed
-        grid = grid.ljust(6, 'A')
-        lon = (ord(grid[0].upper()) - ord('A')) * 20 - 180
-        lat = (ord(grid[1].upper()) - ord('A')) * 10 - 90
-        lon += int(grid[2]) * 2
-        lat += int(grid[3])
-        if len(grid) >= 6:
-            lon += (ord(grid[4].lower()) - ord('a')) * (2 / 24)
-            lat += (ord(grid[5].lower()) - ord('a')) * (1 / 24)
-        return lat, lon
-    except:
-        return None, None
-
 # Function to fetch data from API
 def fetch_active_stations(band_filter, hours_filter):
-    """Fetch active stations from API with filters"""
-    import requests
-    import socket
-    try:
-        # Force IPv4 connection
-        old_getaddrinfo = socket.getaddrinfo
-        
-        def getaddrinfo_ipv4_only(host, port, family=0, type=0, proto=0, flags=0):
-            return old_getaddrinfo(host, port, socket.AF_INET, type, proto, flags)
-        
-        socket.getaddrinfo = getaddrinfo_ipv4_only
-        
-        try:
-            # Build URL - fetch all data and filter client-side for reliability
-            url = f"http://api.jxqz.org:8080/api/spots/recent?limit=1000"
-            
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            spots = data.get('spots', data) if isinstance(data, dict) else data
-            
-            if not spots:
-                return []
-            
-            # Apply band filter client-side
-            if band_filter != "All Bands":
-                spots = [s for s in spots if s.get('band') == band_filter]
-            
-            # Apply time filter
-            if hours_filter:
-                cutoff_time = datetime.now() - timedelta(hours=hours_filter)
-                filtered_spots = []
-                for spot in spots:
-                    try:
-                        # Parse timestamp - adjust format based on your API response
-                        spot_time = datetime.fromisoformat(spot.get('timestamp', '').replace('Z', '+00:00'))
-                        if spot_time >= cutoff_time:
-                            filtered_spots.append(spot)
-                    except:
-                        # If timestamp parsing fails, include the spot
-                        filtered_spots.append(spot)
-                spots = filtered_spots
-            
-            return spots
-            
-        finally:
-            socket.getaddrinfo = old_getaddrinfo
-            
-    except Exception as e:
-        st.error(f"API request failed: {e}")
-        st.info("Tip: Check that API is accessible and not blocking IPv6")
-        return []
+    """Fetch the most spotted stations in the time window, aggregated by the API"""
+    return api.get_top_dx_stations(hours=hours_filter, limit=500,
+                                   band=None if band_filter == "All Bands" else band_filter)
 
 # Fetch data from API
 with st.spinner("Fetching active stations..."):
-    spots = fetch_active_stations(band, hours)
+    stations = fetch_active_stations(band, hours)
 
-if spots:
-    df = pd.DataFrame(spots)
+if stations:
+    # One row per station: its spot count and latest spot
+    df = pd.DataFrame(stations)
     
     # Convert frequency from kHz to MHz with 3 decimal places for display
     if 'frequency' in df.columns:
         df['frequency_mhz'] = df['frequency'].apply(lambda x: f"{float(x)/1000:.3f}" if pd.notna(x) else "")
     
-    # Load callsign prefix lookup
-    prefix_lookup = load_callsign_countries()
+    # Use coordinates resolved at ingest (longest-prefix match on callsign_prefixes)
+    if 'dx_lat' in df.columns and 'dx_lon' in df.columns:
+        df['lat'] = pd.to_numeric(df['dx_lat'], errors='coerce')
+        df['lon'] = pd.to_numeric(df['dx_lon'], errors='coerce')
+    else:
+        df['lat'] = float('nan')
+        df['lon'] = float('nan')
     
-    # Get coordinates from callsign prefix (primary method)
-    df[['lat', 'lon']] = df['dx_call'].apply(
-        lambda x: pd.Series(get_coordinates_from_callsign(x, prefix_lookup))
-    )
+    # Spots stored before ingest-time resolution: resolve their callsigns through the API
+    missing_coords = df['lat'].isna()
+    if missing_coords.any():
+        resolved = api.resolve_callsigns(df.loc[missing_coords, 'dx_call'].tolist())
+        calls = df.loc[missing_coords, 'dx_call'].str.strip().str.upper()
+        for column in ('lat', 'lon'):
+            df.loc[missing_coords, column] = pd.to_numeric(
+                calls.map(lambda call: (resolved.get(call) or {}).get(column)), errors='coerce')
     
-    # Fallback to grid square if callsign lookup failed and grid is available
-    if 'grid_square' in df.columns:
+    # Fallback to grid square coordinates (computed by the API) if callsign lookup failed
+    if 'grid_lat' in df.columns:
         missing_coords = df['lat'].isna()
         if missing_coords.any():
-            df.loc[missing_coords, ['lat', 'lon']] = df.loc[missing_coords, 'grid_square'].apply(
-                lambda x: pd.Series(maidenhead_to_latlon(x))
-            )
+            df.loc[missing_coords, 'lat'] = pd.to_numeric(df.loc[missing_coords, 'grid_lat'], errors='coerce')
+            df.loc[missing_coords, 'lon'] = pd.to_numeric(df.loc[missing_coords, 'grid_lon'], errors='coerce')
     
     # Remove rows with no valid coordinates
     initial_count = len(df)
@@ -219,24 +116,12 @@ if spots:
         st.info(f"Mapped {len(df)} of {initial_count} stations ({initial_count - len(df)} could not be located)")
     
     if not df.empty:
-        # Aggregate spots by callsign - count occurrences and get first location
-        callsign_agg = df.groupby('dx_call').agg({
-            'lat': 'first',
-            'lon': 'first',
-            'frequency': 'first',
-            'frequency_mhz': 'first',
-            'band': 'first',
-            'mode': 'first',
-            'grid_square': 'first' if 'grid_square' in df.columns else lambda x: None
-        }).reset_index()
-        
-        # Count spots per callsign
-        callsign_agg['spot_count'] = df.groupby('dx_call').size().values
+        callsign_agg = df
         
         # Scale radius based on spot count (base 30k, scale up with count)
         callsign_agg['radius'] = callsign_agg['spot_count'].apply(lambda x: 30000 + (x * 15000))
         
-        st.success(f"Displaying {len(callsign_agg)} unique stations from {len(df)} total spots")
+        st.success(f"Displaying {len(callsign_agg)} unique stations from {callsign_agg['spot_count'].sum()} total spots")
         
         # Create PyDeck scatterplot map
         layer = pdk.Layer(
@@ -270,7 +155,7 @@ if spots:
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("Total Spots", len(df))
+            st.metric("Total Spots", int(callsign_agg['spot_count'].sum()))
         
         with col2:
             st.metric("Unique Callsigns", callsign_agg['dx_call'].nunique())
@@ -39,54 +39,6 @@ if not st.session_state.logged_in:
             st.session_state.logged_in = True
             st.session_state.user = user_data
 
-# Callsign prefix to coordinates mapping
-CALLSIGN_REGIONS = {
-    # US Callsign areas
-    'K1': {'lat': 42.3601, 'lon': -71.0589, 'name': 'New England'},
-    'K2': {'lat': 40.7128, 'lon': -74.0060, 'name': 'New York/New Jersey'},
-    'K3': {'lat': 39.9526, 'lon': -75.1652, 'name': 'Mid-Atlantic'},
-    'K4': {'lat': 33.7490, 'lon': -84.3880, 'name': 'Southeast'},
-    'K5': {'lat': 29.7604, 'lon': -95.3698, 'name': 'South Central'},
-    'K6': {'lat': 34.0522, 'lon': -118.2437, 'name': 'California'},
-    'K7': {'lat': 47.6062, 'lon': -122.3321, 'name': 'Pacific Northwest'},
-    'K8': {'lat': 41.4993, 'lon': -81.6944, 'name': 'Great Lakes'},
-    'K9': {'lat': 41.8781, 'lon': -87.6298, 'name': 'Midwest'},
-    'K0': {'lat': 39.0997, 'lon': -94.5786, 'name': 'Central Plains'},
-    # European prefixes
-    'G': {'lat': 51.5074, 'lon': -0.1278, 'name': 'England'},
-    'F': {'lat': 48.8566, 'lon': 2.3522, 'name': 'France'},
-    'DL': {'lat': 52.5200, 'lon': 13.4050, 'name': 'Germany'},
-    'I': {'lat': 41.9028, 'lon': 12.4964, 'name': 'Italy'},
-    'EA': {'lat': 40.4168, 'lon': -3.7038, 'name': 'Spain'},
-    'ON': {'lat': 50.8503, 'lon': 4.3517, 'name': 'Belgium'},
-    'PA': {'lat': 52.3676, 'lon': 4.9041, 'name': 'Netherlands'},
-    'OH': {'lat': 60.1699, 'lon': 24.9384, 'name': 'Finland'},
-    'SM': {'lat': 59.3293, 'lon': 18.0686, 'name': 'Sweden'},
-    'LA': {'lat': 59.9139, 'lon': 10.7522, 'name': 'Norway'},
-    'HB': {'lat': 46.9480, 'lon': 7.4474, 'name': 'Switzerland'},
-    'GM': {'lat': 55.9533, 'lon': -3.1883, 'name': 'Scotland'},
-    'EI': {'lat': 53.3498, 'lon': -6.2603, 'name': 'Ireland'},
-    'CT': {'lat': 38.7223, 'lon': -9.1393, 'name': 'Portugal'},
-    'CN': {'lat': 33.5731, 'lon': -7.5898, 'name': 'Morocco'},
-    # Other regions
-    'VE': {'lat': 45.4215, 'lon': -75.6972, 'name': 'Canada'},
-    'VA': {'lat': 43.6532, 'lon': -79.3832, 'name': 'Canada'},
-    'JA': {'lat': 35.6762, 'lon': 139.6503, 'name': 'Japan'},
-    'ZS': {'lat': -25.7461, 'lon': 28.1881, 'name': 'South Africa'},
-    'VK': {'lat': -33.8688, 'lon': 151.2093, 'name': 'Australia'},
-    'ZL': {'lat': -41.2865, 'lon': 174.7762, 'name': 'New Zealand'},
-    'PY': {'lat': -23.5505, 'lon': -46.6333, 'name': 'Brazil'},
-    'LU': {'lat': -34.6037, 'lon': -58.3816, 'name': 'Argentina'},
-    'CE': {'lat': -33.4489, 'lon': -70.6693, 'name': 'Chile'},
-    'XE': {'lat': 19.4326, 'lon': -99.1332, 'name': 'Mexico'},
-    'KP4': {'lat': 18.2208, 'lon': -66.5901, 'name': 'Puerto Rico'},
-    '9Y': {'lat': 10.6918, 'lon': -61.2225, 'name': 'Trinidad'},
-    'IK': {'lat': 45.4642, 'lon': 9.1900, 'name': 'Italy'},
-    'IZ': {'lat': 41.9028, 'lon': 12.4964, 'name': 'Italy'},
-    'IW': {'lat': 41.9028, 'lon': 12.4964, 'name': 'Italy'},
-    'DK': {'lat': 52.5200, 'lon': 13.4050, 'name': 'Germany'},
-}
-
 def format_timestamp(timestamp_str, user_timezone=None):
     """Format timestamp to HH:MM with timezone abbreviation."""
     try:
@@ -120,33 +72,6 @@ def format_timestamp(timestamp_str, user_timezone=None):
     except Exception as e:
         return str(timestamp_str)  # Return original if parsing fails
 
-def get_coordinates(callsign):
-    """Extract approximate coordinates from callsign prefix."""
-    if not callsign:
-        return None
-    
-    # Try progressively shorter prefixes
-    for length in [3, 2, 1]:
-        prefix = callsign[:length].upper()
-        if prefix in CALLSIGN_REGIONS:
-            return CALLSIGN_REGIONS[prefix]
-    
-    # Handle US callsigns (N/W/K/A prefix with digit)
-    first_char = callsign[0].upper()
-    if first_char in ['N', 'W', 'K', 'A'] and len(callsign) > 1:
-        # Try digit at position 1
-        if callsign[1].isdigit():
-            key = f'K{callsign[1]}'
-            if key in CALLSIGN_REGIONS:
-                return CALLSIGN_REGIONS[key]
-        # Try digit at position 2 (for KE4, KF4, etc.)
-        if len(callsign) > 2 and callsign[2].isdigit():
-            key = f'K{callsign[2]}'
-            if key in CALLSIGN_REGIONS:
-                return CALLSIGN_REGIONS[key]
-    
-    return None
-
 st.title("🌍 Great Circle Paths")
 
 st.markdown("""
@@ -190,6 +115,16 @@ with st.sidebar:
     
     st.divider()
     
+    # Paths heard near the user's own station, found by the API's location index
+    near_grid = None
+    near_radius_km = 1000
+    if st.session_state.logged_in and st.session_state.user.get('grid_square'):
+        st.subheader("Spotter Location")
+        if st.checkbox(f"Only spotters near {st.session_state.user['grid_square']}", value=False):
+            near_grid = st.session_state.user['grid_square']
+            near_radius_km = st.slider("Radius (km)", min_value=100, max_value=5000, value=1000, step=100)
+        st.divider()
+    
     st.subheader("Display Options")
     map_style_option = st.selectbox("Map Style", ["Light", "Dark"])
     arc_width = st.slider("Arc Width", min_value=1, max_value=5, value=2)
@@ -247,25 +182,16 @@ with st.spinner("Fetching DX spots..."):
             st.info("📡 Please select at least one band from the sidebar to display propagation data.")
             st.stop()
         
-        # Fetch spots for selected bands
-        all_band_spots = []
-        
-        # Fetch spots for each selected band
+        # Fetch paths for selected bands; the API computes the great circles,
+        # distances and bearings, and filters the SSB/FM frequency portions
+        paths = []
         for band_name, min_freq, max_freq in band_filters:
-            band_spots = api.get_spots(band=band_name, hours=hours, limit=1000)
-            # Filter by frequency range for SSB/FM portions
-            for spot in band_spots:
-                try:
-                    freq = float(spot['frequency'])
-                    if min_freq <= freq <= max_freq:
-                        all_band_spots.append(spot)
-                except (ValueError, KeyError):
-                    continue
-        
-        spots = all_band_spots
+            paths.extend(api.get_paths(band=band_name, hours=hours, limit=1000,
+                                       frequency_min=min_freq, frequency_max=max_freq,
+                                       grid=near_grid, radius_km=near_radius_km))
         
-        # Check if we got any spots
-        if not spots:
+        # Check if we got any paths
+        if not paths:
             st.warning("📭 No spots found for the selected bands and time period. Try selecting different bands or expanding the time window.")
             st.stop()
         
@@ -274,39 +200,29 @@ with st.spinner("Fetching DX spots..."):
         if st.session_state.get('logged_in') and st.session_state.get('user', {}).get('timezone'):
             user_tz = st.session_state.user.get('timezone')
         
-        # Process spots and create arc data
+        # Tooltip fields for each path
         arc_data = []
-        for spot in spots:
-            spotter_coords = get_coordinates(spot['spotter_call'])
-            dx_coords = get_coordinates(spot['dx_call'])
-            
-            if spotter_coords and dx_coords:
-                arc = {
-                    'source_lat': spotter_coords['lat'],
-                    'source_lon': spotter_coords['lon'],
-                    'target_lat': dx_coords['lat'],
-                    'target_lon': dx_coords['lon'],
-                    'spotter': spot['spotter_call'],
-                    'dx_station': spot['dx_call'],
-                    'frequency': spot['frequency'],
-                    'frequency_mhz': f"{float(spot['frequency'])/1000:.3f}" if spot.get('frequency') else '',
-                    'mode': spot.get('mode', 'N/A'),
-                    'time': format_timestamp(spot['timestamp'], user_tz),
-                }
-                arc_data.append(arc)
-        
-        if not arc_data:
-            st.warning("No coordinates found for the selected spots. Check callsign coverage.")
-            st.stop()
+        for path in paths:
+            arc_data.append({
+                'path': path['path'],
+                'spotter': path['spotter_call'],
+                'dx_station': path['dx_call'],
+                'frequency': path['frequency'],
+                'frequency_mhz': f"{float(path['frequency'])/1000:.3f}" if path.get('frequency') else '',
+                'mode': path.get('mode') or 'N/A',
+                'distance_km': f"{path['distance_km']:,.0f}",
+                'bearing': f"{path['bearing']:.0f}",
+                'time': format_timestamp(path['timestamp'], user_tz),
+            })
         
         df = pd.DataFrame(arc_data)
         
         # Display statistics
         col1, col2, col3, col4 = st.columns(4)
         with col1:
-            st.metric("Total Spots", len(spots))
-        with col2:
             st.metric("Visualized Paths", len(df))
+        with col2:
+            st.metric("Median Distance", f"{pd.Series([path['distance_km'] for path in paths]).median():,.0f} km")
         with col3:
             st.metric("DX Stations", df['dx_station'].nunique())
         with col4:
@@ -318,13 +234,13 @@ with st.spinner("Fetching DX spots..."):
         st.subheader("🗺️ Interactive Great Circle Map")
         
         layer = pdk.Layer(
-            'GreatCircleLayer',
+            'PathLayer',
             data=df,
-            get_source_position=['source_lon', 'source_lat'],
-            get_target_position=['target_lon', 'target_lat'],
-            get_source_color=[255, 100, 0, 200],  # Orange for source
-            get_target_color=[0, 128, 255, 200],  # Blue for target
+            get_path='path',
+            get_color=[255, 100, 0, 200],
             get_width=arc_width,
+            width_units='pixels',
+            wrap_longitude=True,
             pickable=True,
             auto_highlight=True,
         )
@@ -340,6 +256,7 @@ with st.spinner("Fetching DX spots..."):
         tooltip = {
             "html": "<b>{spotter}</b> → <b>{dx_station}</b><br/>"
                     "Frequency: {frequency_mhz} MHz<br/>"
+                    "Distance: {distance_km} km, bearing {bearing}°<br/>"
                     "Time: {time}",
             "style": {
                 "backgroundColor": "steelblue",
@@ -358,7 +275,7 @@ with st.spinner("Fetching DX spots..."):
         
         st.pydeck_chart(deck)
         
-        st.caption("💡 Hover over arcs to see contact details. Orange markers = spotters, Blue markers = DX stations")
+        st.caption("💡 Hover over paths to see contact details. Paths run from the spotter to the DX station")
         
         st.divider()
         
@@ -103,11 +103,10 @@ def collect_dx_statistics():
     
     for period_name, hours in time_periods:
         try:
-            spots = api.get_spots(hours=hours, limit=5000)
+            # Every spot in the period, only the columns used below
+            df = api.get_spots_frame(hours=hours, columns=['band', 'dx_call'])
             
-            if spots:
-                df = pd.DataFrame(spots)
-                
+            if not df.empty:
                 # Band distribution analysis
                 if 'band' in df.columns:
                     band_counts = df['band'].value_counts().to_dict()